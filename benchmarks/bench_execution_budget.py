@@ -0,0 +1,88 @@
+"""
+Benchmark du budget d'exécution : débit de K-means selon workers x threads.
+
+Lance un même lot d'entraînements K-means pour chaque combinaison
+(workers, threads par worker) dont le produit tient dans le nombre de cœurs,
+et affiche la courbe de débit (entraînements par seconde).
+
+Usage :
+    python benchmarks/bench_execution_budget.py --n-samples 50000 --n-fits 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+# Ajout du répertoire parent au PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from src.config import N_CLUSTERS, RANDOM_STATE
+from src.utils.execution import process_pool
+
+def _fit(task):
+    """Entraîne un K-means sur des données synthétiques (exécuté dans un worker)."""
+    seed, n_samples, n_features = task
+    X = np.random.default_rng(seed).normal(size=(n_samples, n_features))
+    KMeans(n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, n_init=1).fit(X)
+    return seed
+
+def _powers_of_two(limit):
+    values = [1]
+    while values[-1] * 2 <= limit:
+        values.append(values[-1] * 2)
+    return values
+
+def run(n_samples, n_features, n_fits, max_cores):
+    """
+    Mesure le débit pour chaque combinaison workers x threads.
+
+    Returns:
+        list: Une mesure par combinaison
+    """
+    tasks = [(seed, n_samples, n_features) for seed in range(n_fits)]
+    results = []
+    for workers in _powers_of_two(max_cores):
+        for threads in _powers_of_two(max_cores // workers):
+            with process_pool(max_workers=workers, threads_per_worker=threads) as pool:
+                # Échauffement : démarrage des workers et chargement des bibliothèques
+                list(pool.map(_fit, tasks[:workers]))
+                start = time.perf_counter()
+                list(pool.map(_fit, tasks))
+                elapsed = time.perf_counter() - start
+            results.append({
+                'workers': workers,
+                'threads_per_worker': threads,
+                'seconds': round(elapsed, 3),
+                'fits_per_second': round(n_fits / elapsed, 3)
+            })
+            print(f"workers={workers:<3} threads={threads:<3} "
+                  f"{elapsed:8.2f} s  {n_fits / elapsed:8.2f} fits/s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--n-samples', type=int, default=50000)
+    parser.add_argument('--n-features', type=int, default=9)
+    parser.add_argument('--n-fits', type=int, default=16)
+    parser.add_argument('--max-cores', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', help="Fichier JSON de résultats (optionnel)")
+    args = parser.parse_args()
+
+    results = run(args.n_samples, args.n_features, args.n_fits, args.max_cores)
+    best = max(results, key=lambda r: r['fits_per_second'])
+    print(f"\nMeilleure combinaison : {best['workers']} workers x "
+          f"{best['threads_per_worker']} threads ({best['fits_per_second']} fits/s)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark du temps de démarrage de la CLI (`python -m src`).
+
+Mesure, dans des processus neufs, le temps d'import de src.cli et le temps
+de `python -m src <commande> --help` pour chaque sous-commande, et vérifie
+qu'aucune bibliothèque lourde n'est chargée par l'import de la CLI. Avec
+--baseline, signale les mesures plus lentes que la référence au-delà de la
+tolérance et sort avec le code 1.
+
+Usage :
+    python benchmarks/bench_import_time.py --repeats 5 --output import_time.json
+    python benchmarks/bench_import_time.py --baseline import_time.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+
+COMMANDS = ('generate', 'preprocess', 'segment', 'score', 'report', 'export', 'serve')
+
+# Bibliothèques que l'import de la CLI ne doit pas charger
+HEAVY_MODULES = ('pandas', 'numpy', 'sklearn', 'scipy', 'matplotlib', 'seaborn', 'plotly', 'flask')
+
+def _elapsed(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=project_root, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def _median(args, repeats):
+    return round(statistics.median(_elapsed(args) for _ in range(repeats)), 4)
+
+def heavy_modules_loaded():
+    """
+    Bibliothèques lourdes chargées par `import src.cli`.
+
+    Returns:
+        list: Noms des modules chargés à tort
+    """
+    code = (
+        "import sys, json, src.cli; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                            check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+def run(repeats):
+    """
+    Mesure les temps de démarrage.
+
+    Returns:
+        dict: Temps médians en secondes (interpréteur seul, import, --help)
+    """
+    timings = {
+        'python': _median(['-c', 'pass'], repeats),
+        'import src.cli': _median(['-c', 'import src.cli'], repeats),
+    }
+    for command in COMMANDS:
+        timings[f'{command} --help'] = _median(['-m', 'src', command, '--help'], repeats)
+    return timings
+
+def compare(timings, baseline, tolerance):
+    """
+    Mesures plus lentes que la référence au-delà de la tolérance.
+
+    Le coût fixe de l'interpréteur est retranché pour ne comparer que le
+    temps propre à la CLI.
+
+    Returns:
+        list: (mesure, référence, actuelle) pour chaque régression
+    """
+    regressions = []
+    for name, seconds in timings.items():
+        if name == 'python' or name not in baseline:
+            continue
+        before = baseline[name] - baseline.get('python', 0)
+        after = seconds - timings['python']
+        if after > max(before, 0.01) * (1 + tolerance):
+            regressions.append((name, baseline[name], seconds))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--baseline', help="Fichier JSON de référence")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Ralentissement relatif toléré (0.25 = +25 %%)")
+    parser.add_argument('--output', help="Fichier JSON de résultats (optionnel)")
+    args = parser.parse_args()
+
+    loaded = heavy_modules_loaded()
+    timings = run(args.repeats)
+    for name, seconds in timings.items():
+        print(f"{name:<22} {seconds * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(timings, f, indent=2)
+
+    failed = False
+    if loaded:
+        print(f"\nBibliothèques lourdes chargées par import src.cli : {', '.join(loaded)}")
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(timings, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"RÉGRESSION {name} : {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Suite de benchmarks des étapes de segmentation selon la taille des données.
+
+Pour chaque taille (10^3 à 10^7 lignes), génère les données avec
+generate_test_data (ou DataGenerator pour l'application web), puis mesure
+chaque étape avec échauffement et répétitions : temps médian, débit
+(lignes/s) et pic de mémoire résidente. Les résultats sont écrits en JSON ;
+avec --baseline, les mesures plus lentes (ou plus gourmandes) que la
+référence au-delà de la tolérance sont signalées et le script sort avec le
+code 1.
+
+Usage :
+    python benchmarks/bench_suite.py --sizes 1000 10000 100000 --output results.json
+    python benchmarks/bench_suite.py --sizes 1000 10000 --baseline results.json
+    python benchmarks/bench_suite.py --only segmentation.fit --sizes 1000000
+
+La référence n'est pas versionnée : les temps dépendent de la machine, elle
+est produite par --output sur la machine qui exécute la comparaison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Ajout du répertoire parent au PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from src.config import NUMERIC_FEATURES
+from src.data.generate_test_data import generate_test_data
+from src.utils.instrumentation import measure
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+class Context:
+    """Données partagées par les benchmarks d'une même taille, construites à la demande."""
+
+    def __init__(self, rows, workdir):
+        self.rows = rows
+        self.workdir = Path(workdir)
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def raw(self):
+        return self._get('raw', lambda: generate_test_data(self.rows))
+
+    @property
+    def raw_file(self):
+        def build():
+            path = self.workdir / 'raw.csv'
+            self.raw.to_csv(path, index=False)
+            return path
+        return self._get('raw_file', build)
+
+    @property
+    def processed(self):
+        def build():
+            from src.data.preprocessing import DataPreprocessor
+            preprocessor = DataPreprocessor()
+            df = preprocessor.handle_outliers(preprocessor.handle_missing_values(self.raw.copy()))
+            return preprocessor.scale_features(df)
+        return self._get('processed', build)
+
+    @property
+    def segmentation(self):
+        def build():
+            from src.models.segmentation import CustomerSegmentation
+            return CustomerSegmentation().fit(self.processed)
+        return self._get('segmentation', build)
+
+    @property
+    def profiles(self):
+        return self._get('profiles', lambda: self.segmentation.get_segment_profiles(self.processed))
+
+    @property
+    def web_client(self):
+        def build():
+            from src.data.data_generator import DataGenerator
+            import src.web.app as web_app
+            raw_dir = self.workdir / 'web'
+            raw_dir.mkdir(exist_ok=True)
+            DataGenerator(n_samples=self.rows).generate_customer_data().to_csv(
+                raw_dir / 'donnees_clients.csv', index=False
+            )
+            # L'application lit ses données depuis RAW_DATA_PATH
+            web_app.RAW_DATA_PATH = raw_dir
+            return web_app.app.test_client()
+        return self._get('web_client', build)
+
+def _data_loader_preprocess(ctx):
+    from src.data.data_loader import DataLoader
+    raw = ctx.raw
+    return lambda: DataLoader().preprocess_data(raw)
+
+def _preprocessor_preprocess(ctx):
+    from src.data.preprocessing import DataPreprocessor
+    raw_file, output = ctx.raw_file, ctx.workdir / 'processed.csv'
+    return lambda: DataPreprocessor().preprocess(raw_file, output)
+
+def _segmentation_fit(ctx):
+    from src.models.segmentation import CustomerSegmentation
+    processed = ctx.processed
+    return lambda: CustomerSegmentation().fit(processed)
+
+def _segmentation_predict(ctx):
+    segmentation, processed = ctx.segmentation, ctx.processed
+    return lambda: segmentation.predict(processed)
+
+def _segmentation_evaluate(ctx):
+    segmentation, processed = ctx.segmentation, ctx.processed
+    return lambda: segmentation.evaluate(processed)
+
+def _cluster_profiles(ctx):
+    segmentation, processed = ctx.segmentation, ctx.processed
+    return lambda: segmentation.get_cluster_profiles(processed)
+
+def _reporters(ctx):
+    from src.models.reporting import SegmentationReporter
+    profiles = ctx.profiles
+
+    def run():
+        reporter = SegmentationReporter()
+        reporter.generate_segment_report(profiles, save=False)
+        reporter.generate_executive_summary(profiles, save=False)
+        reporter.generate_marketing_strategy(profiles, save=False)
+    return run
+
+def _web_endpoint(route):
+    def setup(ctx):
+        client = ctx.web_client
+
+        def run():
+            response = client.get(route)
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} : HTTP {response.status_code}")
+        return run
+    return setup
+
+# Nom -> (construction de l'appel mesuré, taille maximale raisonnable ou None)
+BENCHMARKS = {
+    'data_loader.preprocess_data': (_data_loader_preprocess, None),
+    'preprocessor.preprocess': (_preprocessor_preprocess, None),
+    'segmentation.fit': (_segmentation_fit, None),
+    'segmentation.predict': (_segmentation_predict, None),
+    'segmentation.evaluate': (_segmentation_evaluate, None),
+    'segmentation.get_cluster_profiles': (_cluster_profiles, None),
+    'reporting.generate_reports': (_reporters, None),
+    # DataGenerator et les endpoints (JSON plotly) restent en Python pur
+    'web.cluster_distribution': (_web_endpoint('/api/cluster_distribution'), 100000),
+    'web.feature_importance': (_web_endpoint('/api/feature_importance'), 100000),
+    'web.segment_details': (_web_endpoint('/api/segment_details'), 100000),
+}
+
+def time_call(func, repeats, warmup):
+    """
+    Mesure un appel avec échauffement.
+
+    Returns:
+        dict: Temps (médian, minimum) et pic de mémoire résidente
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    with measure(trace_allocations=False) as metrics:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return {
+        'median_s': round(statistics.median(timings), 6),
+        'min_s': round(min(timings), 6),
+        'peak_rss_mb': metrics['peak_rss_mb']
+    }
+
+def run(sizes, names, repeats, warmup):
+    """
+    Exécute la suite.
+
+    Returns:
+        list: Une mesure par (benchmark, taille)
+    """
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            ctx = Context(rows, workdir)
+            for name in names:
+                setup, max_rows = BENCHMARKS[name]
+                if max_rows is not None and rows > max_rows:
+                    continue
+                try:
+                    measured = time_call(setup(ctx), repeats, warmup)
+                except Exception as e:
+                    print(f"{name:<36} {rows:>10,}  ÉCHEC : {e}")
+                    results.append({'benchmark': name, 'rows': rows, 'error': str(e)})
+                    continue
+                measured['throughput_rows_s'] = round(rows / measured['median_s'], 1)
+                results.append({'benchmark': name, 'rows': rows, 'repeats': repeats, **measured})
+                rss = measured['peak_rss_mb']
+                print(f"{name:<36} {rows:>10,}  {measured['median_s'] * 1000:10.1f} ms  "
+                      f"{measured['throughput_rows_s']:>14,.0f} lignes/s  "
+                      + ('       - Mo' if rss is None else f"{rss:8.1f} Mo"))
+    return results
+
+# Écarts absolus en deçà desquels une variation relève du bruit de mesure
+MIN_DELTA = {'median_s': 0.005, 'peak_rss_mb': 10.0}
+
+def compare(results, baseline, tolerance):
+    """
+    Mesures en régression par rapport à la référence.
+
+    Returns:
+        list: (benchmark, taille, métrique, référence, actuelle)
+    """
+    reference = {
+        (entry['benchmark'], entry['rows']): entry
+        for entry in baseline['results'] if 'error' not in entry
+    }
+    regressions = []
+    for entry in results:
+        before = reference.get((entry['benchmark'], entry['rows']))
+        if before is None or 'error' in entry:
+            continue
+        for metric in ('median_s', 'peak_rss_mb'):
+            # Pic de mémoire non mesuré (Windows) : pas de comparaison
+            if entry.get(metric) is None or before.get(metric) is None:
+                continue
+            if (entry[metric] > before[metric] * (1 + tolerance)
+                    and entry[metric] - before[metric] > MIN_DELTA[metric]):
+                regressions.append((entry['benchmark'], entry['rows'], metric, before[metric], entry[metric]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=lambda v: int(float(v)), nargs='+', default=list(DEFAULT_SIZES),
+                        help="Nombres de lignes (ex. 1e3 1e4 1e5 1e6 1e7)")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        metavar='BENCHMARK', help="Sous-ensemble de benchmarks")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    parser.add_argument('--baseline', help="Fichier JSON de référence")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Dégradation relative tolérée (0.2 = +20 %%)")
+    args = parser.parse_args()
+
+    # Les répétitions doivent réentraîner le modèle, pas relire le cache
+    # (variable héritée par les workers)
+    os.environ['SEGMENTATION_FIT_CACHE'] = '0'
+    results = run(args.sizes, args.only, args.repeats, args.warmup)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__
+        },
+        'features': NUMERIC_FEATURES,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, rows, metric, before, after in regressions:
+            print(f"RÉGRESSION {name} ({rows:,} lignes) {metric} : {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -9,13 +9,23 @@ BASE_PATH = Path(__file__).parent
 DATA_PATH = BASE_PATH / 'data'
 RAW_DATA_PATH = DATA_PATH / 'raw'
 PROCESSED_DATA_PATH = DATA_PATH / 'processed'
+INTERIM_DATA_PATH = DATA_PATH / 'interim'
 FIGURES_PATH = BASE_PATH / 'figures'
 REPORTS_PATH = BASE_PATH / 'reports'
+MODELS_PATH = BASE_PATH / 'models'
+CHECKPOINTS_PATH = MODELS_PATH / 'checkpoints'
+LOGS_PATH = BASE_PATH / 'logs'
+
+# Pipeline incrémental
+PIPELINE_STATE_FILE = INTERIM_DATA_PATH / 'pipeline_state.json'
+PIPELINE_CHECKPOINT_FILE = CHECKPOINTS_PATH / 'pipeline_run.json'
 
 # Paramètres de segmentation
 N_CLUSTERS = 5
 RANDOM_STATE = 42
 
+N_CLUSTERS_RANGE = range(2, 11)
+
 # Paramètres de clustering
 CLUSTERING_PARAMS = {
     'kmeans': {
@@ -29,6 +39,15 @@ CLUSTERING_PARAMS = {
     }
 }
 
+# Paramètres de la statistique de gap
+GAP_STATISTIC_PARAMS = {
+    'n_references': 10,
+    'reference': 'uniform',  # 'uniform' ou 'pca'
+    'max_samples': 20000,
+    'n_init': 3,
+    'n_jobs': None
+}
+
 # Paramètres de prétraitement
 PREPROCESSING_PARAMS = {
     'numerical_columns': [
@@ -19,6 +19,11 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.decomposition import PCA
 
+# Entraînements K-means mémoïsés sur disque (models/checkpoints/fit_cache)
+import sys
+sys.path.append('..')
+from src.data.kmeans_model import train_kmeans
+
 # Configuration de l'affichage
 %matplotlib inline
 plt.style.use('seaborn')
@@ -40,15 +45,15 @@ n_clusters_section = nbf.v4.new_markdown_cell('''## 2. Détermination du nombre
 
 # Créer une cellule de code pour le nombre optimal de clusters
 n_clusters_cell = nbf.v4.new_code_cell('''# Test de différents nombres de clusters
+# (les entraînements déjà réalisés sur les mêmes données sont relus du cache)
 n_clusters_range = range(2, 11)
 silhouette_scores = []
 calinski_scores = []
 
 for n_clusters in n_clusters_range:
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    cluster_labels = kmeans.fit_predict(df)
+    kmeans, cluster_labels, metrics = train_kmeans(df.values, n_clusters, random_state=42)
     
-    silhouette_scores.append(silhouette_score(df, cluster_labels))
+    silhouette_scores.append(metrics['silhouette'])
     calinski_scores.append(calinski_harabasz_score(df, cluster_labels))
 
 # Visualisation des scores
@@ -73,8 +78,8 @@ clustering_section = nbf.v4.new_markdown_cell('''## 3. Application du clustering
 # Créer une cellule de code pour le clustering
 clustering_cell = nbf.v4.new_code_cell('''# Application du K-means avec le nombre optimal de clusters
 n_clusters = 5  # À ajuster selon les résultats précédents
-kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-df['cluster'] = kmeans.fit_predict(df)
+kmeans, cluster_labels, metrics = train_kmeans(df.values, n_clusters, random_state=42)
+df['cluster'] = cluster_labels
 
 # Affichage des centres des clusters
 print("Centres des clusters :")
@@ -1,18 +1,30 @@
 """
 Script principal pour le projet de segmentation Tunisie Telecom.
+
+Le pipeline est un graphe d'étapes (prétraitement, entraînement, évaluation,
+profils, visualisations, rapports) ; seules les étapes dont les entrées, les
+paramètres ou le code ont changé sont réexécutées. Les mesures de chaque
+étape sont écrites dans un manifeste JSON sous logs/ ; deux manifestes se
+comparent avec `python -m src.utils.instrumentation compare A B`.
+
+Avec `--memory-budget 2G`, le chemin d'exécution (en mémoire ou par blocs),
+la précision et la taille des blocs sont choisis d'après le budget et la
+taille de l'entrée ; si le travail ne peut pas tenir, le script s'arrête
+avant toute étape en donnant l'estimation.
 """
 
-import pandas as pd
-import numpy as np
-from pathlib import Path
-from typing import Dict, Optional
+import argparse
 import logging
+import sys
 from datetime import datetime
 
-from src.data.data_loader import DataLoader
-from src.models.segmentation import CustomerSegmentation
-from src.models.visualization import SegmentationVisualizer
-from src.models.reporting import SegmentationReporter
+from config import LOGS_PATH, PIPELINE_STATE_FILE, PIPELINE_CHECKPOINT_FILE
+from src.pipeline.checkpoints import CheckpointManifest
+from src.pipeline.runner import PipelineRunner
+from src.pipeline.stages import RAW_DATA_FILE, build_pipeline
+from src.utils.instrumentation import RunManifest
+from src.utils.memory import MemoryBudgetError, plan_memory
+from src.utils.profiler import add_profile_argument, make_profiler
 
 # Configuration du logging
 logging.basicConfig(
@@ -24,63 +36,79 @@ logging.basicConfig(
     ]
 )
 
-def main():
+def parse_args(argv=None):
+    """Analyse les arguments de la ligne de commande."""
+    stage_names = [stage.name for stage in build_pipeline()]
+    parser = argparse.ArgumentParser(description="Pipeline de segmentation des clients")
+    parser.add_argument(
+        '--force',
+        action='append',
+        default=[],
+        choices=stage_names,
+        metavar='ETAPE',
+        help=f"Réexécute l'étape même si elle est à jour (répétable) : {', '.join(stage_names)}"
+    )
+    parser.add_argument(
+        '--force-all',
+        action='store_true',
+        help="Réexécute toutes les étapes"
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="Reprend après la dernière étape terminée de l'exécution interrompue "
+             "(artefacts vérifiés par SHA-256)"
+    )
+    parser.add_argument(
+        '--no-trace-allocations',
+        dest='trace_allocations',
+        action='store_false',
+        default=None,
+        help="Désactive tracemalloc dans le manifeste d'exécution (mesures de temps plus fidèles)"
+    )
+    parser.add_argument(
+        '--memory-budget',
+        metavar='TAILLE',
+        help="Mémoire disponible (ex. 2G, 512M) : choisit le traitement en mémoire ou par blocs, "
+             "la précision et la taille des blocs"
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Fonction principale du script."""
+    args = parse_args(argv)
+    plan = None
+    if args.memory_budget:
+        try:
+            plan = plan_memory(args.memory_budget, RAW_DATA_FILE)
+        except MemoryBudgetError as e:
+            logging.error(str(e))
+            sys.exit(2)
+        logging.info(f"Plan mémoire : {plan.describe()}")
+    manifest = RunManifest('pipeline', LOGS_PATH)
+    if plan is not None:
+        manifest.data['memory_plan'] = {'budget': plan.budget, **plan.stage_params()}
+    profiler = make_profiler(args.profile, LOGS_PATH, manifest.data['run_id'])
+    run_status = 'failed'
     try:
-        # Initialisation des composants
-        data_loader = DataLoader()
-        segmentation = CustomerSegmentation()
-        visualizer = SegmentationVisualizer()
-        reporter = SegmentationReporter()
-        
-        # Chargement des données
-        logging.info("Chargement des données...")
-        raw_data = data_loader.load_raw_data('donnees_clients.csv')
-        
-        # Prétraitement des données
-        logging.info("Prétraitement des données...")
-        processed_data = data_loader.preprocess_data(raw_data)
-        
-        # Sauvegarde des données prétraitées
-        data_loader.save_processed_data(processed_data, 'donnees_pretraitees.csv')
-        
-        # Segmentation des clients
-        logging.info("Application de la segmentation...")
-        segmentation.fit(processed_data)
-        
-        # Évaluation de la segmentation
-        logging.info("Évaluation de la segmentation...")
-        scores = segmentation.evaluate_clustering(processed_data)
-        logging.info(f"Scores d'évaluation : {scores}")
-        
-        # Génération des profils
-        logging.info("Génération des profils des segments...")
-        profiles = segmentation.get_cluster_profiles(processed_data)
-        
-        # Génération des offres commerciales
-        logging.info("Génération des offres commerciales...")
-        offers = segmentation.get_commercial_offers()
-        
-        # Visualisations
-        logging.info("Génération des visualisations...")
-        visualizer.plot_cluster_distribution(segmentation.labels)
-        visualizer.plot_cluster_centers(segmentation.get_cluster_centers())
-        visualizer.plot_feature_importance(segmentation.feature_importance)
-        visualizer.plot_cluster_profiles(profiles)
-        visualizer.plot_clustering_results(processed_data, segmentation.labels)
-        visualizer.plot_commercial_offers(offers)
-        
-        # Génération des rapports
-        logging.info("Génération des rapports...")
-        reporter.generate_segment_report(profiles)
-        reporter.generate_executive_summary(profiles)
-        reporter.generate_marketing_strategy(profiles)
-        
+        runner = PipelineRunner(
+            build_pipeline(plan), PIPELINE_STATE_FILE,
+            manifest=manifest, trace_allocations=args.trace_allocations,
+            profiler=profiler, checkpoint=CheckpointManifest(PIPELINE_CHECKPOINT_FILE)
+        )
+        status = runner.run(force=args.force, force_all=args.force_all, resume=args.resume)
+        executed = [name for name, state in status.items() if state == 'run']
+        logging.info(f"Étapes exécutées : {', '.join(executed) or 'aucune'}")
         logging.info("Processus de segmentation terminé avec succès!")
-        
+        run_status = 'success'
+
     except Exception as e:
         logging.error(f"Erreur lors du processus de segmentation : {str(e)}")
         raise
 
+    finally:
+        logging.info(f"Manifeste d'exécution : {manifest.write(run_status)}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
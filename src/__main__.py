@@ -0,0 +1,9 @@
+"""
+Point d'entrée `python -m src` (voir src/cli.py).
+"""
+
+import sys
+
+from src.cli import main
+
+sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Interface en ligne de commande unifiée du projet de segmentation.
+
+    python -m src generate | preprocess | segment | score | report | offers | export | serve
+
+Ce module n'importe que la bibliothèque standard : pandas, scikit-learn,
+matplotlib, plotly ou Flask ne sont chargés que par la sous-commande qui en a
+besoin, pour qu'une invocation simple (aide, score, export) démarre vite.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from src.config import (
+    RAW_DATA_FILE,
+    PROCESSED_DATA_FILE,
+    CLUSTERS_FILE,
+    SCORING_PARAMS
+)
+
+def _default_model_file():
+    from src.pipeline.stages import MODEL_FILE
+    return MODEL_FILE
+
+def _load_model(path):
+    import pickle
+    model_path = Path(path or _default_model_file())
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Modèle introuvable : {model_path} (lancer `segment` ou le pipeline d'abord)"
+        )
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+def cmd_generate(args):
+    """Génère des données clients d'exemple."""
+    from src.data.data_generator import DataGenerator
+
+    generator = DataGenerator(n_samples=args.n_samples, random_state=args.random_state)
+    df = generator.generate_and_save(args.output)
+    logging.info(f"{len(df):,} clients générés")
+
+def cmd_preprocess(args):
+    """Prétraite les données brutes."""
+    from src.data.preprocessing import DataPreprocessor
+
+    DataPreprocessor().preprocess(args.input, args.output)
+
+def cmd_segment(args):
+    """Entraîne la segmentation et sauvegarde le modèle."""
+    import pickle
+
+    if args.partition_by:
+        from src.models.partitioned import PartitionedSegmentation
+        segmentation = PartitionedSegmentation(key=args.partition_by)
+    else:
+        from src.models.segmentation import CustomerSegmentation
+        segmentation = CustomerSegmentation()
+    segmentation.segment_clients(args.input, args.output)
+
+    model_path = Path(args.model or _default_model_file())
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(model_path, 'wb') as f:
+        pickle.dump(segmentation, f, protocol=pickle.HIGHEST_PROTOCOL)
+    logging.info(f"Modèle sauvegardé dans {model_path}")
+
+def cmd_score(args):
+    """Affecte un segment à chaque client d'un fichier prétraité, par lots."""
+    import pandas as pd
+    from src.config import SEGMENT_LABELS
+
+    segmentation = _load_model(args.model)
+    output = Path(args.output or Path(args.input).with_name(f"{Path(args.input).stem}_scores.csv"))
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    n_rows = 0
+    for i, chunk in enumerate(pd.read_csv(args.input, chunksize=args.chunksize)):
+        chunk['segment'] = segmentation.predict(chunk)
+        chunk['segment_label'] = chunk['segment'].map(SEGMENT_LABELS)
+        chunk.to_csv(output, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        n_rows += len(chunk)
+    logging.info(f"{n_rows:,} clients scorés dans {output}")
+
+def cmd_report(args):
+    """Génère les rapports de segmentation."""
+    import pandas as pd
+    from src.models.reporting import SegmentationReporter
+
+    segmentation = _load_model(args.model)
+    if not hasattr(segmentation, 'get_segment_profiles'):
+        # Modèle partitionné : profils par partition, hors du format des rapports
+        raise ValueError(
+            "Les rapports nécessitent un modèle non partitionné (segment sans "
+            "--partition-by) ; les profils par partition sont dans <output>_profils.csv"
+        )
+    profiles = segmentation.get_segment_profiles(pd.read_csv(args.input))
+    reporter = SegmentationReporter()
+    reporter.generate_segment_report(profiles)
+    reporter.generate_executive_summary(profiles)
+    reporter.generate_marketing_strategy(profiles)
+
+def cmd_offers(args):
+    """Affecte les offres commerciales aux clients de la base."""
+    from src.data.database import open_database
+    from src.models.offers import OfferEngine, assign_offers, database_offers, export_campaigns
+
+    with open_database() as db:
+        # Offres enregistrées dans la base, COMMERCIAL_OFFERS à défaut
+        engine = OfferEngine(offers=database_offers(db) or None)
+        stats = assign_offers(db, engine)
+        for name, n in stats['offres'].items():
+            logging.info(f"{name} : {n:,} clients")
+        if args.campaigns:
+            campaigns = export_campaigns(db, args.campaigns, args.format)
+            logging.info(f"{len(campaigns)} listes de campagne écrites dans {args.campaigns}")
+
+def cmd_export(args):
+    """Exporte la base vers Power BI."""
+    from src.data.powerbi_export import export_to_powerbi
+
+    export_to_powerbi()
+
+def cmd_serve(args):
+    """Lance l'application web."""
+    from src.web.app import app
+
+    app.run(host=args.host, port=args.port, debug=args.debug)
+
+def build_parser():
+    """
+    Construit l'analyseur de la ligne de commande.
+
+    Returns:
+        argparse.ArgumentParser: Analyseur avec une sous-commande par tâche
+    """
+    from src.utils.profiler import add_profile_argument
+
+    parser = argparse.ArgumentParser(
+        prog='python -m src',
+        description="Segmentation des clients Tunisie Telecom"
+    )
+    add_profile_argument(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='COMMANDE')
+
+    generate = subparsers.add_parser('generate', help=cmd_generate.__doc__)
+    generate.add_argument('--n-samples', type=int, default=1000)
+    generate.add_argument('--random-state', type=int, default=42)
+    generate.add_argument('--output', default='donnees_clients.csv',
+                          help="Nom du fichier dans data/raw")
+    generate.set_defaults(func=cmd_generate)
+
+    preprocess = subparsers.add_parser('preprocess', help=cmd_preprocess.__doc__)
+    preprocess.add_argument('--input', default=RAW_DATA_FILE)
+    preprocess.add_argument('--output', default=PROCESSED_DATA_FILE)
+    preprocess.set_defaults(func=cmd_preprocess)
+
+    segment = subparsers.add_parser('segment', help=cmd_segment.__doc__)
+    segment.add_argument('--input', default=PROCESSED_DATA_FILE)
+    segment.add_argument('--output', default=CLUSTERS_FILE)
+    segment.add_argument('--model', help="Fichier du modèle (celui du pipeline par défaut)")
+    segment.add_argument('--partition-by', metavar='COLONNE',
+                         help="Segmente chaque partition séparément (ex. duree_contrat, "
+                              "découpée en quantiles)")
+    segment.set_defaults(func=cmd_segment)
+
+    score = subparsers.add_parser('score', help=cmd_score.__doc__)
+    score.add_argument('--input', default=PROCESSED_DATA_FILE)
+    score.add_argument('--output', help="Fichier de sortie (<input>_scores.csv par défaut)")
+    score.add_argument('--model', help="Fichier du modèle (celui du pipeline par défaut)")
+    score.add_argument('--chunksize', type=int, default=SCORING_PARAMS['chunksize'])
+    score.set_defaults(func=cmd_score)
+
+    report = subparsers.add_parser('report', help=cmd_report.__doc__)
+    report.add_argument('--input', default=PROCESSED_DATA_FILE)
+    report.add_argument('--model', help="Fichier du modèle (celui du pipeline par défaut)")
+    report.set_defaults(func=cmd_report)
+
+    offers = subparsers.add_parser('offers', help=cmd_offers.__doc__)
+    offers.add_argument('--campaigns', help="Dossier des listes de campagne (une par offre)")
+    offers.add_argument('--format', choices=['csv', 'csv.gz', 'parquet'], default='csv')
+    offers.set_defaults(func=cmd_offers)
+
+    export = subparsers.add_parser('export', help=cmd_export.__doc__)
+    export.set_defaults(func=cmd_export)
+
+    serve = subparsers.add_parser('serve', help=cmd_serve.__doc__)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=5000)
+    serve.add_argument('--debug', action='store_true')
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+def main(argv=None):
+    """Point d'entrée de la CLI."""
+    from src.utils.profiler import make_profiler, profiled
+
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        with profiled(make_profiler(args.profile), args.command):
+            args.func(args)
+    except Exception as e:
+        logging.error(f"Erreur lors de la commande {args.command} : {str(e)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,534 @@
+"""
+Accès à la base via un moteur SQLAlchemy (SQLite, MySQL, PostgreSQL...).
+
+EngineDatabaseManager offre les méthodes de DatabaseManager (imports,
+statistiques, historique des segments, exports) sur un moteur SQLAlchemy
+mutualisé : le code appelant ne change pas selon la base visée. Les
+écritures passent par executemany, les lectures par des curseurs en flux
+(stream_results) et le schéma par des migrations numérotées, enregistrées
+dans la table schema_migrations.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import pandas as pd
+import sqlalchemy as sa
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import DATABASE_PARAMS, DATABASE_ENGINE_PARAMS
+from src.data.database import DatabaseManager, ASSIGNMENT_COLUMNS, SEGMENT_STATS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Identifiants recherchés par requête IN lors de l'import incrémental
+_LOOKUP_SIZE = 1000
+
+metadata = sa.MetaData()
+
+clients = sa.Table(
+    'clients', metadata,
+    sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column('client_id', sa.BigInteger),
+    sa.Column('age', sa.Integer),
+    sa.Column('montant_consommation', sa.Float),
+    sa.Column('nombre_appels', sa.Integer),
+    sa.Column('volume_data', sa.Float),
+    sa.Column('nombre_sms', sa.Integer),
+    sa.Column('satisfaction', sa.Float),
+    sa.Column('fidelite', sa.Float),
+    sa.Column('zone', sa.String(64)),
+    sa.Column('segment', sa.String(64)),
+    sa.Column('row_hash', sa.BigInteger),
+    sa.Column('date_creation', sa.DateTime, server_default=sa.func.current_timestamp()),
+    sa.Column('date_modification', sa.DateTime),
+    sa.Index('idx_clients_segment', 'segment'),
+    sa.Index('idx_clients_client_id', 'client_id', unique=True),
+    sqlite_autoincrement=True
+)
+
+offres_commerciales = sa.Table(
+    'offres_commerciales', metadata,
+    sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column('segment', sa.String(64)),
+    sa.Column('nom_offre', sa.String(128)),
+    sa.Column('description', sa.Text),
+    sa.Column('prix', sa.Float),
+    sa.Column('date_creation', sa.DateTime, server_default=sa.func.current_timestamp()),
+    sqlite_autoincrement=True
+)
+
+segment_runs = sa.Table(
+    'segment_runs', metadata,
+    sa.Column('run_id', sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column('date_run', sa.DateTime, nullable=False, server_default=sa.func.current_timestamp()),
+    sa.Column('source', sa.String(255)),
+    sa.Column('nombre_clients', sa.Integer, nullable=False, server_default='0'),
+    sa.Index('idx_segment_runs_date', 'date_run'),
+    sqlite_autoincrement=True
+)
+
+segment_codes = sa.Table(
+    'segment_codes', metadata,
+    sa.Column('code', sa.Integer, primary_key=True),
+    sa.Column('segment', sa.String(64), nullable=False, unique=True)
+)
+
+segment_history = sa.Table(
+    'segment_history', metadata,
+    sa.Column('client_id', sa.BigInteger, primary_key=True, autoincrement=False),
+    sa.Column('run_id', sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column('segment_code', sa.Integer, nullable=False),
+    sa.Index('idx_segment_history_run', 'run_id', 'segment_code'),
+    sqlite_with_rowid=False
+)
+
+affectations_offres = sa.Table(
+    'affectations_offres', metadata,
+    sa.Column('client_id', sa.BigInteger, primary_key=True, autoincrement=False),
+    sa.Column('segment', sa.String(64)),
+    sa.Column('nom_offre', sa.String(128), nullable=False),
+    sa.Column('kpis', sa.Integer, nullable=False, server_default='0'),
+    sa.Column('date_affectation', sa.DateTime, server_default=sa.func.current_timestamp()),
+    sa.Index('idx_affectations_offre', 'nom_offre')
+)
+
+schema_migrations = sa.Table(
+    'schema_migrations', sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column('description', sa.String(255)),
+    sa.Column('date_application', sa.DateTime, server_default=sa.func.current_timestamp())
+)
+
+def _initial_schema(connection):
+    """Tables des clients, des offres et de l'historique des segments."""
+    metadata.create_all(connection, checkfirst=True, tables=[
+        clients, offres_commerciales, segment_runs, segment_codes, segment_history
+    ])
+
+def _add_client_zone(connection):
+    """Zone géographique des clients (bases créées avant son ajout)."""
+    columns = {column['name'] for column in sa.inspect(connection).get_columns('clients')}
+    if 'zone' not in columns:
+        connection.execute(sa.text('ALTER TABLE clients ADD COLUMN zone VARCHAR(64)'))
+
+def _add_offer_assignments(connection):
+    """Affectations des offres aux clients."""
+    affectations_offres.create(connection, checkfirst=True)
+
+def _add_client_kpis(connection):
+    """Satisfaction et fidélité des clients (KPIs des règles d'offres)."""
+    columns = {column['name'] for column in sa.inspect(connection).get_columns('clients')}
+    for name in ('satisfaction', 'fidelite'):
+        if name not in columns:
+            connection.execute(sa.text(f'ALTER TABLE clients ADD COLUMN {name} FLOAT'))
+
+# Migrations du schéma, appliquées dans l'ordre : (version, description,
+# fonction recevant une connexion en transaction). Une migration publiée
+# n'est plus modifiée ; un changement de schéma ajoute une version.
+MIGRATIONS = [
+    (1, 'Schéma initial : clients, offres et historique des segments', _initial_schema),
+    (2, 'Zone géographique des clients', _add_client_zone),
+    (3, 'Affectations des offres aux clients', _add_offer_assignments),
+    (4, 'Satisfaction et fidélité des clients', _add_client_kpis),
+]
+
+def upgrade(engine):
+    """
+    Applique les migrations qui ne le sont pas encore.
+
+    Args:
+        engine (sa.Engine): Moteur de la base
+
+    Returns:
+        int: Version du schéma
+    """
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(connection.execute(sa.select(schema_migrations.c.version)).scalars())
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(connection)
+            connection.execute(schema_migrations.insert(), {'version': version, 'description': description})
+            applied.add(version)
+            logger.info(f"Migration {version} appliquée : {description}")
+    return max(applied, default=0)
+
+def create_engine(url, **params):
+    """
+    Crée un moteur SQLAlchemy avec un pool de connexions.
+
+    Les bases serveur utilisent un pool borné (pool_size + max_overflow)
+    avec test des connexions avant emploi. Une base SQLite fichier passe en
+    journal WAL ; une base SQLite en mémoire partage une seule connexion.
+
+    Args:
+        url (str): URL SQLAlchemy de la base
+        **params: Réglages du pool (DATABASE_ENGINE_PARAMS par défaut)
+
+    Returns:
+        sa.Engine: Moteur de la base
+    """
+    params = {**DATABASE_ENGINE_PARAMS, **params}
+    url = sa.engine.make_url(url)
+    kwargs = {'pool_pre_ping': True}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        kwargs['poolclass'] = sa.pool.StaticPool
+        kwargs['connect_args'] = {'check_same_thread': False}
+    else:
+        kwargs.update(
+            pool_size=params['pool_size'],
+            max_overflow=params['max_overflow'],
+            pool_recycle=params['pool_recycle']
+        )
+        if url.get_backend_name() == 'sqlite':
+            kwargs['connect_args'] = {'timeout': DATABASE_PARAMS['timeout']}
+    engine = sa.create_engine(url, **kwargs)
+
+    if url.get_backend_name() == 'sqlite':
+        @sa.event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.close()
+    return engine
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(url):
+    """
+    Renvoie le moteur partagé d'une URL, créé et migré au premier appel.
+
+    Args:
+        url (str): URL SQLAlchemy de la base
+
+    Returns:
+        sa.Engine: Moteur de la base
+    """
+    with _engines_lock:
+        if url not in _engines:
+            engine = create_engine(url)
+            upgrade(engine)
+            _engines[url] = engine
+        return _engines[url]
+
+@atexit.register
+def close_engines():
+    """Ferme les connexions de tous les moteurs partagés."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+class EngineDatabaseManager(DatabaseManager):
+    """
+    Gestionnaire de base sur un moteur SQLAlchemy.
+
+    Mêmes méthodes publiques que DatabaseManager ; chaque opération emprunte
+    une connexion au pool du moteur et la rend à la fin. Les statistiques par
+    segment sont calculées à la lecture (GROUP BY sur idx_clients_segment)
+    plutôt que par triggers, propres à SQLite.
+
+    Args:
+        url (str): URL SQLAlchemy de la base (DATABASE_ENGINE_PARAMS par défaut)
+        engine (sa.Engine): Moteur à utiliser à la place du moteur partagé
+    """
+
+    def __init__(self, url=None, engine=None):
+        self.engine = engine or get_engine(url or DATABASE_ENGINE_PARAMS['url'])
+        if engine is not None:
+            upgrade(engine)
+        self.db_path = self.engine.url.render_as_string(hide_password=True)
+
+    def create_tables(self):
+        """Met le schéma à jour par les migrations."""
+        upgrade(self.engine)
+
+    def bulk_import(self, csv_path, batch_size=None, replace=True):
+        """
+        Charge un fichier CSV dans la table clients, par lots.
+
+        Chaque bloc est inséré par executemany, le tout dans une seule
+        transaction.
+
+        Args:
+            csv_path (str): Chemin du fichier CSV
+            batch_size (int): Lignes par lot (DATABASE_PARAMS par défaut)
+            replace (bool): Vide la table avant le chargement
+
+        Returns:
+            dict: Lignes chargées, durée (s) et débit (lignes/s)
+        """
+        batch_size = batch_size or DATABASE_PARAMS['batch_size']
+        sources = self._client_sources(csv_path)
+        columns = [*sources, 'row_hash']
+        start = time.perf_counter()
+        rows = 0
+        with self.engine.begin() as connection:
+            if replace:
+                connection.execute(clients.delete())
+            for chunk in pd.read_csv(csv_path, usecols=list(sources.values()), chunksize=batch_size):
+                records = [dict(zip(columns, row)) for row in self._chunk_rows(chunk, sources)]
+                connection.execute(clients.insert(), records)
+                rows += len(chunk)
+
+        stats = self._timing(rows, start)
+        logger.info(
+            f"{rows:,} clients chargés en {stats['seconds']:.2f} s "
+            f"({stats['rows_per_second'] or 0:,.0f} lignes/s)"
+        )
+        return stats
+
+    def upsert_import(self, csv_path, batch_size=None):
+        """
+        Met à jour la table clients à partir d'un CSV, par client_id.
+
+        Pour chaque lot, les empreintes existantes sont lues par client_id :
+        les nouveaux clients sont insérés et les lignes dont l'empreinte a
+        changé mises à jour, par executemany, dans la transaction du lot.
+        Les lignes inchangées ne sont pas réécrites.
+
+        Args:
+            csv_path (str): Chemin du fichier CSV (avec une colonne client_id)
+            batch_size (int): Lignes par lot (DATABASE_PARAMS par défaut)
+
+        Returns:
+            dict: Clients insérés, mis à jour, inchangés et rejetés (sans
+            client_id), durée (s) et débit (lignes/s)
+        """
+        batch_size = batch_size or DATABASE_PARAMS['batch_size']
+        sources = self._client_sources(csv_path)
+        if 'client_id' not in sources:
+            raise ValueError(f"L'import incrémental exige une colonne client_id dans {csv_path}")
+
+        columns = [*sources, 'row_hash']
+        key = columns.index('client_id')
+        values = {column: sa.bindparam(f'valeur_{column}') for column in columns if column != 'client_id'}
+        values['date_modification'] = sa.func.current_timestamp()
+        update = clients.update().where(clients.c.client_id == sa.bindparam('cle_client_id')).values(values)
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0}
+        start = time.perf_counter()
+        for chunk in pd.read_csv(csv_path, usecols=list(sources.values()), chunksize=batch_size):
+            missing = chunk[sources['client_id']].isna()
+            if missing.any():
+                counts['rejected'] += int(missing.sum())
+                chunk = chunk[~missing]
+            # Un client répété dans le lot : la dernière ligne l'emporte,
+            # comptée comme une mise à jour (comme avec ON CONFLICT)
+            records = {row[key]: row for row in self._chunk_rows(chunk, sources)}
+            counts['updated'] += len(chunk) - len(records)
+
+            with self.engine.begin() as connection:
+                hashes = self._row_hashes(connection, list(records))
+                new = [dict(zip(columns, row)) for client_id, row in records.items() if client_id not in hashes]
+                changed = [
+                    {'cle_client_id': client_id,
+                     **{f'valeur_{column}': value for column, value in zip(columns, row) if column != 'client_id'}}
+                    for client_id, row in records.items()
+                    if client_id in hashes and hashes[client_id] != row[-1]
+                ]
+                if new:
+                    connection.execute(clients.insert(), new)
+                if changed:
+                    connection.execute(update, changed)
+            counts['inserted'] += len(new)
+            counts['updated'] += len(changed)
+            counts['unchanged'] += len(records) - len(new) - len(changed)
+
+        return self._upsert_stats(counts, start)
+
+    def _row_hashes(self, connection, client_ids):
+        """Empreintes enregistrées des clients existants parmi client_ids."""
+        query = sa.select(clients.c.client_id, clients.c.row_hash).where(
+            clients.c.client_id.in_(sa.bindparam('ids', expanding=True))
+        )
+        hashes = {}
+        for i in range(0, len(client_ids), _LOOKUP_SIZE):
+            hashes.update(connection.execute(query, {'ids': client_ids[i:i + _LOOKUP_SIZE]}).tuples().all())
+        return hashes
+
+    def refresh_segment_stats(self):
+        """Sans objet : les statistiques par segment sont calculées à la lecture."""
+
+    def read_sql(self, query, params=None):
+        """Exécute une requête de lecture (paramètres nommés :nom) sur le pool."""
+        with self.engine.connect() as connection:
+            return pd.read_sql_query(sa.text(query), connection, params=params)
+
+    def _table(self, table_name):
+        """Table de la base, décrite par réflexion."""
+        try:
+            return sa.Table(table_name, sa.MetaData(), autoload_with=self.engine)
+        except sa.exc.NoSuchTableError:
+            raise ValueError(f"Table inconnue : {table_name}") from None
+
+    def iter_table(self, table_name, chunksize=None, where=None, params=None):
+        """
+        Lit une table par blocs, avec un curseur côté serveur (stream_results).
+
+        Seul le bloc courant est en mémoire. Une table vide (ou aucune ligne
+        retenue) donne un unique bloc vide, qui porte les noms des colonnes.
+
+        Args:
+            table_name (str): Nom de la table
+            chunksize (int): Lignes par bloc (DATABASE_PARAMS par défaut)
+            where (str): Condition SQL sur les lignes (paramètres nommés :nom)
+            params (dict): Valeurs des paramètres de where
+
+        Yields:
+            pd.DataFrame: Bloc de lignes
+        """
+        table = self._table(table_name)
+        chunksize = chunksize or DATABASE_PARAMS['read_chunksize']
+        query = sa.select(table)
+        if where:
+            query = query.where(sa.text(where).bindparams(**(params or {})))
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=chunksize).execute(query)
+            columns = list(result.keys())
+            empty = True
+            for rows in result.partitions():
+                empty = False
+                yield pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+            if empty:
+                yield pd.DataFrame(columns=columns)
+
+    def _column_types(self, table_name):
+        """Colonnes d'une table et leur type simplifié ('int', 'float' ou 'str')."""
+        columns = []
+        for column in self._table(table_name).columns:
+            if isinstance(column.type, sa.Integer):
+                kind = 'int'
+            elif isinstance(column.type, sa.Numeric):
+                kind = 'float'
+            else:
+                kind = 'str'
+            columns.append((column.name, kind))
+        return columns
+
+    def get_segment_stats(self):
+        """Récupère les statistiques par segment (agrégées à la lecture)."""
+        averages = ''.join(
+            f",\n            AVG({column}) as {name}"
+            for column, name in SEGMENT_STATS_COLUMNS.items()
+        )
+        query = f'''
+        SELECT
+            segment,
+            COUNT(*) as nombre_clients{averages}
+        FROM clients
+        GROUP BY segment
+        ORDER BY segment
+        '''
+        return self.read_sql(query)
+
+    def record_segment_snapshot(self, source=None):
+        """
+        Enregistre les segments actuels des clients comme un nouvel instantané.
+
+        Args:
+            source (str): Origine de l'instantané (fichier importé, etc.)
+
+        Returns:
+            int: Identifiant de l'exécution (run_id)
+        """
+        with self.engine.begin() as connection:
+            run_id = connection.execute(
+                segment_runs.insert().values(source=source)
+            ).inserted_primary_key[0]
+            known = set(connection.execute(sa.select(segment_codes.c.segment)).scalars())
+            segments = connection.execute(
+                sa.select(clients.c.segment).distinct()
+                .where(clients.c.segment.is_not(None), clients.c.segment != '')
+            ).scalars()
+            missing = [{'segment': segment} for segment in segments if segment not in known]
+            if missing:
+                connection.execute(segment_codes.insert(), missing)
+            snapshot = (
+                sa.select(clients.c.client_id, sa.literal(run_id, sa.Integer), segment_codes.c.code)
+                .join(segment_codes, segment_codes.c.segment == clients.c.segment)
+                .where(clients.c.client_id.is_not(None))
+                .order_by(clients.c.client_id)
+            )
+            rows = connection.execute(
+                segment_history.insert().from_select(['client_id', 'run_id', 'segment_code'], snapshot)
+            ).rowcount
+            connection.execute(
+                segment_runs.update().where(segment_runs.c.run_id == run_id).values(nombre_clients=rows)
+            )
+        logger.info(f"Instantané {run_id} des segments : {rows:,} clients historisés")
+        return run_id
+
+    def add_commercial_offer(self, segment, nom_offre, description, prix):
+        """Ajoute une offre commerciale."""
+        with self.engine.begin() as connection:
+            connection.execute(offres_commerciales.insert(), {
+                'segment': segment, 'nom_offre': nom_offre,
+                'description': description, 'prix': prix
+            })
+
+    def add_commercial_offers(self, offers):
+        """
+        Ajoute des offres commerciales en une seule transaction.
+
+        Args:
+            offers (iterable): Tuples (segment, nom_offre, description, prix)
+
+        Returns:
+            int: Nombre d'offres ajoutées
+        """
+        columns = ['segment', 'nom_offre', 'description', 'prix']
+        records = [dict(zip(columns, offer)) for offer in offers]
+        if records:
+            with self.engine.begin() as connection:
+                connection.execute(offres_commerciales.insert(), records)
+        return len(records)
+
+    def save_offer_assignments(self, chunks):
+        """
+        Remplace les affectations d'offres par celles des blocs fournis.
+
+        Les blocs sont insérés par executemany dans une seule transaction :
+        les lecteurs voient les affectations précédentes jusqu'à la
+        validation.
+
+        Args:
+            chunks (iterable): Blocs (pd.DataFrame) de colonnes
+                ASSIGNMENT_COLUMNS, un client_id unique par ligne
+
+        Returns:
+            dict: Lignes écrites, durée (s) et débit (lignes/s)
+        """
+        start = time.perf_counter()
+        rows = 0
+        with self.engine.begin() as connection:
+            connection.execute(affectations_offres.delete())
+            for chunk in chunks:
+                if len(chunk):
+                    records = [dict(zip(ASSIGNMENT_COLUMNS, row)) for row in self._assignment_rows(chunk)]
+                    connection.execute(affectations_offres.insert(), records)
+                    rows += len(chunk)
+
+        stats = self._timing(rows, start)
+        logger.info(
+            f"{rows:,} affectations d'offres enregistrées en {stats['seconds']:.2f} s "
+            f"({stats['rows_per_second'] or 0:,.0f} lignes/s)"
+        )
+        return stats
+
+    def source(self):
+        """Description picklable de la base, rouverte par open_source dans un autre processus."""
+        return ('engine', self.engine.url)
+
+    def close(self):
+        """Sans objet : les connexions sont rendues au pool après chaque opération."""
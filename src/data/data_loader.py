@@ -83,7 +83,98 @@ class DataLoader:
         self.feature_names = df_processed.columns.tolist()
         
         return df_processed
-    
+
+    def preprocess_csv(self, input_file, output_file, chunksize: int, dtype: str = 'float64') -> int:
+        """
+        Prétraite un fichier CSV par blocs, sans le charger en entier.
+
+        Une première passe calcule les statistiques (moyennes et variances
+        fusionnées bloc par bloc, fréquences des modalités) ; la seconde
+        transforme chaque bloc et l'ajoute au fichier de sortie. Le résultat
+        est celui de preprocess_data sur le fichier entier.
+
+        Parameters
+        ----------
+        input_file : str or Path
+            Fichier CSV brut
+        output_file : str, Path or file
+            Fichier de sortie (chemin ou fichier texte ouvert en écriture)
+        chunksize : int
+            Nombre de lignes par bloc
+        dtype : str, default='float64'
+            Précision des variables numériques normalisées
+
+        Returns
+        -------
+        int
+            Nombre de lignes prétraitées
+        """
+        columns = pd.read_csv(input_file, nrows=0).columns
+        numerical_cols = [col for col in PREPROCESSING_PARAMS['numerical_columns'] if col in columns]
+        categorical_cols = [col for col in PREPROCESSING_PARAMS['categorical_columns'] if col in columns]
+
+        # Passe 1 : statistiques fusionnées bloc par bloc (formule de Chan)
+        n_rows = 0
+        count = np.zeros(len(numerical_cols))
+        mean = np.zeros(len(numerical_cols))
+        m2 = np.zeros(len(numerical_cols))
+        frequencies = {col: pd.Series(dtype='int64') for col in categorical_cols}
+        if numerical_cols or categorical_cols:
+            for chunk in pd.read_csv(input_file, usecols=numerical_cols + categorical_cols, chunksize=chunksize):
+                n_rows += len(chunk)
+                values = chunk[numerical_cols].to_numpy(dtype=np.float64)
+                chunk_count = (~np.isnan(values)).sum(axis=0)
+                chunk_mean = np.nansum(values, axis=0) / np.maximum(chunk_count, 1)
+                chunk_m2 = np.nansum((values - chunk_mean) ** 2, axis=0)
+                total = count + chunk_count
+                delta = chunk_mean - mean
+                mean += delta * chunk_count / np.maximum(total, 1)
+                m2 += chunk_m2 + delta ** 2 * count * chunk_count / np.maximum(total, 1)
+                count = total
+                for col in categorical_cols:
+                    frequencies[col] = frequencies[col].add(chunk[col].value_counts(), fill_value=0)
+
+        # Les valeurs imputées par la moyenne n'ajoutent pas de variance
+        mean[count == 0] = np.nan
+        scale = np.sqrt(m2 / max(n_rows, 1))
+        scale[scale == 0] = 1.0
+        if numerical_cols:
+            self.scaler.mean_ = mean
+            self.scaler.var_ = scale ** 2
+            self.scaler.scale_ = scale
+            self.scaler.n_samples_seen_ = n_rows
+            self.scaler.n_features_in_ = len(numerical_cols)
+            self.scaler.feature_names_in_ = np.array(numerical_cols, dtype=object)
+        modes = {}
+        for col in categorical_cols:
+            counts = frequencies[col]
+            # Même modalité que mode()[0] : la plus petite en cas d'égalité
+            modes[col] = counts[counts == counts.max()].index.min()
+            le = LabelEncoder()
+            le.classes_ = np.array(sorted(counts.index))
+            self.label_encoders[col] = le
+
+        # Passe 2 : transformation et écriture bloc par bloc
+        n_rows = 0
+        own_file = isinstance(output_file, (str, Path))
+        f = open(output_file, 'w', encoding='utf-8', newline='') if own_file else output_file
+        try:
+            for chunk in pd.read_csv(input_file, chunksize=chunksize):
+                for i, col in enumerate(numerical_cols):
+                    chunk[col] = chunk[col].fillna(mean[i])
+                for col in categorical_cols:
+                    chunk[col] = self.label_encoders[col].transform(chunk[col].fillna(modes[col]))
+                if numerical_cols:
+                    chunk[numerical_cols] = ((chunk[numerical_cols] - mean) / scale).astype(dtype)
+                chunk.to_csv(f, header=(n_rows == 0), index=False)
+                n_rows += len(chunk)
+        finally:
+            if own_file:
+                f.close()
+
+        self.feature_names = columns.tolist()
+        return n_rows
+
     def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """Gère les valeurs manquantes."""
         # Pour les variables numériques
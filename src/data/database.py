@@ -1,37 +1,463 @@
 """
 Module de gestion de la base de données SQL.
+
+Les connexions sont fournies par un pool par base : chaque thread reçoit sa
+propre connexion en écriture et sa connexion en lecture seule, réutilisées
+d'un gestionnaire à l'autre. Un DatabaseManager peut donc être créé dans
+chaque requête ou chaque export sans rouvrir de connexion ni recréer les
+tables.
 """
 
+import atexit
+import gzip
+import itertools
+import logging
 import sqlite3
+import threading
+import time
+import weakref
 import pandas as pd
 from pathlib import Path
+import sys
 import os
 
-class DatabaseManager:
-    def __init__(self, db_path='data/telecom.db'):
-        """Initialise la connexion à la base de données."""
-        self.db_path = db_path
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
-        self.create_tables()
-    
-    def create_tables(self):
-        """Crée les tables nécessaires si elles n'existent pas."""
-        cursor = self.conn.cursor()
-        
-        # Table des clients
-        cursor.execute('''
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import DATABASE_PARAMS, DATABASE_ENGINE_PARAMS
+
+logger = logging.getLogger(__name__)
+
+# Colonnes chargées dans la table clients, avec les noms acceptés dans les
+# CSV (par ordre de préférence) : fichiers du générateur, des données de
+# test ou de la segmentation
+CLIENT_COLUMNS = {
+    'client_id': ('client_id', 'customer_id'),
+    'age': ('age',),
+    'montant_consommation': ('montant_consommation', 'consommation_mensuelle'),
+    'nombre_appels': ('nombre_appels',),
+    'volume_data': ('volume_data', 'utilisation_data'),
+    'nombre_sms': ('nombre_sms',),
+    'satisfaction': ('satisfaction',),
+    'fidelite': ('fidelite',),
+    'zone': ('zone_geographique', 'zone'),
+    'segment': ('segment_label', 'segment')
+}
+
+# Colonnes ajoutées à clients après sa création initiale (bases existantes)
+ADDED_CLIENT_COLUMNS = {
+    'client_id': 'INTEGER',
+    'row_hash': 'INTEGER',
+    'date_modification': 'TIMESTAMP',
+    'zone': 'TEXT',
+    'satisfaction': 'FLOAT',
+    'fidelite': 'FLOAT'
+}
+
+# Schéma typé de la table clients
+CLIENTS_TABLE = '''
         CREATE TABLE IF NOT EXISTS clients (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER,
             age INTEGER,
             montant_consommation FLOAT,
             nombre_appels INTEGER,
             volume_data FLOAT,
             nombre_sms INTEGER,
+            satisfaction FLOAT,
+            fidelite FLOAT,
+            zone TEXT,
             segment TEXT,
-            date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            row_hash INTEGER,
+            date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            date_modification TIMESTAMP
         )
-        ''')
+        '''
+
+# Colonnes d'origine de clients : absentes, la table vient d'un ancien
+# import (to_sql, colonnes du CSV) et doit être migrée
+_CLIENT_BASE_COLUMNS = {'id', *CLIENT_COLUMNS} - set(ADDED_CLIENT_COLUMNS)
+
+# Moyennes de get_segment_stats : colonne de clients -> nom du résultat
+SEGMENT_STATS_COLUMNS = {
+    'montant_consommation': 'consommation_moyenne',
+    'nombre_appels': 'appels_moyens',
+    'volume_data': 'data_moyenne',
+    'nombre_sms': 'sms_moyens'
+}
+
+# Clé des statistiques : segment, NULL compris (une clé primaire NULL ne
+# déclencherait pas le ON CONFLICT)
+_SEGMENT_KEY = "IFNULL({row}.segment, '')"
+
+# Colonnes des affectations d'offres écrites par save_offer_assignments
+ASSIGNMENT_COLUMNS = ['client_id', 'segment', 'nom_offre', 'kpis']
+
+ASSIGNMENTS_INDEX = (
+    'CREATE INDEX IF NOT EXISTS idx_affectations_offre ON affectations_offres (nom_offre)'
+)
+
+def _segment_stats_table():
+    """Table segment_stats : effectif, sommes et effectifs non nuls par segment."""
+    columns = ''.join(
+        f",\n            somme_{column} FLOAT NOT NULL DEFAULT 0"
+        f",\n            n_{column} INTEGER NOT NULL DEFAULT 0"
+        for column in SEGMENT_STATS_COLUMNS
+    )
+    return f'''
+        CREATE TABLE IF NOT EXISTS segment_stats (
+            segment TEXT PRIMARY KEY,
+            nombre_clients INTEGER NOT NULL DEFAULT 0{columns}
+        )
+        '''
+
+def _add_to_stats(row):
+    """Instruction ajoutant la ligne row (NEW) aux statistiques de son segment."""
+    columns = ['nombre_clients']
+    values = ['1']
+    for column in SEGMENT_STATS_COLUMNS:
+        columns += [f'somme_{column}', f'n_{column}']
+        values += [f'IFNULL({row}.{column}, 0)', f'{row}.{column} IS NOT NULL']
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in columns)
+    return (
+        f"INSERT INTO segment_stats (segment, {', '.join(columns)}) "
+        f"VALUES ({_SEGMENT_KEY.format(row=row)}, {', '.join(values)}) "
+        f"ON CONFLICT (segment) DO UPDATE SET {updates};"
+    )
+
+def _remove_from_stats(row):
+    """Instructions retirant la ligne row (OLD) des statistiques de son segment."""
+    updates = ['nombre_clients = nombre_clients - 1']
+    for column in SEGMENT_STATS_COLUMNS:
+        updates += [
+            f'somme_{column} = somme_{column} - IFNULL({row}.{column}, 0)',
+            f'n_{column} = n_{column} - ({row}.{column} IS NOT NULL)'
+        ]
+    key = _SEGMENT_KEY.format(row=row)
+    return (
+        f"UPDATE segment_stats SET {', '.join(updates)} WHERE segment = {key}; "
+        f"DELETE FROM segment_stats WHERE segment = {key} AND nombre_clients <= 0;"
+    )
+
+def _segment_stats_triggers():
+    """Triggers maintenant segment_stats à chaque écriture dans clients."""
+    watched = ', '.join(['segment', *SEGMENT_STATS_COLUMNS])
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS clients_stats_insert AFTER INSERT ON clients "
+        f"BEGIN {_add_to_stats('NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS clients_stats_delete AFTER DELETE ON clients "
+        f"BEGIN {_remove_from_stats('OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS clients_stats_update AFTER UPDATE OF {watched} ON clients "
+        f"BEGIN {_remove_from_stats('OLD')} {_add_to_stats('NEW')} END"
+    ]
+
+def _native_columns(frame):
+    """Colonnes d'un DataFrame en listes de types Python natifs, NaN -> NULL."""
+    columns = []
+    for name in frame.columns:
+        column = frame[name]
+        if column.isna().any():
+            column = column.astype(object).where(column.notna(), None)
+        columns.append(column.tolist())
+    return columns
+
+def _file_format(output_path, file_format=None):
+    """Format d'un fichier d'export, déduit de son extension par défaut."""
+    if file_format is not None:
+        return file_format
+    if output_path.suffix == '.parquet':
+        return 'parquet'
+    if output_path.suffix == '.gz':
+        return 'csv.gz'
+    return 'csv'
+
+def write_chunks(chunks, output_path, file_format=None, columns=None):
+    """
+    Écrit des blocs de lignes dans un fichier, en mémoire constante.
+    
+    Le fichier est écrit sous un nom temporaire puis renommé : un lecteur
+    (Power BI) ne voit jamais un export partiel.
+    
+    Args:
+        chunks (iterable): Blocs (pd.DataFrame) de mêmes colonnes
+        output_path (str): Fichier de sortie
+        file_format (str): 'csv', 'csv.gz' ou 'parquet' (déduit de
+            l'extension par défaut) ; Parquet nécessite pyarrow
+        columns (list): Colonnes et types simplifiés ('int', 'float' ou
+            'str') du schéma Parquet (déduit du premier bloc par défaut)
+        
+    Returns:
+        int: Nombre de lignes écrites
+    """
+    output_path = Path(output_path)
+    file_format = _file_format(output_path, file_format)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    
+    rows = 0
+    try:
+        if file_format == 'parquet':
+            rows = _write_parquet(chunks, tmp_path, columns)
+        elif file_format in ('csv', 'csv.gz'):
+            if file_format == 'csv.gz':
+                f = gzip.open(tmp_path, 'wt', encoding='utf-8', newline='',
+                              compresslevel=DATABASE_PARAMS['gzip_level'])
+            else:
+                f = open(tmp_path, 'w', encoding='utf-8', newline='')
+            with f:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(f, header=(i == 0), index=False)
+                    rows += len(chunk)
+        else:
+            raise ValueError(f"Format d'export inconnu : {file_format}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return rows
+
+def _write_parquet(chunks, path, columns=None):
+    """Écrit les blocs dans un fichier Parquet, un groupe de lignes par bloc."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("L'export Parquet nécessite pyarrow (pip install pyarrow)") from e
+    
+    # Schéma identique pour tous les blocs : types déclarés, ou ceux du
+    # premier bloc
+    chunks = iter(chunks)
+    first = next(chunks)
+    if columns is None:
+        schema = pa.Schema.from_pandas(first, preserve_index=False)
+    else:
+        arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string()}
+        schema = pa.schema([pa.field(name, arrow_types[kind]) for name, kind in columns])
+    
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+        for chunk in itertools.chain([first], chunks):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+class ConnectionPool:
+    """
+    Connexions SQLite par thread vers une même base.
+    
+    Chaque thread reçoit une connexion en écriture (journal WAL, pour que les
+    lectures ne bloquent pas les écritures) et une connexion en lecture seule
+    ouverte par URI en mode=ro avec un mmap_size élargi. Les connexions d'un
+    thread sont réutilisées jusqu'à la fin du thread (elles sont alors
+    fermées avec son threading.local) ou la fermeture du pool : des threads
+    de courte durée, un par requête, n'accumulent pas de connexions.
+    
+    Args:
+        db_path (str): Chemin de la base SQLite
+        mmap_size_mb (int): Taille projetée en mémoire des lectures
+            (DATABASE_PARAMS par défaut)
+    """
+    
+    def __init__(self, db_path, mmap_size_mb=None):
+        self.db_path = str(db_path)
+        self.mmap_size = (mmap_size_mb or DATABASE_PARAMS['mmap_size_mb']) << 20
+        self.lock = threading.Lock()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+        self._local = threading.local()
+        self._connections = set()
+        self._generation = 0
+    
+    def _open(self, read_only):
+        # Chaque connexion ne sert qu'à son thread ; check_same_thread=False
+        # permet seulement à close() de toutes les fermer
+        if read_only:
+            uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=DATABASE_PARAMS['timeout'],
+                                   check_same_thread=False)
+            conn.execute(f'PRAGMA mmap_size={self.mmap_size}')
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=DATABASE_PARAMS['timeout'],
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    
+    def connection(self, read_only=False):
+        """
+        Renvoie la connexion du thread courant, ouverte à la première demande.
+        
+        Args:
+            read_only (bool): Connexion en lecture seule
+            
+        Returns:
+            sqlite3.Connection: Connexion propre au thread
+        """
+        name = 'reader' if read_only else 'writer'
+        owner = getattr(self._local, 'owner', None)
+        if owner is None or owner.generation != self._generation:
+            owner = _ThreadConnections(self._generation)
+            self._local.owner = owner
+        conn = getattr(owner, name)
+        if conn is None:
+            conn = self._open(read_only)
+            with self.lock:
+                self._connections.add(conn)
+            setattr(owner, name, conn)
+            # Fermeture quand le thread se termine (ou change de génération)
+            weakref.finalize(owner, self._release, conn)
+        return conn
+    
+    def _release(self, conn):
+        """Ferme une connexion et la retire du pool."""
+        with self.lock:
+            self._connections.discard(conn)
+        conn.close()
+    
+    def close(self):
+        """Ferme les connexions de tous les threads."""
+        with self.lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = set()
+            self._generation += 1
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class _ThreadConnections:
+    """Connexions d'un thread, détenues par son threading.local."""
+    
+    def __init__(self, generation):
+        self.generation = generation
+        self.writer = None
+        self.reader = None
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path):
+    """
+    Renvoie le pool partagé d'une base, créé au premier appel.
+    
+    Args:
+        db_path (str): Chemin de la base SQLite
+        
+    Returns:
+        ConnectionPool: Pool de la base
+    """
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_path)
+        return _pools[key]
+
+@atexit.register
+def close_pools():
+    """Ferme les connexions de tous les pools partagés."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+
+class DatabaseManager:
+    def __init__(self, db_path='data/telecom.db', pool=None):
+        """Initialise l'accès à la base de données (pool partagé par défaut)."""
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.pool = pool or get_pool(db_path)
+        # Les tables ne sont créées qu'une fois par base et par processus ;
+        # le pool n'est marqué prêt qu'une fois le schéma validé
+        if not self.pool.schema_ready:
+            with self.pool.schema_lock:
+                if not self.pool.schema_ready:
+                    self.create_tables()
+                    self.pool.schema_ready = True
+    
+    @property
+    def conn(self):
+        """Connexion en écriture du thread courant."""
+        return self.pool.connection()
+    
+    @property
+    def reader(self):
+        """Connexion en lecture seule du thread courant."""
+        return self.pool.connection(read_only=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def create_tables(self):
+        """
+        Crée les tables nécessaires si elles n'existent pas, en une
+        transaction annulée en cas d'échec.
+        """
+        cursor = self.conn.cursor()
+        if not self.conn.in_transaction:
+            cursor.execute('BEGIN')
+        try:
+            self._create_schema(cursor)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    def _migrate_clients_table(self, cursor, existing):
+        """
+        Migre une table clients d'un ancien import (to_sql, colonnes du CSV)
+        vers le schéma typé, en conservant ses lignes.
+        
+        Args:
+            cursor (sqlite3.Cursor): Curseur de la transaction de create_tables
+            existing (set): Colonnes de la table existante
+        """
+        logger.warning("Schéma de la table clients non conforme (ancien import) : table migrée")
+        cursor.execute('ALTER TABLE clients RENAME TO clients_ancien')
+        cursor.execute(CLIENTS_TABLE)
+        sources = {}
+        for column, candidates in CLIENT_COLUMNS.items():
+            source = next((name for name in candidates if name in existing), None)
+            if source is not None:
+                sources[column] = source
+        if sources:
+            selected = ', '.join(f'"{source}"' for source in sources.values())
+            cursor.execute(
+                f"INSERT INTO clients ({', '.join(sources)}) SELECT {selected} FROM clients_ancien"
+            )
+        cursor.execute('DROP TABLE clients_ancien')
+    
+    def _create_schema(self, cursor):
+        """Instructions de création du schéma (transaction de create_tables)."""
+        # Table des clients (migrée si elle vient d'un ancien import)
+        cursor.execute('PRAGMA table_info(clients)')
+        existing = {row[1] for row in cursor.fetchall()}
+        if existing and not _CLIENT_BASE_COLUMNS <= existing:
+            self._migrate_clients_table(cursor, existing)
+        cursor.execute(CLIENTS_TABLE)
+        cursor.execute('PRAGMA table_info(clients)')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in ADDED_CLIENT_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE clients ADD COLUMN {column} {column_type}')
+        
+        # Index des requêtes par segment et par client
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_segment ON clients (segment)')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_client_id ON clients (client_id)')
+        
+        # Statistiques par segment, maintenues par triggers
+        cursor.execute(_segment_stats_table())
+        for trigger in _segment_stats_triggers():
+            cursor.execute(trigger)
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM segment_stats), EXISTS (SELECT 1 FROM clients)')
+        has_stats, has_clients = cursor.fetchone()
+        if has_clients and not has_stats:
+            self._rebuild_segment_stats(cursor)
         
         # Table des offres commerciales
         cursor.execute('''
@@ -45,32 +471,521 @@ class DatabaseManager:
         )
         ''')
         
-        self.conn.commit()
+        # Offre affectée à chaque client (moteur src/models/offers.py) ;
+        # l'index sur l'offre sert les listes de campagne
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS affectations_offres (
+            client_id INTEGER PRIMARY KEY,
+            segment TEXT,
+            nom_offre TEXT NOT NULL,
+            kpis INTEGER NOT NULL DEFAULT 0,
+            date_affectation TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute(ASSIGNMENTS_INDEX)
+        
+        # Historique des segments : un instantané par exécution, segments
+        # codés en entiers, une ligne (client, exécution) sans rowid
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS segment_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_run TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            source TEXT,
+            nombre_clients INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_segment_runs_date ON segment_runs (date_run)')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS segment_codes (
+            code INTEGER PRIMARY KEY,
+            segment TEXT NOT NULL UNIQUE
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS segment_history (
+            client_id INTEGER NOT NULL,
+            run_id INTEGER NOT NULL,
+            segment_code INTEGER NOT NULL,
+            PRIMARY KEY (client_id, run_id)
+        ) WITHOUT ROWID
+        ''')
+        # Parcours d'un instantané (matrices de migration) : l'index contient
+        # aussi client_id, clé primaire de la table
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_segment_history_run '
+            'ON segment_history (run_id, segment_code)'
+        )
     
-    def import_data(self, csv_path):
-        """Importe les données depuis un fichier CSV."""
-        df = pd.read_csv(csv_path)
-        df.to_sql('clients', self.conn, if_exists='replace', index=False)
+    def import_data(self, csv_path, mode='replace'):
+        """
+        Importe les données depuis un fichier CSV.
+        
+        Args:
+            csv_path (str): Chemin du fichier CSV
+            mode (str): 'replace' (rechargement complet) ou 'upsert'
+                (mise à jour incrémentale par client_id)
+            
+        Returns:
+            dict: Compteurs de l'import
+        """
+        if mode == 'upsert':
+            stats = self.upsert_import(csv_path)
+        elif mode == 'replace':
+            stats = self.bulk_import(csv_path)
+        else:
+            raise ValueError(f"Mode d'import inconnu : {mode}")
         print(f"Données importées avec succès depuis {csv_path}")
+        return stats
+    
+    def _client_sources(self, csv_path):
+        """Colonnes de clients présentes dans le CSV (colonne de la table -> colonne du CSV)."""
+        header = pd.read_csv(csv_path, nrows=0).columns
+        sources = {}
+        for column, candidates in CLIENT_COLUMNS.items():
+            source = next((name for name in candidates if name in header), None)
+            if source is not None:
+                sources[column] = source
+        if not sources:
+            raise ValueError(f"Aucune colonne de la table clients dans {csv_path}")
+        return sources
+    
+    def _chunk_rows(self, chunk, sources):
+        """
+        Lignes d'un bloc prêtes pour executemany, suivies de leur empreinte.
+        
+        L'empreinte (hash 64 bits des colonnes hors client_id) permet à
+        l'upsert de reconnaître les lignes inchangées ; les colonnes
+        numériques sont hachées en float64 pour qu'elle ne dépende pas du
+        type inféré par pandas.
+        """
+        chunk = chunk[list(sources.values())]
+        chunk.columns = list(sources)
+        hashed = chunk.drop(columns='client_id', errors='ignore')
+        numeric = hashed.select_dtypes('number').columns
+        hashed = hashed.astype(dict.fromkeys(numeric, 'float64'))
+        row_hash = pd.util.hash_pandas_object(hashed, index=False).to_numpy().view('int64')
+        columns = _native_columns(chunk)
+        columns.append(row_hash.tolist())
+        return zip(*columns)
+    
+    def bulk_import(self, csv_path, batch_size=None, replace=True):
+        """
+        Charge un fichier CSV dans la table clients, par lots.
+        
+        Le fichier est lu par blocs et inséré avec une requête préparée
+        (executemany) dans une seule transaction, en journal WAL avec
+        synchronous=NORMAL. Les index secondaires et les triggers de la table
+        sont supprimés pendant le chargement ; les index sont reconstruits
+        ensuite et la table segment_stats recalculée en une requête avant
+        de rétablir les triggers. Le schéma typé de create_tables est conservé.
+        
+        Args:
+            csv_path (str): Chemin du fichier CSV
+            batch_size (int): Lignes par lot (DATABASE_PARAMS par défaut)
+            replace (bool): Vide la table avant le chargement
+            
+        Returns:
+            dict: Lignes chargées, durée (s) et débit (lignes/s)
+        """
+        batch_size = batch_size or DATABASE_PARAMS['batch_size']
+        sources = self._client_sources(csv_path)
+        self._tune_for_bulk_load()
+        if replace:
+            self._restore_clients_schema()
+        columns = [*sources, 'row_hash']
+        insert = (
+            f"INSERT INTO clients ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        start = time.perf_counter()
+        rows = 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            indexes, triggers = self._drop_client_objects(cursor)
+            if replace:
+                cursor.execute('DELETE FROM clients')
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'clients'")
+            chunks = pd.read_csv(csv_path, usecols=list(sources.values()), chunksize=batch_size)
+            for chunk in chunks:
+                cursor.executemany(insert, self._chunk_rows(chunk, sources))
+                rows += len(chunk)
+            for sql in indexes:
+                cursor.execute(sql)
+            self._rebuild_segment_stats(cursor)
+            for sql in triggers:
+                cursor.execute(sql)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        stats = self._timing(rows, start)
+        logger.info(
+            f"{rows:,} clients chargés en {stats['seconds']:.2f} s "
+            f"({stats['rows_per_second'] or 0:,.0f} lignes/s)"
+        )
+        return stats
+    
+    def upsert_import(self, csv_path, batch_size=None):
+        """
+        Met à jour la table clients à partir d'un CSV, par client_id.
+        
+        Chaque lot est appliqué dans sa propre transaction avec
+        INSERT ... ON CONFLICT (client_id) DO UPDATE ; la mise à jour n'a
+        lieu que si l'empreinte de la ligne a changé, de sorte que les
+        lignes inchangées ne sont pas réécrites (ni les statistiques par
+        segment recalculées). Le coût suit le volume des changements.
+        
+        Args:
+            csv_path (str): Chemin du fichier CSV (avec une colonne client_id)
+            batch_size (int): Lignes par lot (DATABASE_PARAMS par défaut)
+            
+        Returns:
+            dict: Clients insérés, mis à jour, inchangés et rejetés (sans
+            client_id), durée (s) et débit (lignes/s)
+        """
+        batch_size = batch_size or DATABASE_PARAMS['batch_size']
+        sources = self._client_sources(csv_path)
+        if 'client_id' not in sources:
+            raise ValueError(f"L'import incrémental exige une colonne client_id dans {csv_path}")
+        self._tune_for_bulk_load()
+        
+        columns = [*sources, 'row_hash']
+        updated_columns = [column for column in columns if column != 'client_id']
+        upsert = (
+            f"INSERT INTO clients ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (client_id) DO UPDATE SET "
+            + ', '.join(f'{column} = excluded.{column}' for column in updated_columns)
+            + ", date_modification = CURRENT_TIMESTAMP "
+            f"WHERE clients.row_hash IS NOT excluded.row_hash"
+        )
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0}
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        for chunk in pd.read_csv(csv_path, usecols=list(sources.values()), chunksize=batch_size):
+            missing = chunk[sources['client_id']].isna()
+            if missing.any():
+                counts['rejected'] += int(missing.sum())
+                chunk = chunk[~missing]
+            try:
+                cursor.execute('BEGIN')
+                before = self._client_count(cursor)
+                cursor.executemany(upsert, self._chunk_rows(chunk, sources))
+                # rowcount : lignes insérées ou réellement mises à jour
+                changed = cursor.rowcount
+                inserted = self._client_count(cursor) - before
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            counts['inserted'] += inserted
+            counts['updated'] += changed - inserted
+            counts['unchanged'] += len(chunk) - changed
+        
+        return self._upsert_stats(counts, start)
+    
+    def _timing(self, rows, start):
+        """Lignes traitées, durée (s) et débit (lignes/s) depuis start."""
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None
+        }
+    
+    def _upsert_stats(self, counts, start):
+        """Compteurs d'un import incrémental, journalisés, avec sa durée."""
+        stats = {**counts, **self._timing(sum(counts.values()), start)}
+        if counts['rejected']:
+            logger.warning(f"{counts['rejected']:,} lignes sans client_id ignorées")
+        logger.info(
+            f"Import incrémental de {stats['rows']:,} lignes en {stats['seconds']:.2f} s : "
+            f"{counts['inserted']:,} insérées, {counts['updated']:,} mises à jour, "
+            f"{counts['unchanged']:,} inchangées"
+        )
+        return stats
+    
+    def _client_count(self, cursor):
+        """Nombre de clients, lu dans segment_stats (temps constant)."""
+        cursor.execute('SELECT IFNULL(SUM(nombre_clients), 0) FROM segment_stats')
+        return cursor.fetchone()[0]
+    
+    def _tune_for_bulk_load(self):
+        """Réglages SQLite du chargement en masse."""
+        cursor = self.conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute(f"PRAGMA cache_size=-{DATABASE_PARAMS['cache_size_mb'] * 1024}")
+    
+    def _restore_clients_schema(self):
+        """
+        Rétablit le schéma de clients si un ancien import (to_sql) l'a
+        remplacé depuis l'ouverture de la base (migration de create_tables).
+        """
+        self.create_tables()
     
-    def get_client_data(self):
-        """Récupère toutes les données des clients."""
-        return pd.read_sql_query("SELECT * FROM clients", self.conn)
+    def _drop_client_objects(self, cursor):
+        """
+        Supprime les index secondaires et les triggers de clients.
+        
+        Returns:
+            tuple: Définitions SQL des index et des triggers supprimés
+        """
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') AND tbl_name = 'clients' AND sql IS NOT NULL"
+        )
+        objects = cursor.fetchall()
+        for kind, name, _ in objects:
+            cursor.execute(f'DROP {kind.upper()} "{name}"')
+        return (
+            [sql for kind, _, sql in objects if kind == 'index'],
+            [sql for kind, _, sql in objects if kind == 'trigger']
+        )
+    
+    def _rebuild_segment_stats(self, cursor):
+        """Recalcule segment_stats à partir de la table clients."""
+        columns = ['nombre_clients']
+        aggregates = ['COUNT(*)']
+        for column in SEGMENT_STATS_COLUMNS:
+            columns += [f'somme_{column}', f'n_{column}']
+            aggregates += [f'TOTAL({column})', f'COUNT({column})']
+        key = "IFNULL(segment, '')"
+        cursor.execute('DELETE FROM segment_stats')
+        cursor.execute(
+            f"INSERT INTO segment_stats (segment, {', '.join(columns)}) "
+            f"SELECT {key}, {', '.join(aggregates)} FROM clients GROUP BY {key}"
+        )
+    
+    def refresh_segment_stats(self):
+        """Recalcule entièrement la table segment_stats (après une écriture hors triggers)."""
+        cursor = self.conn.cursor()
+        self._rebuild_segment_stats(cursor)
+        self.conn.commit()
+    
+    def get_client_data(self, chunksize=None):
+        """
+        Récupère toutes les données des clients.
+        
+        Args:
+            chunksize (int): Si renseigné, renvoie un itérateur de blocs de
+                chunksize lignes au lieu d'un DataFrame complet
+        """
+        if chunksize:
+            return self.iter_table('clients', chunksize)
+        return self.read_sql("SELECT * FROM clients")
+    
+    def read_sql(self, query, params=None):
+        """
+        Exécute une requête de lecture (paramètres nommés :nom) sur la
+        connexion en lecture seule.
+        """
+        return pd.read_sql_query(query, self.reader, params=params)
+    
+    def _check_table(self, table_name):
+        cursor = self.reader.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+        if cursor.fetchone() is None:
+            raise ValueError(f"Table inconnue : {table_name}")
+    
+    def iter_table(self, table_name, chunksize=None, where=None, params=None):
+        """
+        Lit une table par blocs, avec un curseur et fetchmany.
+        
+        Seul le bloc courant est en mémoire. Une table vide (ou aucune ligne
+        retenue) donne un unique bloc vide, qui porte les noms des colonnes.
+        
+        Args:
+            table_name (str): Nom de la table
+            chunksize (int): Lignes par bloc (DATABASE_PARAMS par défaut)
+            where (str): Condition SQL sur les lignes (paramètres nommés :nom)
+            params (dict): Valeurs des paramètres de where
+            
+        Yields:
+            pd.DataFrame: Bloc de lignes
+        """
+        self._check_table(table_name)
+        chunksize = chunksize or DATABASE_PARAMS['read_chunksize']
+        cursor = self.reader.cursor()
+        cursor.arraysize = chunksize
+        try:
+            query = f'SELECT * FROM "{table_name}"'
+            if where:
+                query += f' WHERE {where}'
+            cursor.execute(query, params or {})
+            columns = [description[0] for description in cursor.description]
+            first = True
+            while True:
+                rows = cursor.fetchmany()
+                if not rows and not first:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns)
+                if not rows:
+                    break
+                first = False
+        finally:
+            cursor.close()
     
     def get_segment_stats(self):
-        """Récupère les statistiques par segment."""
-        query = '''
+        """
+        Récupère les statistiques par segment.
+        
+        Lues dans la table segment_stats tenue à jour par les triggers : le
+        coût ne dépend que du nombre de segments.
+        """
+        averages = ''.join(
+            f",\n            somme_{column} / NULLIF(n_{column}, 0) as {name}"
+            for column, name in SEGMENT_STATS_COLUMNS.items()
+        )
+        query = f'''
         SELECT 
-            segment,
-            COUNT(*) as nombre_clients,
-            AVG(montant_consommation) as consommation_moyenne,
-            AVG(nombre_appels) as appels_moyens,
-            AVG(volume_data) as data_moyenne,
-            AVG(nombre_sms) as sms_moyens
-        FROM clients
-        GROUP BY segment
+            NULLIF(segment, '') as segment,
+            nombre_clients{averages}
+        FROM segment_stats
+        ORDER BY segment
+        '''
+        return self.read_sql(query)
+    
+    def record_segment_snapshot(self, source=None):
+        """
+        Enregistre les segments actuels des clients comme un nouvel instantané.
+        
+        Les clients sans client_id ou sans segment ne sont pas historisés.
+        Les lignes sont insérées dans l'ordre de client_id, qui est celui de
+        la clé primaire de segment_history.
+        
+        Args:
+            source (str): Origine de l'instantané (fichier importé, etc.)
+        
+        Returns:
+            int: Identifiant de l'exécution (run_id)
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            cursor.execute('INSERT INTO segment_runs (source) VALUES (?)', (source,))
+            run_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT OR IGNORE INTO segment_codes (segment) "
+                "SELECT segment FROM segment_stats WHERE segment != ''"
+            )
+            cursor.execute('''
+            INSERT INTO segment_history (client_id, run_id, segment_code)
+            SELECT c.client_id, ?, sc.code
+            FROM clients c JOIN segment_codes sc ON sc.segment = c.segment
+            WHERE c.client_id IS NOT NULL
+            ORDER BY c.client_id
+            ''', (run_id,))
+            rows = cursor.rowcount
+            cursor.execute('UPDATE segment_runs SET nombre_clients = ? WHERE run_id = ?', (rows, run_id))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        logger.info(f"Instantané {run_id} des segments : {rows:,} clients historisés")
+        return run_id
+    
+    def get_segment_runs(self, start=None, end=None):
+        """
+        Liste les instantanés de segments, éventuellement sur une période.
+        
+        Args:
+            start (str): Date de début incluse (format 'AAAA-MM-JJ[ HH:MM:SS]')
+            end (str): Date de fin exclue
+        
+        Returns:
+            pd.DataFrame: run_id, date_run, source et nombre_clients
+        """
+        query = 'SELECT run_id, date_run, source, nombre_clients FROM segment_runs'
+        conditions, params = self._date_range('date_run', start, end)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        return self.read_sql(query + ' ORDER BY run_id', params)
+    
+    def _date_range(self, column, start, end):
+        """Conditions SQL et paramètres nommés d'une période [start, end)."""
+        conditions, params = [], {}
+        if start is not None:
+            conditions.append(f'{column} >= :start')
+            params['start'] = str(start)
+        if end is not None:
+            conditions.append(f'{column} < :end')
+            params['end'] = str(end)
+        return conditions, params
+    
+    def get_segment_migration(self, from_run=None, to_run=None):
+        """
+        Matrice de migration entre deux instantanés.
+        
+        Seuls les clients présents dans les deux instantanés sont comptés.
+        Chaque ligne de from_run est lue par l'index idx_segment_history_run
+        puis appariée par la clé primaire (client_id, run_id) : le coût suit
+        la taille d'un instantané, pas celle de l'historique.
+        
+        Args:
+            from_run (int): Instantané de départ (avant-dernier par défaut)
+            to_run (int): Instantané d'arrivée (dernier par défaut)
+        
+        Returns:
+            pd.DataFrame: Effectifs, segment de départ en lignes et
+            segment d'arrivée en colonnes
+        """
+        if from_run is None or to_run is None:
+            latest = self.read_sql('SELECT run_id FROM segment_runs ORDER BY run_id DESC LIMIT 2')
+            latest = latest['run_id'].tolist()
+            if len(latest) < 2:
+                raise ValueError("Au moins deux instantanés de segments sont nécessaires")
+            to_run = latest[0] if to_run is None else to_run
+            from_run = latest[1] if from_run is None else from_run
+        
+        query = '''
+        SELECT depart.segment as segment_depart, arrivee.segment as segment_arrivee, m.nombre_clients
+        FROM (
+            SELECT a.segment_code as code_depart, b.segment_code as code_arrivee,
+                   COUNT(*) as nombre_clients
+            FROM segment_history a
+            JOIN segment_history b ON b.client_id = a.client_id AND b.run_id = :to_run
+            WHERE a.run_id = :from_run
+            GROUP BY a.segment_code, b.segment_code
+        ) m
+        JOIN segment_codes depart ON depart.code = m.code_depart
+        JOIN segment_codes arrivee ON arrivee.code = m.code_arrivee
         '''
-        return pd.read_sql_query(query, self.conn)
+        counts = self.read_sql(query, {'from_run': int(from_run), 'to_run': int(to_run)})
+        return counts.pivot_table(
+            index='segment_depart', columns='segment_arrivee',
+            values='nombre_clients', aggfunc='sum', fill_value=0
+        )
+    
+    def get_client_segment_history(self, client_id, start=None, end=None):
+        """
+        Historique des segments d'un client, éventuellement sur une période.
+        
+        Lu par préfixe de la clé primaire (client_id, run_id) : quelques
+        pages quelle que soit la taille de l'historique.
+        
+        Args:
+            client_id (int): Identifiant du client
+            start (str): Date de début incluse
+            end (str): Date de fin exclue
+        
+        Returns:
+            pd.DataFrame: run_id, date_run et segment, par ordre chronologique
+        """
+        conditions, params = self._date_range('r.date_run', start, end)
+        query = '''
+        SELECT h.run_id, r.date_run, sc.segment
+        FROM segment_history h
+        JOIN segment_runs r ON r.run_id = h.run_id
+        JOIN segment_codes sc ON sc.code = h.segment_code
+        WHERE h.client_id = :client_id
+        '''
+        query += ''.join(f' AND {condition}' for condition in conditions)
+        return self.read_sql(query + ' ORDER BY h.run_id',
+                                {**params, 'client_id': int(client_id)})
     
     def add_commercial_offer(self, segment, nom_offre, description, prix):
         """Ajoute une offre commerciale."""
@@ -81,16 +996,178 @@ class DatabaseManager:
         ''', (segment, nom_offre, description, prix))
         self.conn.commit()
     
+    def add_commercial_offers(self, offers):
+        """
+        Ajoute des offres commerciales en une seule transaction.
+        
+        Args:
+            offers (iterable): Tuples (segment, nom_offre, description, prix)
+        
+        Returns:
+            int: Nombre d'offres ajoutées
+        """
+        offers = list(offers)
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        INSERT INTO offres_commerciales (segment, nom_offre, description, prix)
+        VALUES (?, ?, ?, ?)
+        ''', offers)
+        self.conn.commit()
+        return len(offers)
+    
+    def save_offer_assignments(self, chunks):
+        """
+        Remplace les affectations d'offres par celles des blocs fournis.
+        
+        Les blocs sont insérés par executemany dans une seule transaction,
+        l'index des campagnes étant reconstruit à la fin : les lecteurs
+        voient les affectations précédentes jusqu'à la validation.
+        
+        Args:
+            chunks (iterable): Blocs (pd.DataFrame) de colonnes
+                ASSIGNMENT_COLUMNS, un client_id unique par ligne
+        
+        Returns:
+            dict: Lignes écrites, durée (s) et débit (lignes/s)
+        """
+        insert = (
+            f"INSERT INTO affectations_offres ({', '.join(ASSIGNMENT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(ASSIGNMENT_COLUMNS))})"
+        )
+        start = time.perf_counter()
+        rows = 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            cursor.execute('DROP INDEX IF EXISTS idx_affectations_offre')
+            cursor.execute('DELETE FROM affectations_offres')
+            for chunk in chunks:
+                cursor.executemany(insert, self._assignment_rows(chunk))
+                rows += len(chunk)
+            cursor.execute(ASSIGNMENTS_INDEX)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        stats = self._timing(rows, start)
+        logger.info(
+            f"{rows:,} affectations d'offres enregistrées en {stats['seconds']:.2f} s "
+            f"({stats['rows_per_second'] or 0:,.0f} lignes/s)"
+        )
+        return stats
+    
+    def _assignment_rows(self, chunk):
+        """Lignes d'un bloc d'affectations prêtes pour executemany."""
+        return zip(*_native_columns(chunk[ASSIGNMENT_COLUMNS]))
+    
     def get_commercial_offers(self):
         """Récupère toutes les offres commerciales."""
-        return pd.read_sql_query("SELECT * FROM offres_commerciales", self.conn)
+        return self.read_sql("SELECT * FROM offres_commerciales")
     
     def export_to_csv(self, table_name, output_path):
-        """Exporte une table vers un fichier CSV."""
-        df = pd.read_sql_query(f"SELECT * FROM {table_name}", self.conn)
-        df.to_csv(output_path, index=False)
+        """Exporte une table vers un fichier CSV (compressé si le nom finit par .gz)."""
+        self.export_table(table_name, output_path)
         print(f"Données exportées avec succès vers {output_path}")
     
+    def export_table(self, table_name, output_path, chunksize=None, file_format=None,
+                     where=None, params=None):
+        """
+        Exporte une table bloc par bloc, en mémoire constante.
+        
+        Le fichier est écrit sous un nom temporaire puis renommé : un lecteur
+        (Power BI) ne voit jamais un export partiel.
+        
+        Args:
+            table_name (str): Nom de la table
+            output_path (str): Fichier de sortie
+            chunksize (int): Lignes par bloc (DATABASE_PARAMS par défaut)
+            file_format (str): 'csv', 'csv.gz' ou 'parquet' (déduit de
+                l'extension par défaut) ; Parquet nécessite pyarrow
+            where (str): Condition SQL sur les lignes exportées
+                (paramètres nommés :nom)
+            params (dict): Valeurs des paramètres de where
+            
+        Returns:
+            int: Nombre de lignes exportées
+        """
+        chunks = self.iter_table(table_name, chunksize, where, params)
+        columns = None
+        if _file_format(Path(output_path), file_format) == 'parquet':
+            # Schéma tiré des types déclarés, identique pour tous les blocs
+            columns = self._column_types(table_name)
+        rows = write_chunks(chunks, output_path, file_format, columns)
+        logger.info(f"{rows:,} lignes de {table_name} exportées vers {output_path}")
+        return rows
+    
+    def _column_types(self, table_name):
+        """Colonnes d'une table et leur type simplifié ('int', 'float' ou 'str')."""
+        cursor = self.reader.cursor()
+        cursor.execute(f'PRAGMA table_info("{table_name}")')
+        columns = []
+        for _, name, declared, *_ in cursor.fetchall():
+            declared = (declared or '').upper()
+            if 'INT' in declared:
+                kind = 'int'
+            elif any(token in declared for token in ('REAL', 'FLOA', 'DOUB')):
+                kind = 'float'
+            else:
+                kind = 'str'
+            columns.append((name, kind))
+        return columns
+    
+    def source(self):
+        """Description picklable de la base, rouverte par open_source dans un autre processus."""
+        return ('sqlite', self.db_path)
+    
     def close(self):
-        """Ferme la connexion à la base de données."""
-        self.conn.close() 
\ No newline at end of file
+        """
+        Libère le gestionnaire : une transaction non validée du thread est
+        annulée, et les connexions restent dans le pool pour les gestionnaires
+        suivants (fermées par pool.close() ou à la sortie du processus).
+        """
+        self.conn.rollback()
+
+def open_database(url=None, db_path='data/telecom.db'):
+    """
+    Ouvre la base de l'application.
+    
+    Sans URL (argument, variable d'environnement DATABASE_URL ou
+    DATABASE_ENGINE_PARAMS), la base SQLite locale db_path est gérée par
+    DatabaseManager ; sinon par EngineDatabaseManager, sur un moteur
+    SQLAlchemy. Les deux offrent les mêmes méthodes d'import, de
+    statistiques et d'export.
+    
+    Args:
+        url (str): URL SQLAlchemy de la base
+        db_path (str): Base SQLite locale, sans URL
+        
+    Returns:
+        DatabaseManager: Gestionnaire de la base
+    """
+    url = url or os.environ.get('DATABASE_URL') or DATABASE_ENGINE_PARAMS['url']
+    if not url:
+        return DatabaseManager(db_path)
+    from src.data.backend import EngineDatabaseManager
+    return EngineDatabaseManager(url)
+
+def open_source(source):
+    """
+    Ouvre la base décrite par DatabaseManager.source() avec ses propres
+    connexions : un processus worker ne doit pas réutiliser celles héritées
+    du parent par fork.
+    
+    Args:
+        source (tuple): Description de la base
+        
+    Returns:
+        DatabaseManager: Gestionnaire de la base
+    """
+    kind, target = source
+    if kind == 'sqlite':
+        # Base déjà ouverte par le parent : schéma en place
+        pool = ConnectionPool(target)
+        pool.schema_ready = True
+        return DatabaseManager(target, pool=pool)
+    from src.data.backend import EngineDatabaseManager, create_engine
+    return EngineDatabaseManager(engine=create_engine(target))
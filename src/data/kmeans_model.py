@@ -9,11 +9,79 @@ import sys
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from config import RANDOM_STATE, N_CLUSTERS_RANGE, FIGURES_PATH
+from config import RANDOM_STATE, N_CLUSTERS_RANGE, FIGURES_PATH, GAP_STATISTIC_PARAMS
+from src.models.fit_cache import get_fit_cache
+from src.utils.execution import budgeted, process_pool
 
-def find_optimal_clusters(X, n_clusters_range=N_CLUSTERS_RANGE, random_state=RANDOM_STATE):
+def _fit_kmeans(X, n_clusters, random_state, n_init=10, metrics=()):
+    """Fit K-means and compute the requested metrics (cacheable result)."""
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=n_init)
+    cluster_labels = kmeans.fit_predict(X)
+    
+    results = {'inertia': kmeans.inertia_}
+    if n_clusters > 1:
+        if 'silhouette' in metrics:
+            results['silhouette'] = silhouette_score(X, cluster_labels)
+        if 'davies_bouldin' in metrics:
+            results['davies_bouldin'] = davies_bouldin_score(X, cluster_labels)
+    
+    return {
+        'model': kmeans,
+        'centroids': kmeans.cluster_centers_,
+        'labels': cluster_labels,
+        'metrics': results
+    }
+
+def _cached_kmeans(X, n_clusters, random_state, n_init=10, metrics=(), use_cache=True):
     """
-    Find the optimal number of clusters using the Elbow method and Silhouette score.
+    Fit K-means through the on-disk fit cache.
+    
+    Identical data and parameters return the stored centroids, labels and
+    metrics instead of refitting.
+    """
+    params = {
+        'n_clusters': n_clusters,
+        'random_state': random_state,
+        'n_init': n_init,
+        'metrics': list(metrics)
+    }
+    cache = get_fit_cache() if use_cache else None
+    if cache is None:
+        return _fit_kmeans(X, **params)
+    return cache.fit(X, _fit_kmeans, **params)
+
+def _log_dispersions(X, n_clusters_range, random_state, n_init):
+    """Log of the within-cluster dispersion (K-means inertia) for each k."""
+    log_w = []
+    for k in n_clusters_range:
+        kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+        kmeans.fit(X)
+        log_w.append(np.log(max(kmeans.inertia_, np.finfo(np.float32).tiny)))
+    return np.array(log_w)
+
+def _reference_log_dispersions(task):
+    """
+    Generate one reference dataset and cluster it (runs in a worker process).
+    
+    The reference is drawn uniformly inside the bounding box of the data,
+    optionally expressed in the principal-component basis, in float32.
+    """
+    seed, lower, upper, components, mean, n_samples, n_clusters_range, n_init = task
+    rng = np.random.default_rng(seed)
+    reference = rng.uniform(lower, upper, size=(n_samples, len(lower))).astype(np.float32)
+    if components is not None:
+        reference = reference @ components + mean
+    return _log_dispersions(reference, n_clusters_range, seed, n_init)
+
+@budgeted
+def compute_gap_statistic(X, n_clusters_range=N_CLUSTERS_RANGE, random_state=RANDOM_STATE,
+                          n_references=GAP_STATISTIC_PARAMS['n_references'],
+                          reference=GAP_STATISTIC_PARAMS['reference'],
+                          max_samples=GAP_STATISTIC_PARAMS['max_samples'],
+                          n_init=GAP_STATISTIC_PARAMS['n_init'],
+                          n_jobs=GAP_STATISTIC_PARAMS['n_jobs']):
+    """
+    Compute the gap statistic (Tibshirani et al., 2001).
     
     Parameters:
     -----------
@@ -23,36 +91,120 @@ def find_optimal_clusters(X, n_clusters_range=N_CLUSTERS_RANGE, random_state=RAN
         Range of cluster numbers to try
     random_state : int
         Random seed for reproducibility
+    n_references : int
+        Number of reference datasets
+    reference : str
+        'uniform' (bounding box of the features) or 'pca' (bounding box
+        aligned with the principal components)
+    max_samples : int
+        Maximum number of rows used for the data and each reference
+    n_init : int
+        Number of K-means initialisations per fit
+    n_jobs : int or None
+        Number of worker processes for the reference datasets (execution
+        budget by default; each worker gets its share of the threads)
+        
+    Returns:
+    --------
+    tuple
+        (optimal_k, gap, gap_std) where optimal_k is the smallest k with
+        gap[k] >= gap[k+1] - gap_std[k+1]
+    """
+    if reference not in ('uniform', 'pca'):
+        raise ValueError(f"Unknown reference distribution: {reference}")
+    
+    n_clusters_range = list(n_clusters_range)
+    rng = np.random.default_rng(random_state)
+    
+    X = np.asarray(X, dtype=np.float32)
+    if len(X) > max_samples:
+        X = X[rng.choice(len(X), size=max_samples, replace=False)]
+    
+    if reference == 'pca':
+        mean = X.mean(axis=0)
+        _, _, components = np.linalg.svd(X - mean, full_matrices=False)
+        projected = (X - mean) @ components.T
+        lower, upper = projected.min(axis=0), projected.max(axis=0)
+    else:
+        mean, components = None, None
+        lower, upper = X.min(axis=0), X.max(axis=0)
+    
+    seeds = rng.integers(0, 2**31 - 1, size=n_references)
+    tasks = [
+        (int(seed), lower, upper, components, mean, len(X), n_clusters_range, n_init)
+        for seed in seeds
+    ]
+    with process_pool(max_workers=n_jobs) as executor:
+        reference_log_w = np.array(list(executor.map(_reference_log_dispersions, tasks)))
+    
+    log_w = _log_dispersions(X, n_clusters_range, random_state, n_init)
+    gap = reference_log_w.mean(axis=0) - log_w
+    gap_std = reference_log_w.std(axis=0) * np.sqrt(1 + 1 / n_references)
+    
+    optimal_k = n_clusters_range[-1]
+    for i in range(len(n_clusters_range) - 1):
+        if gap[i] >= gap[i + 1] - gap_std[i + 1]:
+            optimal_k = n_clusters_range[i]
+            break
+    
+    return optimal_k, gap, gap_std
+
+@budgeted
+def find_optimal_clusters(X, n_clusters_range=N_CLUSTERS_RANGE, random_state=RANDOM_STATE,
+                          criterion='silhouette', use_cache=True):
+    """
+    Find the optimal number of clusters using the Elbow method and either
+    the Silhouette score or the gap statistic.
+    
+    Parameters:
+    -----------
+    X : numpy.ndarray
+        Feature matrix
+    n_clusters_range : range
+        Range of cluster numbers to try
+    random_state : int
+        Random seed for reproducibility
+    criterion : str
+        'silhouette' or 'gap'; the gap statistic avoids the quadratic cost
+        of the silhouette score
+    use_cache : bool
+        Reuse fits already computed on the same data and parameters
         
     Returns:
     --------
     tuple
         (optimal_k, results_dict)
     """
+    if criterion not in ('silhouette', 'gap'):
+        raise ValueError(f"Unknown criterion: {criterion}")
+    
     results = {
         'n_clusters': list(n_clusters_range),
         'inertia': [],
         'silhouette': []
     }
     
+    metrics = ('silhouette',) if criterion == 'silhouette' else ()
+    
     for k in n_clusters_range:
         # Train K-means model
-        kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=10)
-        kmeans.fit(X)
+        fit = _cached_kmeans(X, k, random_state, metrics=metrics, use_cache=use_cache)
         
         # Get inertia
-        results['inertia'].append(kmeans.inertia_)
+        results['inertia'].append(fit['metrics']['inertia'])
         
         # Get silhouette score (for k > 1)
-        if k > 1:
-            labels = kmeans.labels_
-            silhouette = silhouette_score(X, labels)
-            results['silhouette'].append(silhouette)
-        else:
-            results['silhouette'].append(0)
+        if criterion == 'silhouette':
+            results['silhouette'].append(fit['metrics'].get('silhouette', 0))
     
-    # Find optimal k using silhouette score
-    optimal_k_silhouette = results['n_clusters'][np.argmax(results['silhouette'])]
+    if criterion == 'gap':
+        optimal_k, gap, gap_std = compute_gap_statistic(X, n_clusters_range, random_state)
+        del results['silhouette']
+        results['gap'] = gap.tolist()
+        results['gap_std'] = gap_std.tolist()
+    else:
+        # Find optimal k using silhouette score
+        optimal_k = results['n_clusters'][np.argmax(results['silhouette'])]
     
     # Create elbow method plot
     plt.figure(figsize=(12, 5))
@@ -65,20 +217,26 @@ def find_optimal_clusters(X, n_clusters_range=N_CLUSTERS_RANGE, random_state=RAN
     plt.grid(True)
     
     plt.subplot(1, 2, 2)
-    plt.plot(results['n_clusters'], results['silhouette'], 'ro-')
-    plt.axvline(x=optimal_k_silhouette, color='green', linestyle='--')
+    if criterion == 'gap':
+        plt.errorbar(results['n_clusters'], results['gap'], yerr=results['gap_std'], fmt='ro-', capsize=3)
+        plt.ylabel('Gap Statistic')
+        plt.title(f'Gap Statistic (Optimal k = {optimal_k})')
+    else:
+        plt.plot(results['n_clusters'], results['silhouette'], 'ro-')
+        plt.ylabel('Silhouette Score')
+        plt.title(f'Silhouette Score (Optimal k = {optimal_k})')
+    plt.axvline(x=optimal_k, color='green', linestyle='--')
     plt.xlabel('Number of Clusters')
-    plt.ylabel('Silhouette Score')
-    plt.title(f'Silhouette Score (Optimal k = {optimal_k_silhouette})')
     plt.grid(True)
     
     plt.tight_layout()
     plt.savefig(os.path.join(FIGURES_PATH, 'optimal_clusters.png'))
     plt.close()
     
-    return optimal_k_silhouette, results
+    return optimal_k, results
 
-def train_kmeans(X, n_clusters, random_state=RANDOM_STATE):
+@budgeted
+def train_kmeans(X, n_clusters, random_state=RANDOM_STATE, use_cache=True):
     """
     Train a K-means model.
     
@@ -90,22 +248,17 @@ def train_kmeans(X, n_clusters, random_state=RANDOM_STATE):
         Number of clusters
     random_state : int
         Random seed for reproducibility
+    use_cache : bool
+        Reuse a fit already computed on the same data and parameters
         
     Returns:
     --------
     tuple
         (kmeans_model, cluster_labels, metrics)
     """
-    # Train K-means model
-    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
-    cluster_labels = kmeans.fit_predict(X)
-    
-    # Calculate metrics
-    metrics = {}
-    metrics['inertia'] = kmeans.inertia_
-    
-    if n_clusters > 1:
-        metrics['silhouette'] = silhouette_score(X, cluster_labels)
-        metrics['davies_bouldin'] = davies_bouldin_score(X, cluster_labels)
-    
-    return kmeans, cluster_labels, metrics
\ No newline at end of file
+    fit = _cached_kmeans(
+        X, n_clusters, random_state,
+        metrics=('silhouette', 'davies_bouldin'),
+        use_cache=use_cache
+    )
+    return fit['model'], fit['labels'], dict(fit['metrics'])
\ No newline at end of file
@@ -2,37 +2,400 @@
 Script d'export des données vers Power BI.
 """
 
+import json
+import logging
+import math
 import pandas as pd
+from datetime import datetime
 from pathlib import Path
-from database import DatabaseManager
+import sys
 import os
 
-def export_to_powerbi():
-    """Exporte les données vers le format Power BI."""
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import POWERBI_PARAMS
+from src.data.database import open_database, open_source, write_chunks, SEGMENT_STATS_COLUMNS
+from src.utils.execution import get_budget, process_pool, thread_pool
+
+logger = logging.getLogger(__name__)
+
+# Tables de l'export incrémental : version de chaque ligne (croissante à
+# chaque insertion ou mise à jour), borne haute d'un export (exclue, relevée
+# avant la lecture) et clé des lignes. Une ligne mise à jour figure dans
+# plusieurs partitions : celle de version la plus haute fait foi.
+INCREMENTAL_TABLES = {
+    'clients': {
+        'version': 'COALESCE(date_modification, date_creation)',
+        # Lignes écrites pendant la seconde courante : export suivant
+        'until': 'CURRENT_TIMESTAMP',
+        'key': 'client_id'
+    },
+    'offres_commerciales': {
+        'version': 'id',
+        'until': '(SELECT COALESCE(MAX(id), 0) + 1 FROM offres_commerciales)',
+        'key': 'id'
+    }
+}
+
+MANIFEST_FILE = 'manifest.json'
+
+# Schéma en étoile : colonnes typées des faits clients ('int' ou 'float') ;
+# les mesures de SEGMENT_STATS_COLUMNS sont aussi agrégées par
+# segment x zone x mois. La clé 0 de chaque dimension désigne le membre
+# inconnu (valeur absente).
+STAR_DIR = 'star'
+FACT_COLUMNS = {
+    'client_id': 'int',
+    'segment_key': 'int',
+    'zone_key': 'int',
+    'offre_key': 'int',
+    'mois': 'int',  # AAAAMM de date_creation
+    'age': 'float',
+    **{column: 'float' for column in SEGMENT_STATS_COLUMNS}
+}
+UNKNOWN_MEMBER = 'Non renseigné'
+FILE_EXTENSIONS = {'csv': '.csv', 'csv.gz': '.csv.gz', 'parquet': '.parquet'}
+
+def load_export_manifest(powerbi_dir):
+    """Charge le manifeste de l'export incrémental (vide s'il n'existe pas)."""
+    path = Path(powerbi_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {'tables': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    """Écrit un fichier JSON (écriture atomique)."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _watermark(value):
+    """Valeur de filigrane sérialisable en JSON (entier ou texte)."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    return value if isinstance(value, (int, float, str)) else str(value)
+
+def export_incremental(db, powerbi_dir):
+    """
+    Exporte les lignes nouvelles ou modifiées depuis l'export précédent.
+
+    Pour chaque table de INCREMENTAL_TABLES, les lignes dont la version est
+    comprise entre le filigrane du manifeste et la borne relevée au début de
+    l'export sont écrites dans une nouvelle partition
+    <table>/<table>_NNNNN.csv, puis le filigrane prend la valeur de la borne.
+    Si plus aucune ligne n'est antérieure au filigrane (table rechargée), les
+    partitions de la table sont supprimées et l'export repart de zéro.
+    segment_stats, de quelques lignes, est réécrit en entier.
+
+    Args:
+        db (DatabaseManager): Base source
+        powerbi_dir (Path): Dossier des exports Power BI
+
+    Returns:
+        dict: Manifeste mis à jour
+    """
+    powerbi_dir = Path(powerbi_dir)
+    manifest = load_export_manifest(powerbi_dir)
+    for table_name, spec in INCREMENTAL_TABLES.items():
+        version = spec['version']
+        state = manifest['tables'].setdefault(table_name, {
+            'version': version, 'key': spec['key'], 'watermark': None, 'partitions': []
+        })
+        since = state['watermark']
+        until = _watermark(db.read_sql(f"SELECT {spec['until']} as borne").iat[0, 0])
+
+        if since is not None and state['partitions']:
+            older = db.read_sql(
+                f"SELECT 1 as ancienne FROM {table_name} WHERE {version} < :since LIMIT 1",
+                {'since': since}
+            )
+            if older.empty:
+                logger.info(f"{table_name} rechargée : partitions supprimées, export complet")
+                for partition in state['partitions']:
+                    (powerbi_dir / partition['file']).unlink(missing_ok=True)
+                state['partitions'] = []
+                since = None
+
+        where = f'{version} < :until'
+        params = {'until': until}
+        if since is not None:
+            where += f' AND {version} >= :since'
+            params['since'] = since
+        number = state['partitions'][-1]['number'] + 1 if state['partitions'] else 1
+        partition_file = f'{table_name}/{table_name}_{number:05d}.csv'
+        rows = db.export_table(table_name, powerbi_dir / partition_file, where=where, params=params)
+        if rows:
+            state['partitions'].append({
+                'number': number,
+                'file': partition_file,
+                'rows': rows,
+                'since': since,
+                'until': until,
+                'exported_at': datetime.now().isoformat(timespec='seconds')
+            })
+        else:
+            (powerbi_dir / partition_file).unlink()
+        state['watermark'] = until
+        logger.info(f"{table_name} : {rows:,} lignes nouvelles ou modifiées exportées")
+
+    # Statistiques par segment : toujours complètes
+    segment_stats = db.get_segment_stats()
+    segment_stats.to_csv(powerbi_dir / 'segment_stats.csv', index=False)
+    manifest['tables']['segment_stats'] = {'file': 'segment_stats.csv', 'rows': len(segment_stats)}
+    manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    _write_json(powerbi_dir / MANIFEST_FILE, manifest)
+    return manifest
+
+def _dimension(name, values):
+    """Dimension triée : clé 0 pour le membre inconnu, puis 1..n."""
+    values = sorted({value for value in values if pd.notna(value) and value != ''})
+    return pd.DataFrame({f'{name}_key': range(len(values) + 1), name: [UNKNOWN_MEMBER, *values]})
+
+def _fact_chunks(db, where, params, keys, partials, decimals):
+    """
+    Faits clients d'une plage de lignes, bloc par bloc.
+
+    Les agrégats partiels (effectifs, sommes et effectifs non nuls par
+    segment x zone x mois) de chaque bloc, calculés avant l'arrondi des
+    mesures, sont ajoutés à partials.
+    """
+    for chunk in db.iter_table('clients', where=where, params=params):
+        dates = pd.to_datetime(chunk['date_creation'], errors='coerce')
+        fact = pd.DataFrame({
+            'client_id': pd.to_numeric(chunk['client_id']).astype('Int64'),
+            'segment_key': chunk['segment'].map(keys['segment']),
+            'zone_key': chunk['zone'].map(keys['zone']),
+            'offre_key': chunk['segment'].map(keys['offre']),
+            'mois': dates.dt.year * 100 + dates.dt.month
+        })
+        fact = fact.fillna({'segment_key': 0, 'zone_key': 0, 'offre_key': 0, 'mois': 0})
+        for column, kind in FACT_COLUMNS.items():
+            if kind == 'float':
+                fact[column] = pd.to_numeric(chunk[column]).astype('float64')
+            elif column != 'client_id':
+                fact[column] = fact[column].astype('int64')
+
+        groups = fact.groupby(['segment_key', 'zone_key', 'mois'])
+        partial = groups.size().to_frame('nombre_clients')
+        for column in SEGMENT_STATS_COLUMNS:
+            partial[f'somme_{column}'] = groups[column].sum()
+            partial[f'n_{column}'] = groups[column].count()
+        partials.append(partial)
+        yield fact.round(decimals)
+
+# Bases ouvertes par les processus workers, une par source
+_worker_databases = {}
+
+def _write_fact_part(source, where, params, keys, path, file_format, decimals):
+    """
+    Écrit une partie des faits clients dans un processus worker ; renvoie
+    (lignes, agrégats partiels).
+    """
+    if source not in _worker_databases:
+        _worker_databases[source] = open_source(source)
+    db = _worker_databases[source]
+    partials = []
+    rows = write_chunks(
+        _fact_chunks(db, where, params, keys, partials, decimals), path, file_format,
+        columns=list(FACT_COLUMNS.items())
+    )
+    return rows, partials
+
+def _column_kinds(df):
+    """Types simplifiés des colonnes d'un DataFrame, pour le manifeste."""
+    kinds = {}
+    for column, dtype in df.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype):
+            kinds[column] = 'int'
+        elif pd.api.types.is_float_dtype(dtype):
+            kinds[column] = 'float'
+        else:
+            kinds[column] = 'str'
+    return kinds
+
+def export_star_schema(db, powerbi_dir, file_format=None, max_workers=None):
+    """
+    Exporte un schéma en étoile pour Power BI, écrit en parallèle.
+
+    La table des faits clients est découpée en plages d'identifiants, lues
+    et écrites chacune par un processus worker (star/fact_clients/part_NNN),
+    qui rouvre la base avec ses propres connexions : conversion, mise en
+    forme et compression des blocs sont liées au GIL. Chaque worker calcule
+    aussi ses agrégats partiels, fusionnés ensuite dans
+    fact_segment_zone_mois. Les dimensions segment, zone et offre sont
+    écrites par un pool de threads, démarré une fois les workers lancés.
+    star_schema.json décrit les tables, les types des colonnes et les
+    relations du modèle.
+
+    Args:
+        db (DatabaseManager): Base source
+        powerbi_dir (Path): Dossier des exports Power BI
+        file_format (str): 'csv', 'csv.gz' ou 'parquet' (POWERBI_PARAMS par
+            défaut)
+        max_workers (int): Workers d'écriture des faits (budget d'exécution
+            par défaut)
+
+    Returns:
+        dict: Description du schéma exporté
+    """
+    file_format = file_format or POWERBI_PARAMS['star_format']
+    # Décimaux arrondis : les CSV restent écrits par le chemin rapide de
+    # pandas, sans notation scientifique pour les petites valeurs
+    decimals = POWERBI_PARAMS['decimals']
+    extension = FILE_EXTENSIONS[file_format]
+    star_dir = Path(powerbi_dir) / STAR_DIR
+    max_workers = max_workers or get_budget().max_workers
+
+    # Dimensions : quelques lignes, lues avant les faits pour fixer les clés
+    dim_segment = _dimension('segment', db.get_segment_stats()['segment'])
+    dim_zone = _dimension('zone', db.read_sql('SELECT DISTINCT zone FROM clients')['zone'])
+    offers = db.get_commercial_offers()
+    dim_offre = pd.concat([
+        pd.DataFrame({'offre_key': [0], 'segment': [None], 'nom_offre': [UNKNOWN_MEMBER],
+                      'description': [None], 'prix': [None]}),
+        offers.rename(columns={'id': 'offre_key'})[['offre_key', 'segment', 'nom_offre', 'description', 'prix']]
+    ], ignore_index=True)
+    dim_offre['prix'] = pd.to_numeric(dim_offre['prix']).astype('float64').round(decimals)
+    keys = {
+        'segment': dict(zip(dim_segment['segment'], dim_segment['segment_key'])),
+        'zone': dict(zip(dim_zone['zone'], dim_zone['zone_key'])),
+        # Offre la plus récente de chaque segment
+        'offre': offers.sort_values('id').groupby('segment')['id'].last().to_dict()
+    }
+    dimensions = {'dim_segment': dim_segment, 'dim_zone': dim_zone, 'dim_offre': dim_offre}
+
+    # Plages d'identifiants des faits, une par worker
+    bounds = db.read_sql('SELECT MIN(id) as debut, MAX(id) as fin FROM clients')
+    first, last = bounds.iat[0, 0], bounds.iat[0, 1]
+    ranges = [(None, None)]
+    if pd.notna(first):
+        step = math.ceil((int(last) - int(first) + 1) / max_workers)
+        ranges = [(start, start + step) for start in range(int(first), int(last) + 1, step)]
+
+    source = db.source()
+    with process_pool(max_workers) as workers:
+        # Les faits d'abord : les workers sont créés (fork) au premier envoi,
+        # avant le démarrage des threads des dimensions, dont un verrou
+        # (import, logging...) tenu au moment du fork bloquerait un worker
+        part_jobs = []
+        for number, (start, end) in enumerate(ranges):
+            where, params = None, None
+            if start is not None:
+                where, params = 'id >= :debut AND id < :fin', {'debut': start, 'fin': end}
+            path = star_dir / 'fact_clients' / f'part_{number:03d}{extension}'
+            part_jobs.append((path, workers.submit(
+                _write_fact_part, source, where, params, keys, path, file_format, decimals
+            )))
+        with thread_pool(len(dimensions)) as pool:
+            dimension_jobs = {
+                name: pool.submit(write_chunks, [table], star_dir / f'{name}{extension}', file_format)
+                for name, table in dimensions.items()
+            }
+            rows = {name: job.result() for name, job in dimension_jobs.items()}
+        parts, partials = [], []
+        for path, job in part_jobs:
+            part_rows, part_partials = job.result()
+            parts.append({'file': path.relative_to(star_dir).as_posix(), 'rows': part_rows})
+            partials.extend(part_partials)
+
+    # Parties d'un export précédent plus découpé
+    written = {path.name for path, _ in part_jobs}
+    for path in (star_dir / 'fact_clients').glob(f'part_*{extension}'):
+        if path.name not in written:
+            path.unlink()
+
+    # Agrégats segment x zone x mois : fusion des agrégats partiels
+    aggregates = pd.concat(partials).groupby(level=[0, 1, 2]).sum()
+    for column in SEGMENT_STATS_COLUMNS:
+        count = aggregates.pop(f'n_{column}')
+        aggregates[f'moyenne_{column}'] = aggregates[f'somme_{column}'] / count.where(count > 0)
+    aggregates = aggregates.reset_index().round(decimals)
+    rows['fact_segment_zone_mois'] = write_chunks(
+        [aggregates], star_dir / f'fact_segment_zone_mois{extension}', file_format
+    )
+
+    schema = {
+        'format': file_format,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': {
+            'fact_clients': {'parts': parts, 'rows': sum(part['rows'] for part in parts),
+                             'columns': FACT_COLUMNS},
+            'fact_segment_zone_mois': {'file': f'fact_segment_zone_mois{extension}',
+                                       'rows': rows['fact_segment_zone_mois'],
+                                       'columns': _column_kinds(aggregates)},
+            **{name: {'file': f'{name}{extension}', 'rows': rows[name], 'columns': _column_kinds(table)}
+               for name, table in dimensions.items()}
+        },
+        'relationships': [
+            {'from': f'{fact}.{key}', 'to': f'{dimension}.{key}'}
+            for fact in ('fact_clients', 'fact_segment_zone_mois')
+            for key, dimension in (('segment_key', 'dim_segment'), ('zone_key', 'dim_zone'))
+        ] + [{'from': 'fact_clients.offre_key', 'to': 'dim_offre.offre_key'}]
+    }
+    _write_json(star_dir / 'star_schema.json', schema)
+    logger.info(
+        f"Schéma en étoile exporté : {schema['tables']['fact_clients']['rows']:,} faits clients "
+        f"en {len(parts)} parties, {len(aggregates):,} agrégats segment x zone x mois"
+    )
+    return schema
+
+def export_to_powerbi(mode=None):
+    """
+    Exporte les données vers le format Power BI.
+
+    Args:
+        mode (str): 'full' (tables complètes), 'incremental' (lignes
+            nouvelles ou modifiées, en partitions recensées dans
+            manifest.json) ou 'star' (schéma en étoile) ; POWERBI_PARAMS
+            par défaut
+    """
+    mode = mode or POWERBI_PARAMS['mode']
+    if mode not in ('full', 'incremental', 'star'):
+        raise ValueError(f"Mode d'export inconnu : {mode}")
+
     # Création du dossier Power BI s'il n'existe pas
-    powerbi_dir = Path('data/powerbi')
+    powerbi_dir = Path(POWERBI_PARAMS['output_dir'])
     powerbi_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Connexion à la base de données
-    db = DatabaseManager()
-    
-    try:
-        # Export des données des clients
-        clients_df = db.get_client_data()
-        clients_df.to_csv(powerbi_dir / 'clients.csv', index=False)
-        
+
+    # Connexion à la base configurée (connexions réutilisées par le pool)
+    with open_database() as db:
+        if mode == 'incremental':
+            export_incremental(db, powerbi_dir)
+            print("Modifications exportées avec succès vers Power BI")
+            return
+        if mode == 'star':
+            export_star_schema(db, powerbi_dir)
+            print("Schéma en étoile exporté avec succès vers Power BI")
+            return
+
+        # Export des données des clients, bloc par bloc
+        db.export_table('clients', powerbi_dir / 'clients.csv')
+
         # Export des statistiques par segment
         segment_stats = db.get_segment_stats()
         segment_stats.to_csv(powerbi_dir / 'segment_stats.csv', index=False)
-        
+
         # Export des offres commerciales
         offres_df = db.get_commercial_offers()
         offres_df.to_csv(powerbi_dir / 'offres_commerciales.csv', index=False)
-        
+
+        # Export des offres affectées aux clients
+        db.export_table('affectations_offres', powerbi_dir / 'affectations_offres.csv')
+
         print("Données exportées avec succès vers Power BI")
-        
-    finally:
-        db.close()
 
 if __name__ == '__main__':
-    export_to_powerbi() 
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export des données vers Power BI")
+    parser.add_argument('--mode', choices=['full', 'incremental', 'star'],
+                        help="Mode d'export (POWERBI_PARAMS par défaut)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    export_to_powerbi(mode=args.mode)
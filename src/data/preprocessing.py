@@ -214,9 +214,20 @@ class DataPreprocessor:
         return df_scaled
 
 if __name__ == "__main__":
+    import argparse
+    import logging
+    from src.utils.profiler import add_profile_argument, make_profiler, profiled
+
+    parser = argparse.ArgumentParser(description="Prétraitement des données clients")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    profiler = make_profiler(args.profile)
+
     # Création et utilisation du préprocesseur
     preprocessor = DataPreprocessor()
-    df_processed = preprocessor.preprocess(RAW_DATA_FILE, PROCESSED_DATA_FILE)
+    with profiled(profiler, 'preprocess'):
+        df_processed = preprocessor.preprocess(RAW_DATA_FILE, PROCESSED_DATA_FILE)
     
     # Affichage des statistiques des données prétraitées
     print("\nStatistiques des données prétraitées :")
@@ -8,9 +8,17 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 from pathlib import Path
 import logging
-from database import DatabaseManager
+import sys
+from database import open_database
 from powerbi_export import export_to_powerbi
 
+# Ajout du répertoire parent au PYTHONPATH
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.models.offers import OfferEngine, assign_offers
+from src.utils.instrumentation import RunManifest
+from src.utils.profiler import add_profile_argument, make_profiler
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,12 +29,16 @@ logging.basicConfig(
     ]
 )
 
+# Identifiant client : conservé tel quel, hors normalisation et clustering,
+# pour l'import incrémental dans la base
+ID_COLUMN = 'client_id'
+
 def preprocess_data(df):
     """Prétraite les données."""
     logging.info("Début du prétraitement des données")
     
     # Gestion des valeurs manquantes
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    numeric_columns = df.select_dtypes(include=[np.number]).columns.drop(ID_COLUMN, errors='ignore')
     df[numeric_columns] = df[numeric_columns].fillna(df[numeric_columns].mean())
     
     # Normalisation
@@ -35,6 +47,8 @@ def preprocess_data(df):
         scaler.fit_transform(df[numeric_columns]),
         columns=numeric_columns
     )
+    if ID_COLUMN in df.columns:
+        df_scaled.insert(0, ID_COLUMN, df[ID_COLUMN].to_numpy())
     
     logging.info("Prétraitement des données terminé")
     return df_scaled
@@ -46,7 +60,7 @@ def perform_segmentation(df):
     # Application de K-Means
     n_clusters = 5
     kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df['segment'] = kmeans.fit_predict(df)
+    df['segment'] = kmeans.fit_predict(df.drop(columns=ID_COLUMN, errors='ignore'))
     
     # Ajout des labels de segments
     segment_labels = {
@@ -61,8 +75,16 @@ def perform_segmentation(df):
     logging.info("Segmentation terminée")
     return df
 
-def main():
-    """Fonction principale."""
+def main(profile=None):
+    """
+    Fonction principale.
+    
+    Args:
+        profile (str): Mode de profilage des étapes (--profile), None sinon
+    """
+    manifest = RunManifest('segmentation', 'logs')
+    manifest.profiler = make_profiler(profile, logs_dir='logs', run_id=manifest.data['run_id'])
+    run_status = 'failed'
     try:
         # Création des dossiers nécessaires
         Path('data/raw').mkdir(parents=True, exist_ok=True)
@@ -70,21 +92,43 @@ def main():
         
         # Chargement des données
         logging.info("Chargement des données")
-        df = pd.read_csv('data/raw/donnees_clients.csv')
+        with manifest.stage('load') as metrics:
+            df = pd.read_csv('data/raw/donnees_clients.csv')
+            metrics['rows'] = len(df)
         
         # Prétraitement
-        df_scaled = preprocess_data(df)
+        with manifest.stage('preprocess') as metrics:
+            df_scaled = preprocess_data(df)
+            metrics['rows'] = len(df_scaled)
         
         # Segmentation
-        df_segmented = perform_segmentation(df_scaled)
+        with manifest.stage('segment') as metrics:
+            df_segmented = perform_segmentation(df_scaled)
+            metrics['rows'] = len(df_segmented)
         
-        # Sauvegarde des données prétraitées
-        df_segmented.to_csv('data/processed/donnees_pretraitees.csv', index=False)
+        # Sauvegarde des données prétraitées, et des clients avec leurs
+        # valeurs brutes (KPIs des règles d'offres dans leurs unités) et
+        # leur segment pour la base
+        processed_path = 'data/processed/donnees_pretraitees.csv'
+        clients_path = 'data/processed/clients_segmentes.csv'
+        outputs = {'processed': processed_path, 'clients': clients_path}
+        with manifest.stage('save', outputs=outputs) as metrics:
+            df_segmented.to_csv(processed_path, index=False)
+            df.assign(segment=df_segmented['segment'].to_numpy()).to_csv(clients_path, index=False)
+            metrics['rows'] = len(df_segmented)
         logging.info("Données prétraitées sauvegardées")
         
-        # Import dans la base de données
-        db = DatabaseManager()
-        db.import_data('data/processed/donnees_pretraitees.csv')
+        # Import dans la base de données : mise à jour par client_id si
+        # l'identifiant est disponible, rechargement complet sinon
+        db = open_database()
+        mode = 'upsert' if ID_COLUMN in df_segmented.columns else 'replace'
+        with manifest.stage('import', outputs={'database': db.db_path}) as metrics:
+            metrics.update(db.import_data(clients_path, mode=mode))
+        
+        # Historique des segments (clients identifiés uniquement)
+        if mode == 'upsert':
+            with manifest.stage('history') as metrics:
+                metrics['run_id'] = db.record_segment_snapshot(source=clients_path)
         
         # Ajout des offres commerciales
         offres = {
@@ -95,17 +139,34 @@ def main():
             "Inactifs": ("Offre Relance", "Offre pour réactiver les clients", 24.99)
         }
         
-        for segment, (nom, desc, prix) in offres.items():
-            db.add_commercial_offer(segment, nom, desc, prix)
+        with manifest.stage('offers') as metrics:
+            metrics['rows'] = db.add_commercial_offers(
+                (segment, nom, desc, prix) for segment, (nom, desc, prix) in offres.items()
+            )
+        
+        # Affectation de l'offre de son segment à chaque client
+        with manifest.stage('assign_offers') as metrics:
+            engine = OfferEngine(offers={segment: nom for segment, (nom, _, _) in offres.items()})
+            metrics.update(assign_offers(db, engine))
         
         # Export vers Power BI
-        export_to_powerbi()
+        with manifest.stage('export'):
+            export_to_powerbi()
         
         logging.info("Processus terminé avec succès")
+        run_status = 'success'
         
     except Exception as e:
         logging.error(f"Erreur lors de l'exécution : {str(e)}")
         raise
+    
+    finally:
+        logging.info(f"Manifeste d'exécution : {manifest.write(run_status)}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Segmentation des clients et export Power BI")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    main(profile=args.profile)
@@ -0,0 +1,170 @@
+"""
+Mémoïsation sur disque des entraînements de clustering.
+
+Chaque entraînement est identifié par une empreinte rapide de la matrice des
+features et des paramètres du modèle. Les centres, labels et métriques déjà
+calculés sont relus depuis models/checkpoints au lieu d'être recalculés ; le
+cache est borné en taille avec une éviction des entrées les moins récemment
+utilisées.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import FIT_CACHE_DIR, FIT_CACHE_PARAMS
+
+def hash_array(X):
+    """
+    Calcule une empreinte rapide d'une matrice de features.
+
+    Args:
+        X (pd.DataFrame | np.ndarray): Matrice à hacher
+
+    Returns:
+        str: Empreinte hexadécimale (BLAKE2b, 128 bits)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(X, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in X.columns]).encode())
+        X = X.to_numpy()
+    X = np.asarray(X)
+    digest.update(f"{X.dtype.str}{X.shape}".encode())
+    if X.dtype == object:
+        X = pd.util.hash_array(X.ravel())
+    digest.update(memoryview(np.ascontiguousarray(X)).cast('B'))
+    return digest.hexdigest()
+
+class FitCache:
+    """
+    Cache disque des entraînements, avec éviction LRU par taille.
+    """
+
+    def __init__(self, cache_dir=FIT_CACHE_DIR, max_size_mb=None):
+        # Les chemins relatifs sont résolus depuis la racine du projet pour
+        # que scripts et notebooks partagent le même cache
+        self.cache_dir = Path(cache_dir)
+        if not self.cache_dir.is_absolute():
+            self.cache_dir = project_root / self.cache_dir
+        if max_size_mb is None:
+            max_size_mb = FIT_CACHE_PARAMS['max_size_mb']
+        self.max_size = max_size_mb * 1024 * 1024
+
+    def key(self, X, **params):
+        """
+        Construit la clé d'un entraînement.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Matrice des features
+            **params: Paramètres du modèle et des métriques
+
+        Returns:
+            str: Clé du cache
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(hash_array(X).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key):
+        """
+        Relit une entrée du cache.
+
+        Args:
+            key (str): Clé du cache
+
+        Returns:
+            dict: Entrée (centres, labels, métriques...) ou None si absente
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        # La date de modification sert d'horodatage d'accès pour l'éviction
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        """
+        Enregistre une entrée (écriture atomique) puis applique l'éviction.
+
+        Args:
+            key (str): Clé du cache
+            entry (dict): Résultat de l'entraînement
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale."""
+        entries = []
+        for path in self.cache_dir.glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Vide le cache."""
+        for path in self.cache_dir.glob('*.pkl'):
+            path.unlink(missing_ok=True)
+
+    def fit(self, X, fit_func, **params):
+        """
+        Renvoie le résultat mémoïsé de fit_func(X, **params).
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Matrice des features
+            fit_func (callable): Fonction d'entraînement renvoyant un dict
+                (par exemple centres, labels, métriques)
+            **params: Paramètres transmis à fit_func et inclus dans la clé
+
+        Returns:
+            dict: Résultat de l'entraînement
+        """
+        key = self.key(X, fit=getattr(fit_func, '__qualname__', str(fit_func)), **params)
+        entry = self.get(key)
+        if entry is None:
+            entry = fit_func(X, **params)
+            self.put(key, entry)
+        return entry
+
+def get_fit_cache():
+    """
+    Renvoie le cache configuré, ou None s'il est désactivé (configuration ou
+    SEGMENTATION_FIT_CACHE=0).
+
+    Returns:
+        FitCache: Cache des entraînements
+    """
+    if not FIT_CACHE_PARAMS['enabled'] or os.environ.get('SEGMENTATION_FIT_CACHE') == '0':
+        return None
+    return FitCache()
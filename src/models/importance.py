@@ -0,0 +1,105 @@
+"""
+Importance des features par permutation, vectorisée.
+
+L'importance d'une feature pour un segment est la part des clients du segment
+réaffectés à un autre centre lorsque cette feature est mélangée. Comme une
+permutation ne modifie qu'une coordonnée, la distance aux centres est mise à
+jour par différence sur la seule contribution de cette feature, pour toutes
+les features à la fois.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import FEATURE_IMPORTANCE_PARAMS, RANDOM_STATE
+
+def _reassignment_counts(sample, permuted, centers, base_labels):
+    """
+    Compte, par segment et par feature, les lignes qui changent de segment.
+
+    Args:
+        sample (np.ndarray): Lignes d'origine (m x d)
+        permuted (np.ndarray): Mêmes lignes, chaque colonne mélangée (m x d)
+        centers (np.ndarray): Centres des segments (k x d)
+        base_labels (np.array): Segment d'origine de chaque ligne
+
+    Returns:
+        np.ndarray: Nombre de réaffectations (k x d)
+    """
+    # Contribution de chaque feature à la distance au carré : (m, k, d)
+    contributions = (sample[:, None, :] - centers[None, :, :]) ** 2
+    permuted_contributions = (permuted[:, None, :] - centers[None, :, :]) ** 2
+    distances = contributions.sum(axis=2)
+
+    # Distances après permutation de chaque feature, toutes à la fois : (m, k, d)
+    permuted_distances = distances[:, :, None] - contributions + permuted_contributions
+    new_labels = permuted_distances.argmin(axis=1)
+    changed = new_labels != base_labels[:, None]
+
+    k = centers.shape[0]
+    counts = np.zeros((k, sample.shape[1]))
+    for segment in range(k):
+        counts[segment] = changed[base_labels == segment].sum(axis=0)
+    return counts
+
+def permutation_importance(X, centers, features, sample_size=None, n_repeats=None,
+                           batch_size=None, random_state=RANDOM_STATE):
+    """
+    Calcule l'importance des features par segment (taux de réaffectation).
+
+    Args:
+        X (pd.DataFrame | np.ndarray): Données d'entrée
+        centers (np.ndarray): Centres des segments (k x d)
+        features (list): Noms des features, dans l'ordre des colonnes
+        sample_size (int): Nombre maximal de lignes échantillonnées
+        n_repeats (int): Nombre de permutations moyennées
+        batch_size (int): Nombre de lignes traitées par lot
+        random_state (int): Graine aléatoire
+
+    Returns:
+        Dict[int, pd.Series]: Importance de chaque feature, par segment
+    """
+    sample_size = sample_size or FEATURE_IMPORTANCE_PARAMS['sample_size']
+    n_repeats = n_repeats or FEATURE_IMPORTANCE_PARAMS['n_repeats']
+    batch_size = batch_size or FEATURE_IMPORTANCE_PARAMS['batch_size']
+    rng = np.random.default_rng(random_state)
+
+    if isinstance(X, pd.DataFrame):
+        X = X[features].to_numpy()
+    X = np.asarray(X, dtype=np.float64)
+    centers = np.asarray(centers, dtype=np.float64)
+    if len(X) > sample_size:
+        X = X[rng.choice(len(X), size=sample_size, replace=False)]
+
+    base_labels = np.empty(len(X), dtype=np.int64)
+    for start in range(0, len(X), batch_size):
+        batch = X[start:start + batch_size]
+        base_labels[start:start + batch_size] = (
+            ((batch[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        )
+
+    k = centers.shape[0]
+    counts = np.zeros((k, X.shape[1]))
+    for _ in range(n_repeats):
+        # Chaque colonne est mélangée indépendamment
+        permuted = rng.permuted(X, axis=0)
+        for start in range(0, len(X), batch_size):
+            stop = start + batch_size
+            counts += _reassignment_counts(
+                X[start:stop], permuted[start:stop], centers, base_labels[start:stop]
+            )
+
+    sizes = np.bincount(base_labels, minlength=k)[:, None]
+    rates = counts / (np.maximum(sizes, 1) * n_repeats)
+
+    return {
+        segment: pd.Series(rates[segment], index=list(features), name='importance')
+        for segment in range(k)
+    }
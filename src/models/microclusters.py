@@ -0,0 +1,247 @@
+"""
+Résumé en micro-clusters (style BIRCH) pour la segmentation en flux.
+
+Les lignes clients sont compressées en un nombre borné de micro-clusters,
+chacun décrit par son effectif, la somme linéaire et la somme des carrés de
+ses points. La segmentation finale en N_CLUSTERS segments est ensuite
+calculée sur les centres pondérés des micro-clusters, pour un coût
+indépendant de la taille de la base.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances_argmin_min
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import (
+    CLUSTERING_PARAMS,
+    MICROCLUSTER_PARAMS,
+    MICROCLUSTERS_FILE,
+    NUMERIC_FEATURES
+)
+from src.utils.execution import budgeted
+
+class MicroClusterSummary:
+    """
+    Résumé incrémental des clients en micro-clusters (N, LS, SS).
+    """
+
+    def __init__(self, features=None, max_clusters=None, threshold=None):
+        self.features = list(features) if features is not None else list(NUMERIC_FEATURES)
+        self.max_clusters = max_clusters or MICROCLUSTER_PARAMS['max_clusters']
+        self.threshold = threshold or MICROCLUSTER_PARAMS['threshold']
+
+        n_features = len(self.features)
+        self.n = np.zeros(0, dtype=np.float64)
+        self.ls = np.zeros((0, n_features), dtype=np.float64)
+        self.ss = np.zeros((0, n_features), dtype=np.float64)
+        self.macro_model = None
+
+    @property
+    def n_microclusters(self):
+        """Nombre de micro-clusters courant."""
+        return len(self.n)
+
+    @property
+    def n_seen(self):
+        """Nombre total de lignes absorbées."""
+        return int(self.n.sum())
+
+    @property
+    def centers(self):
+        """Centres des micro-clusters (LS / N)."""
+        return self.ls / self.n[:, None]
+
+    @property
+    def radii(self):
+        """Rayons des micro-clusters (écart quadratique moyen au centre)."""
+        variance = self.ss / self.n[:, None] - self.centers ** 2
+        return np.sqrt(np.maximum(variance.sum(axis=1), 0.0))
+
+    def _to_array(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy()
+        return np.asarray(X, dtype=np.float64)
+
+    @budgeted
+    def partial_fit(self, X):
+        """
+        Absorbe un lot de nouvelles lignes dans le résumé.
+
+        Chaque ligne rejoint le micro-cluster le plus proche si elle se trouve
+        à moins de `threshold` de son centre ; les autres ouvrent de nouveaux
+        micro-clusters. Le résumé est recompressé dès que `max_clusters` est
+        dépassé.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Lot de lignes clients
+
+        Returns:
+            self: Instance de la classe
+        """
+        X = self._to_array(X)
+        if len(X) == 0:
+            return self
+
+        if self.n_microclusters > 0:
+            nearest, distances = pairwise_distances_argmin_min(X, self.centers)
+            absorbed = distances <= self.threshold
+            self._accumulate(nearest[absorbed], X[absorbed])
+            X = X[~absorbed]
+
+        if len(X) > 0:
+            self.n = np.concatenate([self.n, np.ones(len(X))])
+            self.ls = np.vstack([self.ls, X])
+            self.ss = np.vstack([self.ss, X ** 2])
+
+        if self.n_microclusters > self.max_clusters:
+            self._compress()
+
+        return self
+
+    def _accumulate(self, index, X):
+        """Ajoute les lignes X aux micro-clusters désignés par index."""
+        if len(index) == 0:
+            return
+        minlength = self.n_microclusters
+        self.n += np.bincount(index, minlength=minlength)
+        for j in range(X.shape[1]):
+            self.ls[:, j] += np.bincount(index, weights=X[:, j], minlength=minlength)
+            self.ss[:, j] += np.bincount(index, weights=X[:, j] ** 2, minlength=minlength)
+
+    def _compress(self):
+        """
+        Fusionne les micro-clusters proches pour revenir sous la borne.
+
+        Les centres sont regroupés par un K-means pondéré ; les CF de chaque
+        groupe sont additionnés, puis le seuil d'absorption est relevé au
+        rayon médian obtenu, comme dans BIRCH.
+        """
+        target = max(1, self.max_clusters // 2)
+        kmeans = KMeans(
+            n_clusters=target,
+            init='random',
+            n_init=1,
+            max_iter=20,
+            random_state=CLUSTERING_PARAMS['kmeans']['random_state']
+        )
+        groups = kmeans.fit_predict(self.centers, sample_weight=self.n)
+
+        n = np.bincount(groups, weights=self.n, minlength=target)
+        ls = np.zeros((target, self.ls.shape[1]))
+        ss = np.zeros((target, self.ss.shape[1]))
+        for j in range(self.ls.shape[1]):
+            ls[:, j] = np.bincount(groups, weights=self.ls[:, j], minlength=target)
+            ss[:, j] = np.bincount(groups, weights=self.ss[:, j], minlength=target)
+
+        keep = n > 0
+        self.n, self.ls, self.ss = n[keep], ls[keep], ss[keep]
+        self.threshold = max(self.threshold, float(np.median(self.radii)))
+
+    @budgeted
+    def fit_macro(self, n_clusters=None):
+        """
+        Calcule la segmentation finale sur les micro-clusters pondérés.
+
+        Args:
+            n_clusters (int): Nombre de segments (N_CLUSTERS par défaut)
+
+        Returns:
+            KMeans: Modèle entraîné sur les centres des micro-clusters
+        """
+        if self.n_microclusters == 0:
+            raise ValueError("Le résumé est vide : aucune ligne n'a été absorbée")
+
+        params = dict(CLUSTERING_PARAMS['kmeans'])
+        if n_clusters is not None:
+            params['n_clusters'] = n_clusters
+
+        centers = pd.DataFrame(self.centers, columns=self.features)
+        self.macro_model = KMeans(**params)
+        self.macro_model.fit(centers, sample_weight=self.n)
+        return self.macro_model
+
+    def predict(self, X):
+        """
+        Affecte des lignes clients aux segments macro.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Lignes clients
+
+        Returns:
+            np.array: Labels des segments
+        """
+        if self.macro_model is None:
+            self.fit_macro()
+        X = pd.DataFrame(self._to_array(X), columns=self.features)
+        return self.macro_model.predict(X)
+
+    def save(self, path=MICROCLUSTERS_FILE):
+        """
+        Sauvegarde le résumé (écriture atomique).
+
+        Args:
+            path (str): Chemin du fichier .npz
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                n=self.n,
+                ls=self.ls,
+                ss=self.ss,
+                threshold=self.threshold,
+                max_clusters=self.max_clusters,
+                features=np.array(self.features)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MICROCLUSTERS_FILE):
+        """
+        Recharge un résumé sauvegardé.
+
+        Args:
+            path (str): Chemin du fichier .npz
+
+        Returns:
+            MicroClusterSummary: Résumé restauré
+        """
+        with np.load(path) as data:
+            summary = cls(
+                features=data['features'].tolist(),
+                max_clusters=int(data['max_clusters']),
+                threshold=float(data['threshold'])
+            )
+            summary.n = data['n']
+            summary.ls = data['ls']
+            summary.ss = data['ss']
+        return summary
+
+def summarize_csv(input_file, summary=None, chunksize=None):
+    """
+    Absorbe un fichier CSV par blocs dans un résumé en micro-clusters.
+
+    Args:
+        input_file (str): Chemin du fichier d'entrée
+        summary (MicroClusterSummary): Résumé existant à compléter
+        chunksize (int): Nombre de lignes par bloc
+
+    Returns:
+        MicroClusterSummary: Résumé mis à jour
+    """
+    summary = summary or MicroClusterSummary()
+    chunksize = chunksize or MICROCLUSTER_PARAMS['chunksize']
+    for chunk in pd.read_csv(input_file, usecols=summary.features, chunksize=chunksize):
+        summary.partial_fit(chunk)
+    return summary
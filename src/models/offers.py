@@ -0,0 +1,215 @@
+"""
+Moteur d'affectation des offres commerciales aux clients.
+
+Les règles (offre de chaque segment, seuils de KPI_THRESHOLDS exigés par
+OFFER_RULES) sont compilées en tableaux indexés par code de segment :
+l'affectation d'un bloc de clients est une suite d'opérations vectorisées,
+sans boucle par client ni par segment. Les affectations sont écrites dans la
+table affectations_offres par lots, dans une seule transaction, puis
+exportées en listes de campagne (un fichier par offre).
+"""
+
+import logging
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import COMMERCIAL_OFFERS, KPI_THRESHOLDS, OFFER_RULES
+
+logger = logging.getLogger(__name__)
+
+# Colonnes acceptées pour l'identifiant et le segment (libellé) des
+# clients, par ordre de préférence : table clients, données segmentées
+ID_COLUMNS = ('client_id', 'customer_id')
+SEGMENT_COLUMNS = ('segment_label', 'segment')
+
+# Colonnes mesurant le KPI de chaque seuil de KPI_THRESHOLDS, par ordre de
+# préférence (valeurs brutes, dans l'unité du seuil) ; un seuil est atteint
+# quand la valeur lui est supérieure ou égale
+KPI_COLUMNS = {
+    'consommation_min': ('montant_consommation', 'consommation_mensuelle'),
+    'satisfaction_min': ('satisfaction',),
+    'fidelite_min': ('fidelite',)
+}
+
+def _first_column(df, candidates):
+    """Première colonne de candidates présente dans df (None sinon)."""
+    return next((name for name in candidates if name in df.columns), None)
+
+class OfferEngine:
+    """
+    Affectation vectorisée des offres aux clients.
+
+    Chaque seuil des KPIs occupe un bit du masque kpis (bit i pour le i-ème
+    seuil, à 1 si le seuil est atteint). Un client reçoit l'offre de son
+    segment si les seuils exigés par la règle du segment sont atteints et
+    les seuils exclus ne le sont pas. Une règle portant sur un KPI absent des
+    données est ignorée ; un client dont la valeur manque n'est pas éligible
+    aux règles qui portent sur ce KPI.
+    """
+
+    def __init__(self, offers=None, rules=None, thresholds=None):
+        """
+        Args:
+            offers (dict): Segment -> nom de l'offre (COMMERCIAL_OFFERS par
+                défaut)
+            rules (dict): Segment -> {seuil: atteint} (OFFER_RULES par défaut)
+            thresholds (dict): Seuils des KPIs (KPI_THRESHOLDS par défaut)
+        """
+        if offers is None:
+            offers = {segment: offer['nom'] for segment, offer in COMMERCIAL_OFFERS.items()}
+        if not offers:
+            raise ValueError("Aucune offre à affecter")
+        rules = OFFER_RULES if rules is None else rules
+        self.thresholds = dict(KPI_THRESHOLDS if thresholds is None else thresholds)
+        self.bits = {kpi: 1 << i for i, kpi in enumerate(self.thresholds)}
+        self.segments = list(offers)
+        self.offer_names = np.array([offers[segment] for segment in self.segments], dtype=object)
+
+        # Seuils exigés atteints (required) ou non atteints (excluded), en
+        # masques de bits par code de segment
+        self.required = np.zeros(len(self.segments), dtype=np.int64)
+        self.excluded = np.zeros(len(self.segments), dtype=np.int64)
+        for code, segment in enumerate(self.segments):
+            for kpi, reached in rules.get(segment, {}).items():
+                if kpi not in self.bits:
+                    raise ValueError(f"Seuil inconnu dans la règle du segment {segment} : {kpi}")
+                if reached:
+                    self.required[code] |= self.bits[kpi]
+                else:
+                    self.excluded[code] |= self.bits[kpi]
+        self.rule_bits = int(np.bitwise_or.reduce(self.required | self.excluded))
+        self._missing = set()
+
+    def assign(self, df):
+        """
+        Affecte les offres à un bloc de clients.
+
+        Args:
+            df (pd.DataFrame): Clients, avec un identifiant, un segment et
+                les colonnes des KPIs disponibles
+
+        Returns:
+            pd.DataFrame: Clients éligibles (client_id, segment, nom_offre,
+            kpis)
+        """
+        id_column = _first_column(df, ID_COLUMNS)
+        segment_column = _first_column(df, SEGMENT_COLUMNS)
+        if id_column is None or segment_column is None:
+            raise ValueError("Les clients doivent avoir un identifiant et un segment")
+
+        codes = pd.Categorical(df[segment_column], categories=self.segments).codes
+        known = (codes >= 0) & df[id_column].notna().to_numpy()
+        code = np.where(known, codes, 0)
+
+        # Seuils atteints et valeurs renseignées, un bit par KPI
+        reached = np.zeros(len(df), dtype=np.int64)
+        measured = np.zeros(len(df), dtype=np.int64)
+        available = 0
+        for kpi, bit in self.bits.items():
+            column = _first_column(df, KPI_COLUMNS.get(kpi, ()))
+            if column is None:
+                self._warn_missing(kpi)
+                continue
+            available |= bit
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            measured |= np.where(np.isnan(values), 0, bit)
+            reached |= np.where(values >= self.thresholds[kpi], bit, 0)
+
+        required = self.required[code] & available
+        excluded = self.excluded[code] & available
+        conditions = required | excluded
+        eligible = (
+            known
+            & ((measured & conditions) == conditions)
+            & ((reached & required) == required)
+            & ((reached & excluded) == 0)
+        )
+        return pd.DataFrame({
+            'client_id': df[id_column].to_numpy()[eligible],
+            'segment': df[segment_column].to_numpy()[eligible],
+            'nom_offre': self.offer_names[code[eligible]],
+            'kpis': reached[eligible]
+        })
+
+    def _warn_missing(self, kpi):
+        """Signale une fois un KPI de règle absent des données."""
+        if self.bits[kpi] & self.rule_bits and kpi not in self._missing:
+            self._missing.add(kpi)
+            logger.warning(f"KPI {kpi} absent des données : règles correspondantes ignorées")
+
+def database_offers(db):
+    """
+    Offre la plus récente de chaque segment dans offres_commerciales.
+
+    Args:
+        db (DatabaseManager): Base des offres
+
+    Returns:
+        dict: Segment -> nom de l'offre (vide sans offre enregistrée)
+    """
+    offers = db.get_commercial_offers().sort_values('id')
+    return offers.groupby('segment')['nom_offre'].last().to_dict()
+
+def assign_offers(db, engine=None, chunksize=None):
+    """
+    Affecte les offres aux clients de la base et remplace la table
+    affectations_offres.
+
+    La table clients est lue en flux ; chaque bloc est affecté puis inséré,
+    dans la transaction de save_offer_assignments.
+
+    Args:
+        db (DatabaseManager): Base des clients
+        engine (OfferEngine): Moteur d'affectation (règles par défaut)
+        chunksize (int): Clients par bloc (DATABASE_PARAMS par défaut)
+
+    Returns:
+        dict: Affectations écrites, durée (s), débit (lignes/s) et effectif
+        par offre
+    """
+    engine = engine or OfferEngine()
+    counts = {}
+
+    def assignments():
+        for chunk in db.iter_table('clients', chunksize):
+            assigned = engine.assign(chunk)
+            for name, n in assigned['nom_offre'].value_counts().items():
+                counts[name] = counts.get(name, 0) + int(n)
+            yield assigned
+
+    stats = db.save_offer_assignments(assignments())
+    stats['offres'] = counts
+    return stats
+
+def export_campaigns(db, output_dir, file_format='csv'):
+    """
+    Exporte une liste de campagne par offre (campagne_<offre>.<format>).
+
+    Args:
+        db (DatabaseManager): Base des affectations
+        output_dir (str): Dossier des listes
+        file_format (str): 'csv', 'csv.gz' ou 'parquet'
+
+    Returns:
+        dict: Offre -> fichier et nombre de clients
+    """
+    output_dir = Path(output_dir)
+    offers = db.read_sql('SELECT DISTINCT nom_offre FROM affectations_offres')['nom_offre']
+    campaigns = {}
+    for name in offers:
+        slug = re.sub(r'\W+', '_', name.lower()).strip('_')
+        path = output_dir / f'campagne_{slug}.{file_format}'
+        rows = db.export_table(
+            'affectations_offres', path, file_format=file_format,
+            where='nom_offre = :nom_offre', params={'nom_offre': name}
+        )
+        campaigns[name] = {'file': str(path), 'rows': rows}
+    return campaigns
@@ -0,0 +1,216 @@
+"""
+Segmentation partitionnée : une segmentation par valeur d'une clé.
+
+La base est découpée selon une colonne (duree_contrat, zone_geographique,
+type_client...) ; une clé numérique à nombreuses valeurs est découpée en
+tranches de quantiles, dont les bornes sont conservées pour predict. Chaque
+partition est entraînée, évaluée et profilée dans un worker. Les
+tailles de partition étant très inégales, les partitions sont soumises de la
+plus grande à la plus petite (ordonnancement LPT) : chaque worker libéré
+prend la plus grosse partition restante, ce qui équilibre la charge en nombre
+de lignes.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import (
+    CLUSTERING_PARAMS,
+    NUMERIC_FEATURES,
+    PARTITION_PARAMS,
+    SEGMENT_LABELS
+)
+from src.models.segmentation import CustomerSegmentation
+from src.utils.execution import process_pool
+
+logger = logging.getLogger(__name__)
+
+def _fit_partition(task):
+    """
+    Entraîne, évalue et profile une partition (exécuté dans un worker).
+
+    Args:
+        task (tuple): (valeur de la clé, données de la partition)
+
+    Returns:
+        tuple: (valeur, modèle, métriques, profils (dict), profils (DataFrame))
+    """
+    value, X = task
+    segmentation = CustomerSegmentation().fit(X)
+    scores = segmentation.evaluate_clustering(X)
+    profiles = segmentation.compute_segment_profiles(X)
+    return (
+        value,
+        segmentation,
+        scores,
+        segmentation.get_segment_profiles(X),
+        profiles.to_frame(labels=SEGMENT_LABELS)
+    )
+
+class PartitionedSegmentation:
+    """
+    Segmentation indépendante de chaque partition de la base.
+
+    Args:
+        key (str): Colonne de partitionnement (PARTITION_PARAMS par défaut)
+        bins (int): Tranches de quantiles d'une clé numérique
+        min_partition_size (int): Taille minimale d'une partition segmentée
+        max_workers (int): Nombre de workers (budget d'exécution par défaut)
+    """
+
+    def __init__(self, key=None, bins=None, min_partition_size=None, max_workers=None):
+        self.key = key or PARTITION_PARAMS['key']
+        self.bins = bins or PARTITION_PARAMS['bins']
+        self.bin_edges = None
+        self.min_partition_size = min_partition_size or PARTITION_PARAMS['min_partition_size']
+        self.max_workers = max_workers or PARTITION_PARAMS['max_workers']
+        self.features = NUMERIC_FEATURES
+        self.models = {}
+        self.scores = None
+        self.profiles = {}
+        self.profile_table = None
+        self.skipped = []
+
+    def check_key(self, columns):
+        """
+        Vérifie que la clé de partitionnement figure dans les colonnes.
+
+        Args:
+            columns (iterable): Colonnes des données
+
+        Raises:
+            ValueError: Clé absente, avec les colonnes disponibles
+        """
+        columns = list(columns)
+        if self.key not in columns:
+            raise ValueError(
+                f"Colonne de partitionnement absente des données : {self.key} "
+                f"(colonnes disponibles : {', '.join(map(str, columns))})"
+            )
+
+    def _keys(self, X, fit=False):
+        """Valeur de partition de chaque ligne : la clé, ou sa tranche de quantiles."""
+        self.check_key(X.columns)
+        values = X[self.key]
+        if fit:
+            self.bin_edges = None
+            if pd.api.types.is_numeric_dtype(values) and values.nunique() > self.bins:
+                edges = np.unique(values.quantile(np.linspace(0, 1, self.bins + 1)).to_numpy())
+                edges[0], edges[-1] = -np.inf, np.inf
+                self.bin_edges = edges
+        if self.bin_edges is None:
+            return values
+        return pd.cut(values, self.bin_edges).astype(str).where(values.notna())
+
+    def _partitions(self, X):
+        indices = X.groupby(self._keys(X, fit=True).to_numpy(), sort=True, dropna=False).indices
+        n_clusters = CLUSTERING_PARAMS['kmeans']['n_clusters']
+        minimum = max(self.min_partition_size, n_clusters)
+        partitions, self.skipped = {}, []
+        for value, rows in indices.items():
+            if len(rows) < minimum:
+                self.skipped.append(value)
+                logger.warning(f"Partition {self.key}={value} ignorée : {len(rows)} lignes (< {minimum})")
+            else:
+                partitions[value] = rows
+        return partitions
+
+    def fit(self, X):
+        """
+        Entraîne une segmentation par partition, en parallèle.
+
+        Args:
+            X (pd.DataFrame): Données prétraitées contenant la clé
+
+        Returns:
+            pd.DataFrame: Données d'entrée avec les colonnes 'segment' (local
+            à la partition), 'segment_label' et 'segment_id' (partition-segment) ;
+            segment vaut -1 pour les partitions trop petites
+        """
+        partitions = self._partitions(X)
+        # Plus grandes partitions d'abord : équilibrage LPT sur les workers libres
+        order = sorted(partitions, key=lambda value: len(partitions[value]), reverse=True)
+        logger.info(
+            f"{len(order)} partitions par {self.key} : "
+            + ", ".join(f"{value}={len(partitions[value]):,}" for value in order)
+        )
+
+        labels = np.full(len(X), -1, dtype=np.int64)
+        scores, tables = {}, {}
+        with process_pool(max_workers=self.max_workers) as pool:
+            tasks = (
+                (value, X.iloc[partitions[value]][self.features])
+                for value in order
+            )
+            for value, segmentation, partition_scores, profiles, table in pool.map(_fit_partition, tasks):
+                labels[partitions[value]] = segmentation.labels
+                self.models[value] = segmentation
+                self.profiles[value] = profiles
+                scores[value] = {'size': len(partitions[value]), **partition_scores}
+                tables[value] = table
+
+        self.scores = pd.DataFrame.from_dict(scores, orient='index').rename_axis(self.key)
+        self.profile_table = pd.concat(tables, names=[self.key, 'segment']) if tables else None
+        return self._label(X, labels)
+
+    def _label(self, X, labels):
+        result = X.copy()
+        result['segment'] = labels
+        result['segment_label'] = result['segment'].map(SEGMENT_LABELS)
+        partition = self._keys(X).astype(str)
+        result['segment_id'] = np.where(labels >= 0, partition + '-' + result['segment'].astype(str), None)
+        return result
+
+    def predict(self, X):
+        """
+        Affecte chaque client au segment de sa partition.
+
+        Args:
+            X (pd.DataFrame): Données prétraitées contenant la clé
+
+        Returns:
+            np.array: Segment local à la partition (-1 si partition inconnue)
+        """
+        labels = np.full(len(X), -1, dtype=np.int64)
+        for value, rows in X.groupby(self._keys(X).to_numpy(), sort=False, dropna=False).indices.items():
+            if value in self.models:
+                labels[rows] = self.models[value].predict(X.iloc[rows])
+        return labels
+
+    def segment_clients(self, input_file, output_file, profiles_file=None):
+        """
+        Effectue la segmentation partitionnée complète.
+
+        Args:
+            input_file (str): Chemin du fichier d'entrée
+            output_file (str): Chemin du fichier labellisé combiné
+            profiles_file (str): Chemin des profils par partition
+                (<output>_profils.csv par défaut)
+
+        Returns:
+            tuple: (données labellisées, profils par partition, métriques par partition)
+        """
+        self.check_key(pd.read_csv(input_file, nrows=0).columns)
+        df = pd.read_csv(input_file)
+        result = self.fit(df)
+        print("\nMétriques par partition :")
+        print(self.scores)
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        result.to_csv(output_path, index=False)
+        profiles_path = Path(profiles_file or output_path.with_name(f"{output_path.stem}_profils.csv"))
+        if self.profile_table is not None:
+            self.profile_table.to_csv(profiles_path)
+        print(f"\nSegmentation par {self.key} sauvegardée dans {output_path} et {profiles_path}")
+
+        return result, self.profile_table, self.scores
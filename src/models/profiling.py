@@ -0,0 +1,301 @@
+"""
+Moteur d'agrégation des profils de segments.
+
+Les statistiques par segment (effectif, part, moyenne, écart-type, min/max et
+quantiles) sont calculées en une seule passe sur les labels, sans masque
+booléen par segment. Les résultats partiels calculés sur des blocs ou par
+des workers peuvent être fusionnés.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import PROFILE_PARAMS, RANDOM_STATE
+
+class ProfileAccumulator:
+    """
+    Accumulateur fusionnable des statistiques par segment.
+
+    Les moyennes et variances sont combinées avec la formule de Chan ; les
+    quantiles sont estimés sur un échantillon borné par segment (les lignes
+    de plus petite clé aléatoire), exact tant que le segment tient dans
+    l'échantillon.
+    """
+
+    def __init__(self, features, n_clusters, quantiles=None, sample_size=None,
+                 random_state=RANDOM_STATE):
+        self.features = list(features)
+        self.n_clusters = n_clusters
+        self.quantiles = list(quantiles if quantiles is not None else PROFILE_PARAMS['quantiles'])
+        self.sample_size = sample_size or PROFILE_PARAMS['quantile_sample_size']
+        self.rng = np.random.default_rng(random_state)
+
+        n_features = len(self.features)
+        self.count = np.zeros(n_clusters, dtype=np.int64)
+        self.mean = np.zeros((n_clusters, n_features))
+        self.m2 = np.zeros((n_clusters, n_features))
+        self.min = np.full((n_clusters, n_features), np.inf)
+        self.max = np.full((n_clusters, n_features), -np.inf)
+
+        self.sample_keys = np.zeros(0)
+        self.sample_labels = np.zeros(0, dtype=np.int64)
+        self.sample_values = np.zeros((0, n_features))
+
+    def update(self, X, labels):
+        """
+        Ajoute un bloc de lignes labellisées.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Valeurs des features
+            labels (np.array): Segment de chaque ligne (0..n_clusters-1)
+
+        Returns:
+            self: Instance de la classe
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy()
+        X = np.asarray(X, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.int64)
+        if len(X) == 0:
+            return self
+
+        k = self.n_clusters
+        count = np.bincount(labels, minlength=k)
+        safe_count = np.maximum(count, 1)[:, None]
+
+        sums = np.empty((k, X.shape[1]))
+        for j in range(X.shape[1]):
+            sums[:, j] = np.bincount(labels, weights=X[:, j], minlength=k)
+        mean = sums / safe_count
+
+        deviations = X - mean[labels]
+        m2 = np.empty((k, X.shape[1]))
+        for j in range(X.shape[1]):
+            m2[:, j] = np.bincount(labels, weights=deviations[:, j] ** 2, minlength=k)
+
+        # Un seul tri stable par label pour les extrêmes et l'échantillon
+        order = np.argsort(labels, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(count)])
+        present = count > 0
+        sorted_X = X[order]
+        minimum = np.full((k, X.shape[1]), np.inf)
+        maximum = np.full((k, X.shape[1]), -np.inf)
+        minimum[present] = np.minimum.reduceat(sorted_X, bounds[:-1][present], axis=0)
+        maximum[present] = np.maximum.reduceat(sorted_X, bounds[:-1][present], axis=0)
+
+        # Clés aléatoires : seules les sample_size plus petites par segment
+        # peuvent entrer dans l'échantillon, les autres sont écartées ici
+        keys = self.rng.random(len(X))
+        kept = []
+        for segment in np.flatnonzero(present):
+            rows = np.arange(bounds[segment], bounds[segment + 1])
+            if len(rows) > self.sample_size:
+                rows = rows[np.argpartition(keys[rows], self.sample_size - 1)[:self.sample_size]]
+            kept.append(rows)
+        kept = np.concatenate(kept)
+
+        self._combine(
+            count, mean, m2, minimum, maximum,
+            keys[kept], labels[order][kept], sorted_X[kept]
+        )
+        return self
+
+    def merge(self, other):
+        """
+        Fusionne un accumulateur calculé sur un autre bloc ou worker.
+
+        Args:
+            other (ProfileAccumulator): Accumulateur partiel
+
+        Returns:
+            self: Instance de la classe
+        """
+        if other.features != self.features or other.n_clusters != self.n_clusters:
+            raise ValueError("Impossible de fusionner des profils de features ou segments différents")
+        self._combine(
+            other.count, other.mean, other.m2, other.min, other.max,
+            other.sample_keys, other.sample_labels, other.sample_values
+        )
+        return self
+
+    def _combine(self, count, mean, m2, minimum, maximum, keys, labels, values):
+        total = self.count + count
+        safe_total = np.maximum(total, 1)[:, None]
+        delta = mean - self.mean
+
+        self.mean = self.mean + delta * (count[:, None] / safe_total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count)[:, None] / safe_total
+        self.count = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+
+        keys = np.concatenate([self.sample_keys, keys])
+        labels = np.concatenate([self.sample_labels, labels])
+        values = np.vstack([self.sample_values, values])
+        order = np.lexsort((keys, labels))
+        sorted_labels = labels[order]
+        starts = np.searchsorted(sorted_labels, np.arange(self.n_clusters))
+        rank = np.arange(len(order)) - starts[sorted_labels]
+        keep = order[rank < self.sample_size]
+        self.sample_keys = keys[keep]
+        self.sample_labels = labels[keep]
+        self.sample_values = values[keep]
+
+    def result(self):
+        """
+        Construit la table des profils.
+
+        Returns:
+            SegmentProfiles: Profils des segments
+        """
+        k = self.n_clusters
+        total = self.count.sum()
+        empty = self.count == 0
+
+        std = np.sqrt(self.m2 / np.maximum(self.count - 1, 1)[:, None])
+        std[self.count < 2] = np.nan
+
+        stats = {
+            'mean': self.mean.copy(),
+            'std': std,
+            'min': self.min.copy(),
+            'max': self.max.copy()
+        }
+        for q in self.quantiles:
+            stats[f'q{int(round(q * 100))}'] = np.full((k, len(self.features)), np.nan)
+
+        order = np.argsort(self.sample_labels, kind='stable')
+        sorted_labels = self.sample_labels[order]
+        bounds = np.searchsorted(sorted_labels, np.arange(k + 1))
+        for segment in range(k):
+            values = self.sample_values[order[bounds[segment]:bounds[segment + 1]]]
+            if len(values):
+                quantiles = np.quantile(values, self.quantiles, axis=0)
+                for q, row in zip(self.quantiles, quantiles):
+                    stats[f'q{int(round(q * 100))}'][segment] = row
+
+        for name in ('mean', 'min', 'max'):
+            stats[name][empty] = np.nan
+
+        table = pd.concat(
+            {name: pd.DataFrame(values, columns=self.features) for name, values in stats.items()},
+            axis=1
+        )
+        table.insert(0, ('percentage', ''), self.count / max(total, 1) * 100)
+        table.insert(0, ('size', ''), self.count)
+        table.index.name = 'segment'
+        return SegmentProfiles(table, self.features)
+
+class SegmentProfiles:
+    """
+    Table des profils de segments produite par le moteur d'agrégation.
+
+    `table` est indexée par segment, avec des colonnes (statistique, feature)
+    ainsi que ('size', '') et ('percentage', '').
+    """
+
+    def __init__(self, table, features):
+        self.table = table
+        self.features = list(features)
+
+    @property
+    def sizes(self):
+        """Effectif de chaque segment."""
+        return self.table[('size', '')]
+
+    @property
+    def percentages(self):
+        """Part de chaque segment en pourcentage."""
+        return self.table[('percentage', '')]
+
+    def stat(self, name):
+        """
+        Extrait une statistique pour toutes les features.
+
+        Args:
+            name (str): 'mean', 'std', 'min', 'max' ou 'q25', 'q50'...
+
+        Returns:
+            pd.DataFrame: Segments x features
+        """
+        return self.table[name]
+
+    def to_frame(self, labels=None):
+        """
+        Table des moyennes avec taille et pourcentage (format historique de
+        get_cluster_profiles).
+
+        Args:
+            labels (dict): Libellé de chaque segment
+
+        Returns:
+            pd.DataFrame: Profils des segments
+        """
+        frame = self.stat('mean').copy()
+        frame['size'] = self.sizes.to_numpy()
+        frame['percentage'] = self.percentages.to_numpy()
+        if labels is not None:
+            frame.index = [labels[i] for i in frame.index]
+        return frame
+
+    def to_dict(self, labels=None):
+        """
+        Profils au format dictionnaire utilisé par les rapports et l'API web.
+
+        Args:
+            labels (dict): Clé à utiliser pour chaque segment (id par défaut)
+
+        Returns:
+            dict: Profil de chaque segment
+        """
+        quantile_names = [
+            name for name in self.table.columns.get_level_values(0).unique()
+            if name.startswith('q')
+        ]
+        profiles = {}
+        for segment in self.table.index:
+            row = self.table.loc[segment]
+            key = labels[segment] if labels is not None else int(segment)
+            profiles[key] = {
+                'size': int(row[('size', '')]),
+                'percentage': float(row[('percentage', '')]),
+                'mean_values': row['mean'].to_dict(),
+                'std_values': row['std'].to_dict(),
+                'min_values': row['min'].to_dict(),
+                'max_values': row['max'].to_dict(),
+                'quantiles': {name: row[name].to_dict() for name in quantile_names}
+            }
+        return profiles
+
+def compute_profiles(X, labels, n_clusters=None, features=None, chunksize=None):
+    """
+    Calcule les profils de segments en une passe.
+
+    Args:
+        X (pd.DataFrame): Données d'entrée
+        labels (np.array): Segment de chaque ligne (entiers 0..k-1)
+        n_clusters (int): Nombre de segments (max(labels) + 1 par défaut)
+        features (list): Features à profiler (toutes les colonnes par défaut)
+        chunksize (int): Taille des blocs fusionnés (tout d'un coup par défaut)
+
+    Returns:
+        SegmentProfiles: Profils des segments
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    features = list(features) if features is not None else list(X.columns)
+    if n_clusters is None:
+        n_clusters = int(labels.max()) + 1 if len(labels) else 0
+
+    values = X[features].to_numpy(dtype=np.float64)
+    accumulator = ProfileAccumulator(features, n_clusters)
+    chunksize = chunksize or max(len(values), 1)
+    for start in range(0, len(values), chunksize):
+        accumulator.update(values[start:start + chunksize], labels[start:start + chunksize])
+    return accumulator.result()
@@ -10,6 +10,7 @@ from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bo
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 from pathlib import Path
+import re
 import sys
 import os
 
@@ -26,8 +27,17 @@ from src.config import (
     PROCESSED_DATA_FILE,
     CLUSTERS_FILE,
     N_CLUSTERS,
-    RANDOM_STATE
+    RANDOM_STATE,
+    EVALUATION_PARAMS,
+    FEATURE_IMPORTANCE_PARAMS,
+    MICROCLUSTER_PARAMS
 )
+from src.models.microclusters import MicroClusterSummary
+from src.models.profiling import ProfileAccumulator, compute_profiles
+from src.models.streaming import clustering_scores, read_chunks
+from src.models.fit_cache import get_fit_cache
+from src.models.importance import permutation_importance
+from src.utils.execution import budgeted
 
 class CustomerSegmentation:
     """
@@ -41,6 +51,13 @@ class CustomerSegmentation:
             n_init=CLUSTERING_PARAMS['kmeans']['n_init']
         )
         self.features = NUMERIC_FEATURES
+        self.summary = None
+        # Modèle entraîné en flux : ses labels portent sur les micro-clusters
+        self._from_summary = False
+        self._rng = None
+        self._importance_sample = None
+        self._importance_keys = None
+        self._feature_importance = None
     
     def load_data(self, input_file):
         """
@@ -54,6 +71,7 @@ class CustomerSegmentation:
         """
         return pd.read_csv(input_file)
     
+    @budgeted
     def fit(self, X):
         """
         Entraîne le modèle de segmentation.
@@ -64,9 +82,129 @@ class CustomerSegmentation:
         Returns:
             self: Instance de la classe
         """
-        self.model.fit(X[self.features])
+        # Échantillon conservé pour le calcul différé de l'importance des features
+        self._importance_sample = X[self.features].sample(
+            n=min(len(X), FEATURE_IMPORTANCE_PARAMS['sample_size']),
+            random_state=RANDOM_STATE
+        )
+        self._feature_importance = None
+        self._from_summary = False
+        
+        cache = get_fit_cache()
+        if cache is None:
+            self.model.fit(X[self.features])
+            return self
+        
+        # Un entraînement déjà réalisé sur les mêmes données est relu du cache
+        key = cache.key(X[self.features], model='CustomerSegmentation', **self.model.get_params())
+        entry = cache.get(key)
+        if entry is None:
+            self.model.fit(X[self.features])
+            cache.put(key, {
+                'model': self.model,
+                'centroids': self.model.cluster_centers_,
+                'labels': self.model.labels_,
+                'metrics': {'inertia': self.model.inertia_}
+            })
+        else:
+            self.model = entry['model']
+        return self
+    
+    def partial_fit(self, X):
+        """
+        Absorbe un lot de clients dans le résumé en micro-clusters.
+        
+        Args:
+            X (pd.DataFrame): Lot de données d'entrée
+            
+        Returns:
+            self: Instance de la classe
+        """
+        if self.summary is None:
+            self.summary = MicroClusterSummary(features=self.features)
+            self._importance_sample = None
+            self._rng = np.random.default_rng(RANDOM_STATE)
+        self.summary.partial_fit(X)
+        self._sample_for_importance(X[self.features])
+        return self
+    
+    def _sample_for_importance(self, X):
+        """Échantillon uniforme borné des lots absorbés (plus petites clés aléatoires)."""
+        size = FEATURE_IMPORTANCE_PARAMS['sample_size']
+        keys = self._rng.random(len(X))
+        if self._importance_sample is not None:
+            keys = np.concatenate([self._importance_keys, keys])
+            X = pd.concat([self._importance_sample, X])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size)[:size]
+            keys, X = keys[keep], X.iloc[keep]
+        self._importance_keys, self._importance_sample = keys, X
+        self._feature_importance = None
+    
+    def fit_csv(self, input_file, chunksize=None, dtype='float32'):
+        """
+        Entraîne le modèle en flux sur un fichier CSV lu par blocs.
+        
+        Les blocs sont absorbés dans le résumé en micro-clusters, puis le
+        modèle est entraîné sur le résumé : la mémoire utilisée ne dépend que
+        de la taille d'un bloc et du résumé.
+        
+        Args:
+            input_file (str): Chemin du fichier d'entrée
+            chunksize (int): Nombre de lignes par bloc
+            dtype (str): Précision des features à la lecture
+            
+        Returns:
+            self: Instance de la classe
+        """
+        self.summary = None
+        chunksize = chunksize or MICROCLUSTER_PARAMS['chunksize']
+        for _, chunk in read_chunks(input_file, self.features, chunksize, dtype):
+            self.partial_fit(chunk)
+        return self.fit_from_summary()
+    
+    def predict_csv(self, input_file, chunksize=None, dtype='float32'):
+        """
+        Prédit le segment de chaque ligne d'un fichier CSV lu par blocs.
+        
+        Args:
+            input_file (str): Chemin du fichier d'entrée
+            chunksize (int): Nombre de lignes par bloc
+            dtype (str): Précision des features à la lecture
+            
+        Returns:
+            np.array: Labels des segments, dans l'ordre du fichier
+        """
+        chunksize = chunksize or MICROCLUSTER_PARAMS['chunksize']
+        # KMeans exige des blocs dans la précision de ses centres
+        centers_dtype = self.model.cluster_centers_.dtype
+        labels = [
+            self.predict(chunk.astype(centers_dtype))
+            for _, chunk in read_chunks(input_file, self.features, chunksize, dtype)
+        ]
+        return np.concatenate(labels) if labels else np.zeros(0, dtype=np.int32)
+    
+    @budgeted
+    def fit_from_summary(self):
+        """
+        Entraîne le modèle de segmentation sur les micro-clusters pondérés.
+        
+        Le coût ne dépend que du nombre de micro-clusters. Les labels du
+        modèle portent alors sur les micro-clusters : utiliser `predict`
+        pour affecter les clients.
+        
+        Returns:
+            self: Instance de la classe
+        """
+        if self.summary is None:
+            raise ValueError("Aucun lot absorbé : appeler partial_fit au préalable")
+        self.model = self.summary.fit_macro(
+            n_clusters=CLUSTERING_PARAMS['kmeans']['n_clusters']
+        )
+        self._from_summary = True
         return self
     
+    @budgeted
     def predict(self, X):
         """
         Prédit les segments pour de nouvelles données.
@@ -79,6 +217,7 @@ class CustomerSegmentation:
         """
         return self.model.predict(X[self.features])
     
+    @budgeted
     def evaluate(self, X):
         """
         Évalue la qualité de la segmentation.
@@ -89,39 +228,233 @@ class CustomerSegmentation:
         Returns:
             dict: Métriques d'évaluation
         """
-        labels = self.model.labels_
-        silhouette = silhouette_score(X[self.features], labels)
+        labels = self._labels_of(X)
+        silhouette = self._silhouette(X, labels)
         
         metrics = {
             "silhouette_score": silhouette,
-            "inertia": self.model.inertia_
+            "inertia": self._inertia(X)
         }
         
         return metrics
     
-    def get_cluster_profiles(self, X):
+    def _labels_of(self, X):
         """
-        Calcule les profils des segments.
+        Segments des clients de X, données d'entraînement du modèle.
+        
+        Après un entraînement en flux, les labels du modèle portent sur les
+        micro-clusters : les clients sont alors affectés par predict.
+        """
+        if not self._from_summary:
+            return self.model.labels_
+        # KMeans exige des données dans la précision de ses centres
+        return self.predict(X[self.features].astype(self.model.cluster_centers_.dtype))
+    
+    def _inertia(self, X):
+        """Inertie des clients de X (celle des micro-clusters après un entraînement en flux)."""
+        if not self._from_summary:
+            return self.model.inertia_
+        return -self.model.score(X[self.features].astype(self.model.cluster_centers_.dtype))
+    
+    def _silhouette(self, X, labels, sample_size=None):
+        """Score de silhouette, sur un échantillon borné pour les grandes bases."""
+        sample_size = sample_size or EVALUATION_PARAMS['silhouette_sample_size']
+        return silhouette_score(
+            X[self.features],
+            labels,
+            sample_size=sample_size if len(X) > sample_size else None,
+            random_state=RANDOM_STATE
+        )
+    
+    @budgeted
+    def evaluate_clustering(self, X, sample_size=None):
+        """
+        Calcule l'ensemble des métriques de qualité de la segmentation.
         
         Args:
             X (pd.DataFrame): Données d'entrée
+            sample_size (int): Taille de l'échantillon de silhouette
+                (EVALUATION_PARAMS par défaut)
             
         Returns:
-            pd.DataFrame: Profils des segments
+            dict: Silhouette, Calinski-Harabasz, Davies-Bouldin et inertie
+        """
+        labels = self._labels_of(X)
+        return {
+            "silhouette_score": self._silhouette(X, labels, sample_size),
+            "calinski_harabasz_score": calinski_harabasz_score(X[self.features], labels),
+            "davies_bouldin_score": davies_bouldin_score(X[self.features], labels),
+            "inertia": self._inertia(X)
+        }
+    
+    @budgeted
+    def evaluate_csv(self, input_file, labels, chunksize=None, sample_size=None, dtype='float32'):
+        """
+        Calcule les métriques de qualité en flux sur un fichier CSV.
+        
+        Args:
+            input_file (str): Chemin du fichier d'entrée
+            labels (np.array): Segment de chaque ligne du fichier
+            chunksize (int): Nombre de lignes par bloc
+            sample_size (int): Taille de l'échantillon de silhouette
+            dtype (str): Précision des features à la lecture
+            
+        Returns:
+            dict: Silhouette, Calinski-Harabasz, Davies-Bouldin et inertie
+        """
+        return clustering_scores(
+            input_file,
+            self.features,
+            labels,
+            self.model.cluster_centers_,
+            chunksize or MICROCLUSTER_PARAMS['chunksize'],
+            sample_size or EVALUATION_PARAMS['silhouette_sample_size'],
+            dtype
+        )
+    
+    @property
+    def labels(self):
+        """Labels des segments des données d'entraînement."""
+        if self._from_summary:
+            raise ValueError(
+                "Modèle entraîné en flux : ses labels portent sur les micro-clusters, "
+                "utiliser predict_csv pour les segments des clients"
+            )
+        return self.model.labels_
+    
+    def get_cluster_centers(self):
+        """
+        Renvoie les centres des segments.
+        
+        Returns:
+            pd.DataFrame: Centres des segments (segments x features)
+        """
+        centers = self.model.cluster_centers_
+        return pd.DataFrame(
+            centers,
+            columns=self.features,
+            index=[SEGMENT_LABELS.get(i, i) for i in range(len(centers))]
+        )
+    
+    @budgeted
+    def compute_feature_importance(self, X):
+        """
+        Calcule l'importance des features par permutation : part des clients
+        de chaque segment réaffectés lorsqu'une feature est mélangée.
+        
+        Args:
+            X (pd.DataFrame): Données d'entrée
+            
+        Returns:
+            Dict[int, pd.Series]: Importance des features par segment
         """
-        X_with_clusters = X.copy()
-        X_with_clusters['cluster'] = self.model.labels_
+        return permutation_importance(X, self.model.cluster_centers_, self.features)
+    
+    @property
+    def feature_importance(self):
+        """Importance des features par segment, calculée sur l'échantillon d'entraînement."""
+        if self._feature_importance is None:
+            if self._importance_sample is None:
+                raise ValueError("Le modèle doit être entraîné avant de calculer l'importance des features")
+            self._feature_importance = self.compute_feature_importance(self._importance_sample)
+        return self._feature_importance
+    
+    def get_commercial_offers(self):
+        """
+        Renvoie l'offre commerciale associée à chaque segment.
         
-        profiles = []
+        Returns:
+            Dict[int, Dict]: Offre par segment, avec la réduction en fraction
+            et la liste des services additionnels
+        """
+        offers = {}
         for cluster in range(CLUSTERING_PARAMS['kmeans']['n_clusters']):
-            cluster_data = X_with_clusters[X_with_clusters['cluster'] == cluster]
-            profile = cluster_data[self.features].mean()
-            profile['size'] = len(cluster_data)
-            profile['percentage'] = len(cluster_data) / len(X) * 100
-            profiles.append(profile)
+            segment = SEGMENT_LABELS[cluster]
+            offer = COMMERCIAL_OFFERS[segment]
+            # "20% sur l'abonnement" -> 0.20
+            match = re.match(r"\s*(\d+(?:[.,]\d+)?)\s*%", offer['reduction'])
+            offers[cluster] = {
+                **offer,
+                'segment': segment,
+                'reduction': float(match.group(1).replace(',', '.')) / 100 if match else 0.0,
+                'reduction_label': offer['reduction'],
+                'services_additionnels': list(offer['avantages']),
+                'priorite_support': 'Support prioritaire' in offer['avantages']
+            }
+        return offers
+    
+    def get_segment_profiles(self, X, n_key_features=3):
+        """
+        Renvoie les profils des segments au format dictionnaire, avec les
+        features clés issues de l'importance par permutation.
+        
+        Args:
+            X (pd.DataFrame): Données d'entrée
+            n_key_features (int): Nombre de features clés par segment
+            
+        Returns:
+            Dict[int, Dict]: Profil de chaque segment
+        """
+        return self._add_key_features(self.compute_segment_profiles(X).to_dict(), n_key_features)
+    
+    def get_segment_profiles_csv(self, input_file, labels, chunksize=None, dtype='float32',
+                                 n_key_features=3):
+        """
+        Renvoie les profils des segments calculés en flux sur un fichier CSV.
         
-        cluster_profiles = pd.DataFrame(profiles)
-        cluster_profiles.index = [SEGMENT_LABELS[i] for i in range(CLUSTERING_PARAMS['kmeans']['n_clusters'])]
+        Args:
+            input_file (str): Chemin du fichier d'entrée
+            labels (np.array): Segment de chaque ligne du fichier
+            chunksize (int): Nombre de lignes par bloc
+            dtype (str): Précision des features à la lecture
+            n_key_features (int): Nombre de features clés par segment
+            
+        Returns:
+            Dict[int, Dict]: Profil de chaque segment
+        """
+        accumulator = ProfileAccumulator(self.features, CLUSTERING_PARAMS['kmeans']['n_clusters'])
+        chunksize = chunksize or MICROCLUSTER_PARAMS['chunksize']
+        for start, chunk in read_chunks(input_file, self.features, chunksize, dtype):
+            accumulator.update(chunk.to_numpy(dtype=np.float64), labels[start:start + len(chunk)])
+        return self._add_key_features(accumulator.result().to_dict(), n_key_features)
+    
+    def _add_key_features(self, profiles, n_key_features):
+        for cluster, importance in self.feature_importance.items():
+            profiles[cluster]['key_features'] = (
+                importance.sort_values(ascending=False).head(n_key_features).to_dict()
+            )
+        return profiles
+    
+    def compute_segment_profiles(self, X):
+        """
+        Calcule la table complète des profils (effectif, part, moyenne,
+        écart-type, min/max, quantiles) en une passe sur les labels.
+        
+        Args:
+            X (pd.DataFrame): Données d'entrée
+            
+        Returns:
+            SegmentProfiles: Table des profils des segments
+        """
+        return compute_profiles(
+            X,
+            self._labels_of(X),
+            n_clusters=CLUSTERING_PARAMS['kmeans']['n_clusters'],
+            features=self.features
+        )
+    
+    def get_cluster_profiles(self, X):
+        """
+        Calcule les profils des segments.
+        
+        Args:
+            X (pd.DataFrame): Données d'entrée
+            
+        Returns:
+            pd.DataFrame: Profils des segments
+        """
+        profiles = self.compute_segment_profiles(X)
+        cluster_profiles = profiles.to_frame(labels=SEGMENT_LABELS)
         
         return cluster_profiles
     
@@ -165,9 +498,20 @@ class CustomerSegmentation:
         return df, profiles, metrics
 
 if __name__ == "__main__":
+    import argparse
+    import logging
+    from src.utils.profiler import add_profile_argument, make_profiler, profiled
+
+    parser = argparse.ArgumentParser(description="Segmentation des clients")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    profiler = make_profiler(args.profile)
+
     # Création et utilisation du segmenteur
     segmenter = CustomerSegmentation()
-    df_segmented, profiles, metrics = segmenter.segment_clients(
-        PROCESSED_DATA_FILE,
-        CLUSTERS_FILE
-    ) 
\ No newline at end of file
+    with profiled(profiler, 'segment_clients'):
+        df_segmented, profiles, metrics = segmenter.segment_clients(
+            PROCESSED_DATA_FILE,
+            CLUSTERS_FILE
+        )
@@ -0,0 +1,143 @@
+"""
+Lecture par blocs et métriques en flux pour l'exécution sous budget mémoire.
+
+Ces fonctions ne gardent en mémoire qu'un bloc de lignes à la fois et des
+statistiques de taille fixe (sommes par segment, échantillon borné). Les
+labels de toutes les lignes, un entier par client, sont le seul tableau
+proportionnel à la taille de la base.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import silhouette_score
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import RANDOM_STATE
+
+def read_chunks(input_file, features=None, chunksize=None, dtype=None):
+    """
+    Itère sur un fichier CSV par blocs.
+
+    Args:
+        input_file (str): Chemin du fichier d'entrée
+        features (list): Colonnes à lire (toutes par défaut)
+        chunksize (int): Nombre de lignes par bloc
+        dtype (str): Précision des features ('float32'...), celle du fichier par défaut
+
+    Yields:
+        tuple: (indice de la première ligne du bloc, bloc)
+    """
+    dtypes = dict.fromkeys(features, dtype) if features is not None and dtype else None
+    start = 0
+    for chunk in pd.read_csv(input_file, usecols=features, dtype=dtypes, chunksize=chunksize):
+        yield start, chunk if features is None else chunk[features]
+        start += len(chunk)
+
+def sample_rows(input_file, n_rows, size, features=None, chunksize=None, dtype=None,
+                random_state=RANDOM_STATE):
+    """
+    Tire un échantillon uniforme de lignes en une passe.
+
+    Args:
+        input_file (str): Chemin du fichier d'entrée
+        n_rows (int): Nombre de lignes du fichier
+        size (int): Taille de l'échantillon
+        features (list): Colonnes à lire (toutes par défaut)
+        chunksize (int): Nombre de lignes par bloc
+        dtype (str): Précision des features
+        random_state (int): Graine du tirage
+
+    Returns:
+        tuple: (indices des lignes tirées, triés ; échantillon)
+    """
+    rng = np.random.default_rng(random_state)
+    index = np.sort(rng.choice(n_rows, size=min(size, n_rows), replace=False))
+    parts = []
+    for start, chunk in read_chunks(input_file, features, chunksize, dtype):
+        lo, hi = np.searchsorted(index, [start, start + len(chunk)])
+        parts.append(chunk.iloc[index[lo:hi] - start])
+    return index, pd.concat(parts, ignore_index=True)
+
+def clustering_scores(input_file, features, labels, centers, chunksize, sample_size, dtype=None):
+    """
+    Métriques de qualité de la segmentation calculées en deux passes.
+
+    Calinski-Harabasz et Davies-Bouldin sont obtenus à partir des effectifs,
+    des sommes et des dispersions par segment ; la silhouette, quadratique,
+    est calculée sur un échantillon de `sample_size` lignes.
+
+    Args:
+        input_file (str): Chemin du fichier d'entrée
+        features (list): Features du clustering
+        labels (np.array): Segment de chaque ligne du fichier
+        centers (np.ndarray): Centres du modèle (pour l'inertie)
+        chunksize (int): Nombre de lignes par bloc
+        sample_size (int): Taille de l'échantillon de silhouette
+        dtype (str): Précision des features à la lecture
+
+    Returns:
+        dict: Silhouette, Calinski-Harabasz, Davies-Bouldin et inertie
+    """
+    labels = np.asarray(labels)
+    n_rows, k = len(labels), len(centers)
+    count = np.bincount(labels, minlength=k)
+    sums = np.zeros((k, len(features)))
+
+    # Passe 1 : centres empiriques des segments et échantillon de silhouette
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample_index = np.sort(rng.choice(n_rows, size=min(sample_size, n_rows), replace=False))
+    sample = []
+    for start, chunk in read_chunks(input_file, features, chunksize, dtype):
+        X = chunk.to_numpy(dtype=np.float64)
+        chunk_labels = labels[start:start + len(X)]
+        for j in range(X.shape[1]):
+            sums[:, j] += np.bincount(chunk_labels, weights=X[:, j], minlength=k)
+        lo, hi = np.searchsorted(sample_index, [start, start + len(X)])
+        sample.append(X[sample_index[lo:hi] - start])
+    present = count > 0
+    centroids = sums[present] / count[present, None]
+    mean = sums.sum(axis=0) / n_rows
+
+    # Passe 2 : dispersions intra-segment et inertie par rapport au modèle
+    position = np.cumsum(present) - 1
+    within = 0.0
+    inertia = 0.0
+    spread = np.zeros(len(centroids))
+    for start, chunk in read_chunks(input_file, features, chunksize, dtype):
+        X = chunk.to_numpy(dtype=np.float64)
+        chunk_labels = labels[start:start + len(X)]
+        residuals = X - centroids[position[chunk_labels]]
+        squared = (residuals ** 2).sum(axis=1)
+        within += squared.sum()
+        spread += np.bincount(position[chunk_labels], weights=np.sqrt(squared), minlength=len(centroids))
+        inertia += ((X - centers[chunk_labels]) ** 2).sum()
+
+    n_labels = len(centroids)
+    between = (count[present] * ((centroids - mean) ** 2).sum(axis=1)).sum()
+    calinski_harabasz = (
+        1.0 if within == 0.0
+        else between * (n_rows - n_labels) / (within * (n_labels - 1.0))
+    )
+
+    # Même définition que sklearn.metrics.davies_bouldin_score
+    spread /= count[present]
+    separation = np.sqrt(((centroids[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+    if np.allclose(spread, 0) or np.allclose(separation, 0):
+        davies_bouldin = 0.0
+    else:
+        separation[separation == 0] = np.inf
+        ratios = (spread[:, None] + spread[None, :]) / separation
+        davies_bouldin = float(np.mean(np.max(ratios, axis=1)))
+
+    return {
+        "silhouette_score": silhouette_score(np.vstack(sample), labels[sample_index]),
+        "calinski_harabasz_score": float(calinski_harabasz),
+        "davies_bouldin_score": davies_bouldin,
+        "inertia": float(inertia)
+    }
@@ -15,6 +15,7 @@ from config import (
     COLOR_PALETTE,
     SEGMENT_LABELS
 )
+from src.utils.execution import budgeted
 
 class SegmentationVisualizer:
     """Classe pour la visualisation des résultats de segmentation."""
@@ -199,6 +200,7 @@ class SegmentationVisualizer:
             plt.savefig(Path(FIGURES_PATH) / 'cluster_profiles.png', dpi=300, bbox_inches='tight')
         plt.close()
         
+    @budgeted
     def plot_clustering_results(self, X: pd.DataFrame, labels: np.ndarray, save: bool = True) -> None:
         """
         Visualise les résultats du clustering en 2D.
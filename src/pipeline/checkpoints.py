@@ -0,0 +1,206 @@
+"""
+Points de reprise du pipeline.
+
+Les artefacts intermédiaires sont écrits de façon atomique (fichier
+temporaire, fsync puis renommage) et, à la fin de chaque étape, leur
+empreinte SHA-256 est consignée dans un manifeste de reprise sous
+models/checkpoints. Après un arrêt brutal, `--resume` reprend l'exécution
+après la dernière étape terminée dont les artefacts sont intacts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def sha256_file(path, chunk_size=1 << 20):
+    """
+    Empreinte SHA-256 d'un fichier.
+
+    Parameters
+    ----------
+    path : str or Path
+        Fichier à hacher
+
+    Returns
+    -------
+    str
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+@contextmanager
+def atomic_write(path, mode='wb', **kwargs):
+    """
+    Écrit un fichier de façon atomique.
+
+    Le contenu est écrit dans un fichier temporaire du même répertoire, mis
+    sur disque puis renommé : un lecteur voit l'ancien fichier ou le nouveau,
+    jamais un fichier tronqué.
+
+    Parameters
+    ----------
+    path : str or Path
+        Fichier de destination
+    mode : str, default='wb'
+        Mode d'ouverture ('w' ou 'wb')
+    **kwargs
+        Arguments transmis à open (encoding...)
+
+    Yields
+    ------
+    file
+        Fichier temporaire ouvert en écriture
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(path.parent)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+class CheckpointManifest:
+    """
+    Manifeste de reprise : étapes terminées et empreintes de leurs artefacts.
+
+    Parameters
+    ----------
+    path : str or Path
+        Fichier JSON du manifeste
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.data = self._load()
+        # Étapes de l'exécution précédente, réutilisées pour les étapes à jour
+        self._previous = {}
+
+    def _load(self):
+        if self.path.exists():
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                logger.warning("Manifeste de reprise illisible, ignoré : %s", self.path)
+        return {'run_id': None, 'status': None, 'stages': {}}
+
+    def _save(self):
+        with atomic_write(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+
+    def start(self, resume=False):
+        """
+        Démarre une exécution, ou poursuit la précédente si resume.
+
+        Parameters
+        ----------
+        resume : bool
+            Conserve les étapes terminées de l'exécution précédente
+        """
+        if not resume or not self.data['run_id']:
+            self._previous = self.data['stages']
+            self.data = {
+                'run_id': datetime.now().strftime('%Y%m%d_%H%M%S'),
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'stages': {}
+            }
+        self.data['status'] = 'running'
+        self._save()
+
+    def complete_stage(self, name, outputs):
+        """
+        Consigne une étape terminée et l'empreinte de ses artefacts.
+
+        Parameters
+        ----------
+        name : str
+            Nom de l'étape
+        outputs : dict
+            Artefacts produits (nom -> chemin)
+        """
+        self.data['stages'][name] = {
+            'completed_at': datetime.now().isoformat(timespec='seconds'),
+            'outputs': {str(path): sha256_file(path) for path in outputs.values()}
+        }
+        self._save()
+
+    def carry_over(self, name, outputs):
+        """
+        Consigne une étape à jour (sautée) sans la réexécuter.
+
+        L'empreinte de l'exécution précédente est reprise si elle existe,
+        pour éviter de relire des artefacts volumineux à chaque exécution.
+
+        Parameters
+        ----------
+        name : str
+            Nom de l'étape
+        outputs : dict
+            Artefacts de l'étape (nom -> chemin)
+        """
+        previous = self._previous.get(name) or self.data['stages'].get(name)
+        if previous and set(previous['outputs']) == {str(path) for path in outputs.values()}:
+            self.data['stages'][name] = previous
+            self._save()
+        else:
+            self.complete_stage(name, outputs)
+
+    def finish(self, status):
+        """Consigne le statut final de l'exécution ('success' ou 'failed')."""
+        self.data['status'] = status
+        self.data['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self._save()
+
+    def verify(self, name):
+        """
+        Vérifie l'intégrité des artefacts d'une étape terminée.
+
+        Parameters
+        ----------
+        name : str
+            Nom de l'étape
+
+        Returns
+        -------
+        bool
+            True si l'étape est terminée et ses artefacts intacts
+        """
+        record = self.data['stages'].get(name)
+        if record is None:
+            return False
+        for path, digest in record['outputs'].items():
+            if not Path(path).exists():
+                logger.warning("[%s] artefact manquant, étape à refaire : %s", name, path)
+                return False
+            if sha256_file(path) != digest:
+                logger.warning("[%s] artefact altéré, étape à refaire : %s", name, path)
+                return False
+        return True
@@ -0,0 +1,448 @@
+"""
+Exécution incrémentale du pipeline sous forme de graphe d'étapes.
+
+Chaque étape déclare ses artefacts d'entrée et de sortie (fichiers), ses
+paramètres et les fichiers de code dont elle dépend. Une étape est sautée
+lorsque l'empreinte de ses entrées, paramètres et sources n'a pas changé
+depuis sa dernière exécution et que ses sorties sont intactes.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.utils.execution import process_pool, thread_pool
+from src.utils.instrumentation import measure
+from src.utils.profiler import profiled
+
+logger = logging.getLogger(__name__)
+
+def _hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class Stage:
+    """
+    Étape du pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Nom unique de l'étape
+    func : callable
+        Fonction appelée avec func(inputs, outputs, **params), où inputs et
+        outputs sont des dictionnaires nom -> chemin
+    inputs : dict, optional
+        Artefacts lus par l'étape
+    outputs : dict, optional
+        Artefacts produits par l'étape
+    params : dict, optional
+        Paramètres (sérialisables en JSON) inclus dans l'empreinte
+    sources : list, optional
+        Fichiers de code supplémentaires (gabarits de rapport, modules
+        appelés) inclus dans l'empreinte
+    executor : str, default='inline'
+        'inline', 'thread' ou 'process' ; les étapes 'thread' et 'process'
+        s'exécutent en parallèle des autres étapes prêtes
+    """
+
+    EXECUTORS = ('inline', 'thread', 'process')
+
+    def __init__(self, name, func, inputs=None, outputs=None, params=None, sources=None,
+                 executor='inline'):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Exécuteur inconnu pour l'étape {name} : {executor}")
+        self.name = name
+        self.func = func
+        self.inputs = {key: Path(path) for key, path in (inputs or {}).items()}
+        self.outputs = {key: Path(path) for key, path in (outputs or {}).items()}
+        self.params = params or {}
+        self.sources = [Path(path) for path in (sources or [])]
+        self.executor = executor
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+class PipelineRunner:
+    """
+    Ordonnanceur des étapes avec cache au niveau de l'étape.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Étapes du pipeline ; les dépendances sont déduites des artefacts
+    state_file : str or Path
+        Fichier JSON conservant les empreintes de la dernière exécution
+    manifest : RunManifest, optional
+        Manifeste recevant les mesures de chaque étape
+    trace_allocations : bool, optional
+        Active tracemalloc pendant les étapes (configuration par défaut) ;
+        le suivi ralentit nettement les imports et les petites allocations
+    profiler : StageProfiler, optional
+        Profileur appliqué à chaque étape exécutée (aucun par défaut)
+    checkpoint : CheckpointManifest, optional
+        Manifeste de reprise mis à jour à la fin de chaque étape
+    """
+
+    def __init__(self, stages, state_file, manifest=None, trace_allocations=None,
+                 profiler=None, checkpoint=None):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Les noms d'étapes doivent être uniques")
+        self.state_file = Path(state_file)
+        self.manifest = manifest
+        self.trace_allocations = trace_allocations
+        self.profiler = profiler
+        self.checkpoint = checkpoint
+        self.state = self._load_state()
+        self.order = self._topological_order()
+
+    # -- Graphe ------------------------------------------------------------
+
+    def dependencies(self, stage):
+        """
+        Étapes produisant les entrées d'une étape.
+
+        Parameters
+        ----------
+        stage : Stage
+            Étape considérée
+
+        Returns
+        -------
+        list of str
+            Noms des étapes amont
+        """
+        producers = {
+            path: other.name
+            for other in self.stages.values()
+            for path in other.outputs.values()
+        }
+        return sorted({producers[path] for path in stage.inputs.values() if path in producers})
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle détecté dans le pipeline autour de l'étape {name}")
+            visiting.add(name)
+            for dependency in self.dependencies(self.stages[name]):
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    # -- Empreintes --------------------------------------------------------
+
+    def _load_state(self):
+        if self.state_file.exists():
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_file)
+
+    def file_hash(self, path):
+        """
+        Empreinte du contenu d'un fichier, mise en cache par (taille, mtime).
+
+        Parameters
+        ----------
+        path : Path
+            Fichier à hacher
+
+        Returns
+        -------
+        str or None
+            Empreinte, ou None si le fichier n'existe pas
+        """
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.state['files'].get(str(path))
+        if cached and cached['signature'] == signature:
+            return cached['hash']
+        digest = _hash_file(path)
+        self.state['files'][str(path)] = {'signature': signature, 'hash': digest}
+        return digest
+
+    def fingerprint(self, stage):
+        """
+        Empreinte d'une étape : code, paramètres et contenu des entrées.
+
+        Parameters
+        ----------
+        stage : Stage
+            Étape considérée
+
+        Returns
+        -------
+        str
+            Empreinte hexadécimale
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(inspect.getsource(stage.func).encode())
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for key, path in sorted(stage.inputs.items()):
+            digest.update(f"{key}={self.file_hash(path)}".encode())
+        for path in stage.sources:
+            digest.update(f"{path}={self.file_hash(path)}".encode())
+        return digest.hexdigest()
+
+    def is_up_to_date(self, stage, fingerprint):
+        """
+        Indique si une étape peut être sautée.
+
+        Parameters
+        ----------
+        stage : Stage
+            Étape considérée
+        fingerprint : str
+            Empreinte courante de l'étape
+
+        Returns
+        -------
+        bool
+            True si l'empreinte est inchangée et les sorties intactes
+        """
+        record = self.state['stages'].get(stage.name)
+        if not record or record['fingerprint'] != fingerprint:
+            return False
+        return all(
+            self.file_hash(path) == record['outputs'].get(key)
+            for key, path in stage.outputs.items()
+        )
+
+    # -- Exécution ---------------------------------------------------------
+
+    def _check_inputs(self, stage):
+        missing = [str(path) for path in stage.inputs.values() if not path.exists()]
+        if missing:
+            raise FileNotFoundError(f"Entrées manquantes pour l'étape {stage.name} : {', '.join(missing)}")
+
+    def _record(self, stage, fingerprint, metrics=None, status='run'):
+        missing = [str(path) for path in stage.outputs.values() if not path.exists()]
+        if missing:
+            raise RuntimeError(f"L'étape {stage.name} n'a pas produit : {', '.join(missing)}")
+        self.state['stages'][stage.name] = {
+            'fingerprint': fingerprint,
+            'outputs': {key: self.file_hash(path) for key, path in stage.outputs.items()}
+        }
+        self._save_state()
+        if self.checkpoint is not None and status == 'run':
+            self.checkpoint.complete_stage(stage.name, stage.outputs)
+        if self.manifest is not None:
+            self.manifest.record(stage.name, status, metrics, stage.outputs, executor=stage.executor)
+
+    def _built_fingerprint(self, stage):
+        """Empreinte enregistrée avec les sorties actuelles de l'étape (None si inconnue)."""
+        record = self.state['stages'].get(stage.name)
+        if record and all(
+            self.file_hash(path) == record['outputs'].get(key)
+            for key, path in stage.outputs.items()
+        ):
+            return record['fingerprint']
+        return None
+
+    def _resumable(self, stage, status):
+        """Étape terminée lors de l'exécution interrompue, artefacts intacts."""
+        return (
+            self.checkpoint is not None
+            and all(status[dependency] in ('skipped', 'resumed') for dependency in self.dependencies(stage))
+            and self.checkpoint.verify(stage.name)
+        )
+
+    def _prepare(self, stage):
+        self._check_inputs(stage)
+        for path in stage.outputs.values():
+            path.parent.mkdir(parents=True, exist_ok=True)
+        return (
+            stage.name,
+            stage.func,
+            {key: str(path) for key, path in stage.inputs.items()},
+            {key: str(path) for key, path in stage.outputs.items()},
+            stage.params,
+            self.trace_allocations,
+            self.profiler
+        )
+
+    def run_stage(self, stage, fingerprint=None):
+        """
+        Exécute une étape dans le processus courant et enregistre son empreinte.
+
+        Parameters
+        ----------
+        stage : Stage
+            Étape à exécuter
+        fingerprint : str, optional
+            Empreinte déjà calculée
+        """
+        fingerprint = fingerprint or self.fingerprint(stage)
+        logger.info("[%s] exécution", stage.name)
+        metrics = _execute(*self._prepare(stage))
+        self._record(stage, fingerprint, metrics)
+
+    def run(self, force=(), force_all=False, resume=False):
+        """
+        Exécute le pipeline en sautant les étapes à jour.
+
+        Les étapes dont les dépendances sont satisfaites sont lancées
+        simultanément selon leur exécuteur : dans le processus courant
+        ('inline'), dans un pool de threads ('thread', E/S) ou dans un pool de
+        processus ('process', rendu matplotlib). Les empreintes sont
+        enregistrées par le processus principal et le statut est renvoyé dans
+        l'ordre topologique.
+
+        Avec resume, les étapes terminées lors de l'exécution interrompue dont
+        les artefacts passent le contrôle d'intégrité (SHA-256) sont reprises
+        telles quelles, même si leur code ou leurs paramètres ont changé
+        depuis.
+
+        Parameters
+        ----------
+        force : iterable of str
+            Étapes à réexécuter même si elles sont à jour
+        force_all : bool
+            Réexécute toutes les étapes
+        resume : bool
+            Reprend après la dernière étape terminée (nécessite un checkpoint)
+
+        Returns
+        -------
+        dict
+            Statut de chaque étape ('run', 'skipped' ou 'resumed')
+        """
+        unknown = set(force) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Étapes inconnues : {', '.join(sorted(unknown))}")
+
+        status = {}
+        pending = list(self.order)
+        running = {}
+        pools = {}
+
+        if resume and self.checkpoint is None:
+            raise ValueError("La reprise nécessite un manifeste de reprise (checkpoint)")
+        if self.checkpoint is not None:
+            self.checkpoint.start(resume=resume)
+
+        def pool(executor):
+            if executor not in pools:
+                pools[executor] = process_pool() if executor == 'process' else thread_pool()
+            return pools[executor]
+
+        try:
+            while pending or running:
+                ready = [
+                    name for name in pending
+                    if all(dependency in status for dependency in self.dependencies(self.stages[name]))
+                ]
+                inline = []
+                for name in ready:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    fingerprint = self.fingerprint(stage)
+                    forced = force_all or name in force
+                    if not forced and resume and self._resumable(stage, status):
+                        logger.info("[%s] reprise depuis le point de reprise", name)
+                        # Empreinte de construction de l'artefact repris, et
+                        # non l'empreinte courante : si le code ou les
+                        # paramètres ont changé, une exécution normale
+                        # ultérieure le recalcule
+                        self._record(stage, self._built_fingerprint(stage), status='resumed')
+                        status[name] = 'resumed'
+                    elif not forced and self.is_up_to_date(stage, fingerprint):
+                        logger.info("[%s] à jour, étape sautée", name)
+                        status[name] = 'skipped'
+                        if self.checkpoint is not None:
+                            self.checkpoint.carry_over(name, stage.outputs)
+                        if self.manifest is not None:
+                            self.manifest.record(name, 'skipped', executor=stage.executor)
+                    elif stage.executor == 'inline':
+                        inline.append((stage, fingerprint))
+                    else:
+                        logger.info("[%s] exécution (%s)", name, stage.executor)
+                        future = pool(stage.executor).submit(_execute, *self._prepare(stage))
+                        running[future] = (stage, fingerprint)
+
+                # Les étapes en pool sont soumises avant d'exécuter les étapes
+                # en ligne, pour qu'elles avancent en parallèle
+                for stage, fingerprint in inline:
+                    self.run_stage(stage, fingerprint)
+                    status[stage.name] = 'run'
+
+                if not running:
+                    continue
+                # Sans progrès local, on attend la fin d'une étape en cours
+                timeout = 0 if ready else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: self.order.index(running[f][0].name)):
+                    stage, fingerprint = running.pop(future)
+                    self._record(stage, fingerprint, future.result())
+                    logger.info("[%s] terminée", stage.name)
+                    status[stage.name] = 'run'
+        except BaseException:
+            # Étapes soumises pas encore démarrées : annulées avant l'arrêt
+            # des pools (shutdown(cancel_futures=...) n'existe qu'en 3.9+)
+            for future in running:
+                future.cancel()
+            if self.checkpoint is not None:
+                self.checkpoint.finish('failed')
+            raise
+        finally:
+            for executor in pools.values():
+                executor.shutdown(wait=True)
+            self._save_state()
+
+        if self.checkpoint is not None:
+            self.checkpoint.finish('success')
+
+        return {name: status[name] for name in self.order if name in status}
+
+def _execute(name, func, inputs, outputs, params, trace_allocations=None, profiler=None):
+    """
+    Appelle la fonction d'une étape et la mesure (point d'entrée des workers).
+
+    Returns
+    -------
+    dict
+        Mesures de l'étape, complétées par les compteurs qu'elle renvoie
+        (par exemple {'rows': ...})
+    """
+    # Profil pris à l'intérieur de measure (l'instantané tracemalloc de fin
+    # d'étape n'y figure pas) et sans tracemalloc, qui ralentit chaque
+    # allocation et fausserait la répartition du temps
+    if profiler is not None:
+        trace_allocations = False
+    with measure(trace_allocations) as metrics, profiled(profiler, name):
+        result = func(inputs, outputs, **params)
+    if isinstance(result, dict):
+        metrics.update(result)
+    return metrics
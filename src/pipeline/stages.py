@@ -0,0 +1,311 @@
+"""
+Étapes du pipeline de segmentation Tunisie Telecom.
+
+Chaque étape lit et écrit des artefacts sur disque, ce qui permet au
+PipelineRunner de sauter celles dont les entrées n'ont pas changé. Une étape
+peut renvoyer des compteurs (par exemple {'rows': ...}) repris dans le
+manifeste d'exécution. Les artefacts sont écrits de façon atomique pour que
+`--resume` puisse s'appuyer sur eux après un arrêt brutal. Les
+bibliothèques lourdes sont importées dans les étapes qui en ont besoin.
+
+Sous `--memory-budget`, les étapes reçoivent le plan mémoire (mode,
+précision, taille des blocs) : en mode 'streaming', les données ne sont
+jamais chargées en entier et seuls les labels restent en mémoire.
+"""
+
+import json
+import logging
+import pickle
+from contextlib import nullcontext
+
+from config import (
+    BASE_PATH,
+    RAW_DATA_PATH,
+    PROCESSED_DATA_PATH,
+    INTERIM_DATA_PATH,
+    FIGURES_PATH,
+    MODELS_PATH,
+    CHECKPOINTS_PATH
+)
+from src.config import MEMORY_PARAMS
+from src.pipeline.checkpoints import atomic_write
+from src.pipeline.runner import Stage
+
+# Artefacts intermédiaires
+RAW_DATA_FILE = RAW_DATA_PATH / 'donnees_clients.csv'
+PROCESSED_DATA_FILE = PROCESSED_DATA_PATH / 'donnees_pretraitees.csv'
+MODEL_FILE = MODELS_PATH / 'saved' / 'segmentation.pkl'
+LABELS_FILE = CHECKPOINTS_PATH / 'labels.npy'
+SCORES_FILE = INTERIM_DATA_PATH / 'scores.json'
+PROFILES_FILE = INTERIM_DATA_PATH / 'profiles.pkl'
+OFFERS_FILE = INTERIM_DATA_PATH / 'offres.json'
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _dump_pickle(obj, path):
+    with atomic_write(path) as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _dump_json(obj, path, **kwargs):
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2, **kwargs)
+
+def _load_offers(path):
+    with open(path, encoding='utf-8') as f:
+        return {int(cluster): offer for cluster, offer in json.load(f).items()}
+
+def _read_features(path, dtype):
+    """Données prétraitées, features du clustering lues dans la précision du plan."""
+    import pandas as pd
+    from src.config import NUMERIC_FEATURES
+
+    return pd.read_csv(path, dtype=dict.fromkeys(NUMERIC_FEATURES, dtype))
+
+def _load_labels(path):
+    import numpy as np
+    return np.load(path)
+
+def _working_memory(working_memory):
+    """Borne les matrices de distances calculées par scikit-learn (Mo)."""
+    if working_memory is None:
+        return nullcontext()
+    import sklearn
+    return sklearn.config_context(working_memory=working_memory)
+
+def preprocess(inputs, outputs, mode='memory', dtype='float64', chunksize=None):
+    """Chargement et prétraitement des données brutes."""
+    import pandas as pd
+    from src.data.data_loader import DataLoader
+
+    data_loader = DataLoader()
+    with atomic_write(outputs['processed'], 'w', encoding='utf-8', newline='') as f:
+        if mode == 'streaming':
+            rows = data_loader.preprocess_csv(inputs['raw'], f, chunksize, dtype)
+        else:
+            processed_data = data_loader.preprocess_data(pd.read_csv(inputs['raw']))
+            if dtype != 'float64':
+                floats = processed_data.select_dtypes('float64').columns
+                processed_data[floats] = processed_data[floats].astype(dtype)
+            processed_data.to_csv(f, index=False)
+            rows = len(processed_data)
+    logging.info(f"Données prétraitées : {rows:,} lignes")
+    return {'rows': rows}
+
+def fit(inputs, outputs, mode='memory', dtype='float64', chunksize=None, working_memory=None):
+    """Entraînement du modèle de segmentation."""
+    import numpy as np
+    from src.models.segmentation import CustomerSegmentation
+
+    segmentation = CustomerSegmentation()
+    with _working_memory(working_memory):
+        if mode == 'streaming':
+            segmentation.fit_csv(inputs['processed'], chunksize, dtype)
+            labels = segmentation.predict_csv(inputs['processed'], chunksize, dtype)
+        else:
+            segmentation.fit(_read_features(inputs['processed'], dtype))
+            labels = segmentation.labels
+    _dump_pickle(segmentation, outputs['model'])
+    with atomic_write(outputs['labels']) as f:
+        np.save(f, labels)
+    return {'rows': len(labels)}
+
+def evaluate(inputs, outputs, mode='memory', dtype='float64', chunksize=None,
+             working_memory=None, silhouette_sample_size=None):
+    """Évaluation de la segmentation."""
+    segmentation = _load_pickle(inputs['model'])
+    with _working_memory(working_memory):
+        if mode == 'streaming':
+            labels = _load_labels(inputs['labels'])
+            scores = segmentation.evaluate_csv(
+                inputs['processed'], labels, chunksize, silhouette_sample_size, dtype
+            )
+            rows = len(labels)
+        else:
+            processed_data = _read_features(inputs['processed'], dtype)
+            scores = segmentation.evaluate_clustering(processed_data, silhouette_sample_size)
+            rows = len(processed_data)
+    logging.info(f"Scores d'évaluation : {scores}")
+    _dump_json({name: float(value) for name, value in scores.items()}, outputs['scores'])
+    return {'rows': rows}
+
+def profile(inputs, outputs, mode='memory', dtype='float64', chunksize=None, working_memory=None):
+    """Profils des segments et offres commerciales."""
+    segmentation = _load_pickle(inputs['model'])
+    with _working_memory(working_memory):
+        if mode == 'streaming':
+            labels = _load_labels(inputs['labels'])
+            profiles = segmentation.get_segment_profiles_csv(inputs['processed'], labels, chunksize, dtype)
+            rows = len(labels)
+        else:
+            processed_data = _read_features(inputs['processed'], dtype)
+            profiles = segmentation.get_segment_profiles(processed_data)
+            rows = len(processed_data)
+    _dump_pickle(profiles, outputs['profiles'])
+    _dump_json(segmentation.get_commercial_offers(), outputs['offers'], ensure_ascii=False)
+    return {'rows': rows}
+
+# Données nécessaires à chaque figure ; chaque figure est une étape distincte
+# rendue dans un processus séparé (matplotlib n'est pas thread-safe).
+FIGURE_INPUTS = {
+    'cluster_distribution': ('labels',),
+    'cluster_centers': ('model',),
+    'feature_importance': ('model',),
+    'cluster_profiles': ('profiles',),
+    'clustering_results': ('processed', 'labels'),
+    'commercial_offers': ('offers',)
+}
+
+# Rapports générés chacun par une étape distincte, écrits depuis des threads
+REPORTS = {
+    'segment_report': ('generate_segment_report', 'rapport_segmentation'),
+    'executive_summary': ('generate_executive_summary', 'resume_executif'),
+    'marketing_strategy': ('generate_marketing_strategy', 'strategie_marketing')
+}
+
+def plot(inputs, outputs, figure, sample_size=None, chunksize=None):
+    """Génération d'une visualisation."""
+    import matplotlib
+    matplotlib.use('Agg')
+    from src.models.visualization import SegmentationVisualizer
+
+    visualizer = SegmentationVisualizer()
+    if figure == 'cluster_profiles':
+        visualizer.plot_cluster_profiles(_load_pickle(inputs['profiles']))
+    elif figure == 'commercial_offers':
+        visualizer.plot_commercial_offers(_load_offers(inputs['offers']))
+    elif figure == 'cluster_distribution':
+        visualizer.plot_cluster_distribution(_load_labels(inputs['labels']))
+    elif figure == 'clustering_results':
+        labels = _load_labels(inputs['labels'])
+        if sample_size is not None and len(labels) > sample_size:
+            # Projection ACP sur un échantillon lu par blocs
+            from src.models.streaming import sample_rows
+            index, processed_data = sample_rows(inputs['processed'], len(labels), sample_size,
+                                                chunksize=chunksize)
+            labels = labels[index]
+        else:
+            import pandas as pd
+            processed_data = pd.read_csv(inputs['processed'])
+        visualizer.plot_clustering_results(processed_data, labels)
+    else:
+        segmentation = _load_pickle(inputs['model'])
+        if figure == 'cluster_centers':
+            visualizer.plot_cluster_centers(segmentation.get_cluster_centers())
+        elif figure == 'feature_importance':
+            visualizer.plot_feature_importance(segmentation.feature_importance)
+    logging.info(f"Figure générée : {outputs['figure']}")
+
+def report(inputs, outputs, name):
+    """Génération d'un rapport."""
+    from config import REPORTS_PATH
+    from src.models.reporting import SegmentationReporter
+
+    method, prefix = REPORTS[name]
+    profiles = _load_pickle(inputs['profiles'])
+    reporter = SegmentationReporter()
+    getattr(reporter, method)(profiles)
+
+    generated = str(REPORTS_PATH / f"{prefix}_{reporter.timestamp}.md")
+    _dump_json([generated], outputs['manifest'])
+    logging.info(f"Rapport généré : {generated}")
+
+def _sources(*paths):
+    return [BASE_PATH / path for path in paths]
+
+def build_pipeline(plan=None):
+    """
+    Construit le graphe des étapes du pipeline de segmentation.
+
+    Parameters
+    ----------
+    plan : MemoryPlan, optional
+        Plan mémoire issu de --memory-budget ; sans plan, les étapes
+        chargent les données en entier, en float64
+
+    Returns
+    -------
+    list of Stage
+        Étapes du pipeline
+    """
+    segmentation_sources = _sources(
+        'src/config.py',
+        'src/models/segmentation.py',
+        'src/models/profiling.py',
+        'src/models/importance.py',
+        'src/models/streaming.py',
+        'src/models/microclusters.py',
+        'src/models/fit_cache.py',
+        'src/utils/execution.py'
+    )
+    # Les paramètres du plan entrent dans l'empreinte des étapes : changer de
+    # mode ou de précision les réexécute
+    data_params = {}
+    model_params = {}
+    plot_params = {}
+    if plan is not None:
+        data_params = {'mode': plan.mode, 'dtype': plan.dtype, 'chunksize': plan.chunksize}
+        model_params = dict(data_params, working_memory=plan.working_memory)
+        if plan.streaming:
+            plot_params = {'sample_size': MEMORY_PARAMS['plot_sample_size'], 'chunksize': plan.chunksize}
+    stages = [
+        Stage(
+            'preprocess', preprocess,
+            inputs={'raw': RAW_DATA_FILE},
+            outputs={'processed': PROCESSED_DATA_FILE},
+            params=data_params,
+            sources=_sources('config.py', 'src/data/data_loader.py')
+        ),
+        Stage(
+            'fit', fit,
+            inputs={'processed': PROCESSED_DATA_FILE},
+            outputs={'model': MODEL_FILE, 'labels': LABELS_FILE},
+            params=model_params,
+            sources=segmentation_sources
+        ),
+        Stage(
+            'evaluate', evaluate,
+            inputs={'processed': PROCESSED_DATA_FILE, 'model': MODEL_FILE, 'labels': LABELS_FILE},
+            outputs={'scores': SCORES_FILE},
+            params=dict(model_params, silhouette_sample_size=plan.silhouette_sample_size) if plan else {},
+            sources=segmentation_sources
+        ),
+        Stage(
+            'profile', profile,
+            inputs={'processed': PROCESSED_DATA_FILE, 'model': MODEL_FILE, 'labels': LABELS_FILE},
+            outputs={'profiles': PROFILES_FILE, 'offers': OFFERS_FILE},
+            params=model_params,
+            sources=segmentation_sources
+        ),
+    ]
+    artefacts = {
+        'processed': PROCESSED_DATA_FILE,
+        'model': MODEL_FILE,
+        'labels': LABELS_FILE,
+        'profiles': PROFILES_FILE,
+        'offers': OFFERS_FILE
+    }
+    stages += [
+        Stage(
+            f'plot_{figure}', plot,
+            inputs={key: artefacts[key] for key in keys},
+            outputs={'figure': FIGURES_PATH / f'{figure}.png'},
+            params=dict(plot_params if figure == 'clustering_results' else {}, figure=figure),
+            sources=_sources('config.py', 'src/models/visualization.py'),
+            executor='process'
+        )
+        for figure, keys in FIGURE_INPUTS.items()
+    ]
+    stages += [
+        Stage(
+            f'report_{name}', report,
+            inputs={'profiles': PROFILES_FILE},
+            outputs={'manifest': INTERIM_DATA_PATH / f'rapport_{name}.json'},
+            params={'name': name},
+            sources=_sources('config.py', 'src/models/reporting.py'),
+            executor='thread'
+        )
+        for name in REPORTS
+    ]
+    return stages
@@ -18,6 +18,7 @@ from src.config import (
     KPI_THRESHOLDS,
     REPORTS_DIR
 )
+from src.models.profiling import compute_profiles
 
 class SegmentationReporter:
     """
@@ -42,27 +43,46 @@ class SegmentationReporter:
         """
         return pd.read_csv(input_file)
     
-    def generate_executive_summary(self, df):
+    def compute_profiles(self, df):
+        """
+        Calcule la table des profils des segments en une passe.
+        
+        Args:
+            df (pd.DataFrame): DataFrame contenant les données segmentées
+            
+        Returns:
+            SegmentProfiles: Profils des segments
+        """
+        return compute_profiles(
+            df,
+            df['segment'].to_numpy(),
+            n_clusters=len(SEGMENT_LABELS),
+            features=self.features
+        )
+    
+    def generate_executive_summary(self, df, profiles=None):
         """
         Génère un résumé exécutif de la segmentation.
         
         Args:
             df (pd.DataFrame): DataFrame contenant les données segmentées
+            profiles (SegmentProfiles): Profils déjà calculés (optionnel)
         """
         # Calcul des statistiques globales
         total_clients = len(df)
-        segment_distribution = df['segment_label'].value_counts()
+        if profiles is None:
+            profiles = self.compute_profiles(df)
+        means = profiles.stat('mean')
         
         # Calcul des KPIs par segment
         segment_kpis = {}
-        for segment in SEGMENT_LABELS.values():
-            segment_data = df[df['segment_label'] == segment]
+        for cluster, segment in SEGMENT_LABELS.items():
             kpis = {
-                'nombre_clients': len(segment_data),
-                'pourcentage': len(segment_data) / total_clients * 100,
-                'consommation_moyenne': segment_data['consommation_mensuelle'].mean(),
-                'satisfaction_moyenne': segment_data['satisfaction'].mean(),
-                'fidelite_moyenne': segment_data['fidelite'].mean()
+                'nombre_clients': int(profiles.sizes[cluster]),
+                'pourcentage': profiles.percentages[cluster],
+                'consommation_moyenne': means.loc[cluster, 'consommation_mensuelle'],
+                'satisfaction_moyenne': means.loc[cluster, 'satisfaction'],
+                'fidelite_moyenne': means.loc[cluster, 'fidelite']
             }
             segment_kpis[segment] = kpis
         
@@ -108,24 +128,28 @@ Date: {self.date}
             f.write(report)
         print(f"Résumé exécutif sauvegardé dans {output_file}")
     
-    def generate_marketing_strategy(self, df):
+    def generate_marketing_strategy(self, df, profiles=None):
         """
         Génère une stratégie marketing basée sur la segmentation.
         
         Args:
             df (pd.DataFrame): DataFrame contenant les données segmentées
+            profiles (SegmentProfiles): Profils déjà calculés (optionnel)
         """
+        if profiles is None:
+            profiles = self.compute_profiles(df)
+        means = profiles.stat('mean')
+        
         # Analyse des segments
         segment_analysis = {}
-        for segment in SEGMENT_LABELS.values():
-            segment_data = df[df['segment_label'] == segment]
+        for cluster, segment in SEGMENT_LABELS.items():
             analysis = {
-                'taille': len(segment_data),
-                'pourcentage': len(segment_data) / len(df) * 100,
+                'taille': int(profiles.sizes[cluster]),
+                'pourcentage': profiles.percentages[cluster],
                 'profil': {
-                    'age_moyen': segment_data['age'].mean(),
-                    'revenu_moyen': segment_data['revenu_mensuel'].mean(),
-                    'consommation_moyenne': segment_data['consommation_mensuelle'].mean()
+                    'age_moyen': means.loc[cluster, 'age'],
+                    'revenu_moyen': means.loc[cluster, 'revenu_mensuel'],
+                    'consommation_moyenne': means.loc[cluster, 'consommation_mensuelle']
                 }
             }
             segment_analysis[segment] = analysis
@@ -227,9 +251,12 @@ Date: {self.date}
         # Chargement des données
         df = self.load_data(input_file)
         
+        # Un seul calcul des profils partagé par les rapports
+        profiles = self.compute_profiles(df)
+        
         # Génération des rapports
-        self.generate_executive_summary(df)
-        self.generate_marketing_strategy(df)
+        self.generate_executive_summary(df, profiles)
+        self.generate_marketing_strategy(df, profiles)
 
 if __name__ == "__main__":
     # Création et utilisation du reporter
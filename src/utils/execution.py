@@ -0,0 +1,140 @@
+"""
+Budget d'exécution coordonné entre BLAS, OpenMP et les pools de workers.
+
+KMeans (OpenMP), NumPy (BLAS) et les pools de processus choisissent chacun
+leur nombre de threads. Ce module répartit un budget unique : chaque worker
+reçoit `threads_per_worker` threads, et le processus principal plafonne ses
+bibliothèques natives à `total_threads`.
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import sys
+
+from threadpoolctl import threadpool_limits
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import EXECUTION_BUDGET
+
+# Variables lues par les bibliothèques natives au chargement dans un worker
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS'
+)
+
+# Limite fixée par l'initialiseur lorsque le processus est un worker du pool
+_worker_threads = None
+
+class ExecutionBudget:
+    """
+    Répartition du budget en workers x threads.
+    """
+
+    def __init__(self, total_threads=None, max_workers=None):
+        total_threads = total_threads or os.cpu_count() or 1
+        max_workers = max_workers or min(4, total_threads)
+        self.total_threads = total_threads
+        self.max_workers = max(1, min(max_workers, total_threads))
+        self.threads_per_worker = max(1, total_threads // self.max_workers)
+
+    def __repr__(self):
+        return (f"ExecutionBudget(total_threads={self.total_threads}, "
+                f"max_workers={self.max_workers}, "
+                f"threads_per_worker={self.threads_per_worker})")
+
+def get_budget(total_threads=None, max_workers=None):
+    """
+    Construit le budget depuis les arguments, l'environnement ou la configuration.
+
+    Args:
+        total_threads (int): Nombre total de threads autorisés
+        max_workers (int): Nombre maximal de processus workers
+
+    Returns:
+        ExecutionBudget: Budget d'exécution
+    """
+    if total_threads is None:
+        total_threads = int(os.environ.get('SEGMENTATION_THREADS', 0)) or EXECUTION_BUDGET['total_threads']
+    if max_workers is None:
+        max_workers = int(os.environ.get('SEGMENTATION_WORKERS', 0)) or EXECUTION_BUDGET['max_workers']
+    return ExecutionBudget(total_threads, max_workers)
+
+def current_thread_limit():
+    """
+    Nombre de threads natifs autorisés dans le processus courant.
+
+    Returns:
+        int: threads_per_worker dans un worker, total_threads sinon
+    """
+    if _worker_threads is not None:
+        return _worker_threads
+    return get_budget().total_threads
+
+@contextmanager
+def limit_threads(n_threads=None):
+    """
+    Plafonne les threads BLAS et OpenMP le temps d'un bloc.
+
+    Args:
+        n_threads (int): Limite (current_thread_limit() par défaut)
+    """
+    with threadpool_limits(limits=n_threads or current_thread_limit()):
+        yield
+
+def budgeted(func):
+    """Décorateur appliquant le budget de threads à un point d'entrée."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with limit_threads():
+            return func(*args, **kwargs)
+    return wrapper
+
+def _init_worker(n_threads):
+    """Initialise un worker : limite ses threads natifs au budget alloué."""
+    global _worker_threads
+    _worker_threads = n_threads
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(n_threads)
+    threadpool_limits(limits=n_threads)
+
+def process_pool(max_workers=None, threads_per_worker=None):
+    """
+    Crée un pool de processus respectant le budget.
+
+    Args:
+        max_workers (int): Nombre de workers (budget par défaut)
+        threads_per_worker (int): Threads natifs par worker (budget par défaut)
+
+    Returns:
+        ProcessPoolExecutor: Pool dont chaque worker est limité
+    """
+    budget = get_budget(max_workers=max_workers)
+    threads = threads_per_worker or budget.threads_per_worker
+    return ProcessPoolExecutor(
+        max_workers=budget.max_workers,
+        initializer=_init_worker,
+        initargs=(threads,)
+    )
+
+def thread_pool(max_workers=None):
+    """
+    Crée un pool de threads dimensionné par le budget (tâches d'E/S).
+
+    Args:
+        max_workers (int): Nombre de threads (budget par défaut)
+
+    Returns:
+        ThreadPoolExecutor: Pool de threads
+    """
+    return ThreadPoolExecutor(max_workers=max_workers or get_budget().max_workers)
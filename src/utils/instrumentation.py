@@ -0,0 +1,338 @@
+"""
+Instrumentation des étapes du pipeline et manifeste d'exécution.
+
+Chaque étape est mesurée (temps réel, temps CPU, pic de mémoire résidente,
+principaux sites d'allocation tracemalloc, nombre de lignes, taille des
+sorties) et le tout est écrit dans un manifeste JSON sous logs/. Deux
+manifestes se comparent en ligne de commande :
+
+    python -m src.utils.instrumentation compare logs/run_A.json logs/run_B.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import INSTRUMENTATION_PARAMS
+from src.utils.profiler import profiled
+
+# tracemalloc est global au processus : compteur des mesures en cours
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+def _reset_peak_rss():
+    """Remet à zéro le pic de mémoire résidente (Linux), si possible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _max_rss_mb():
+    """Pic de mémoire résidente depuis le démarrage du processus, en Mo (None sans resource)."""
+    if resource is None:
+        return None
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+def _peak_rss_mb():
+    """Pic de mémoire résidente du processus, en Mo (None si indisponible)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _max_rss_mb()
+
+def _round_mb(value):
+    """Arrondi d'une mesure de mémoire, None conservé (plateforme sans mesure)."""
+    return None if value is None else round(value, 2)
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+def _stop_tracemalloc(top_n):
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    ))
+    top = [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_mb': round(stat.size / (1024 * 1024), 3),
+            'count': stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:top_n]
+    ]
+    return top, peak / (1024 * 1024)
+
+@contextmanager
+def measure(trace_allocations=None, top_n=None):
+    """
+    Mesure le bloc exécuté : temps, CPU, mémoire et allocations.
+
+    Le dictionnaire renvoyé est complété à la sortie du bloc. Dans un thread
+    secondaire, le temps CPU est celui du thread ; le pic de mémoire et les
+    allocations restent ceux du processus.
+
+    Args:
+        trace_allocations (bool): Active tracemalloc (configuration par défaut)
+        top_n (int): Nombre de sites d'allocation conservés
+
+    Yields:
+        dict: Mesures de l'étape
+    """
+    if trace_allocations is None:
+        trace_allocations = INSTRUMENTATION_PARAMS['trace_allocations']
+    top_n = top_n or INSTRUMENTATION_PARAMS['top_allocators']
+    main_thread = threading.current_thread() is threading.main_thread()
+    cpu_clock = time.process_time if main_thread else time.thread_time
+
+    metrics = {'pid': os.getpid()}
+    if main_thread:
+        _reset_peak_rss()
+    if trace_allocations:
+        _start_tracemalloc()
+    wall_start, cpu_start = time.perf_counter(), cpu_clock()
+    try:
+        yield metrics
+    finally:
+        metrics['wall_time'] = round(time.perf_counter() - wall_start, 4)
+        metrics['cpu_time'] = round(cpu_clock() - cpu_start, 4)
+        metrics['peak_rss_mb'] = _round_mb(_peak_rss_mb())
+        if trace_allocations:
+            top, peak = _stop_tracemalloc(top_n)
+            metrics['traced_peak_mb'] = round(peak, 3)
+            metrics['top_allocations'] = top
+
+def output_sizes(paths):
+    """
+    Taille des fichiers produits.
+
+    Args:
+        paths (dict): Nom -> chemin
+
+    Returns:
+        dict: Nom -> taille en octets (None si absent)
+    """
+    return {
+        key: Path(path).stat().st_size if Path(path).exists() else None
+        for key, path in paths.items()
+    }
+
+class RunManifest:
+    """
+    Manifeste d'une exécution du pipeline.
+
+    Args:
+        name (str): Nom du pipeline (préfixe du fichier)
+        logs_dir (str | Path): Répertoire des manifestes
+        profiler (StageProfiler): Profileur des étapes (--profile), sans
+            tracemalloc pendant le profilage
+    """
+
+    def __init__(self, name='run', logs_dir=None, profiler=None):
+        self.name = name
+        self.profiler = profiler
+        self.logs_dir = Path(logs_dir or project_root / 'logs')
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.stages = {}
+        self.data = {
+            'name': name,
+            # Microsecondes et pid : deux exécutions dans la même seconde
+            # n'écrivent pas le même manifeste
+            'run_id': f"{self.started.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}",
+            'started_at': self.started.isoformat(timespec='seconds'),
+            'host': {
+                'hostname': socket.gethostname(),
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count()
+            },
+            'stages': self.stages
+        }
+
+    @property
+    def path(self):
+        return self.logs_dir / f"{self.name}_{self.data['run_id']}.json"
+
+    def record(self, stage, status, metrics=None, outputs=None, **extra):
+        """
+        Enregistre les mesures d'une étape.
+
+        Args:
+            stage (str): Nom de l'étape
+            status (str): 'run' ou 'skipped'
+            metrics (dict): Mesures renvoyées par measure()
+            outputs (dict): Sorties de l'étape (nom -> chemin)
+            **extra: Champs supplémentaires (exécuteur...)
+        """
+        entry = {'status': status, **extra}
+        entry.update(metrics or {})
+        if outputs:
+            entry['output_bytes'] = output_sizes(outputs)
+        self.stages[stage] = entry
+
+    @contextmanager
+    def stage(self, name, outputs=None):
+        """
+        Mesure une étape exécutée dans le bloc et l'enregistre.
+
+        Args:
+            name (str): Nom de l'étape
+            outputs (dict): Sorties à mesurer après le bloc
+
+        Yields:
+            dict: Mesures, où le bloc peut renseigner 'rows'
+        """
+        status = 'failed'
+        try:
+            trace_allocations = False if self.profiler is not None else None
+            with measure(trace_allocations) as metrics, profiled(self.profiler, name):
+                yield metrics
+            status = 'run'
+        finally:
+            self.record(name, status, metrics, outputs)
+
+    def write(self, status='success'):
+        """
+        Écrit le manifeste (écriture atomique).
+
+        Args:
+            status (str): Statut global de l'exécution
+
+        Returns:
+            Path: Chemin du manifeste
+        """
+        self.data['status'] = status
+        self.data['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self.data['wall_time'] = round(time.perf_counter() - self._start, 4)
+        self.data['cpu_time'] = round(time.process_time() - self._cpu_start, 4)
+        self.data['peak_rss_mb'] = _round_mb(_max_rss_mb())
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+def load_manifest(path):
+    """Charge un manifeste JSON."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+COMPARED_METRICS = ('wall_time', 'cpu_time', 'peak_rss_mb', 'rows')
+
+def compare_manifests(baseline, candidate, threshold=None):
+    """
+    Compare deux manifestes étape par étape.
+
+    Args:
+        baseline (dict): Manifeste de référence
+        candidate (dict): Manifeste comparé
+        threshold (float): Hausse relative signalée comme régression
+
+    Returns:
+        list: Une ligne par (étape, métrique) avec 'regression' à True si
+        la hausse dépasse le seuil
+    """
+    threshold = INSTRUMENTATION_PARAMS['regression_threshold'] if threshold is None else threshold
+    rows = []
+    names = list(baseline['stages']) + [
+        name for name in candidate['stages'] if name not in baseline['stages']
+    ]
+    for name in names:
+        before = baseline['stages'].get(name, {})
+        after = candidate['stages'].get(name, {})
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if old is None and new is None:
+                continue
+            change = (new - old) / old if old and new is not None else None
+            rows.append({
+                'stage': name,
+                'metric': metric,
+                'baseline': old,
+                'candidate': new,
+                'change': change,
+                # Les étapes sautées ne sont pas comparables
+                'regression': (
+                    change is not None and change > threshold and metric != 'rows'
+                    and before.get('status') == after.get('status') == 'run'
+                )
+            })
+    return rows
+
+def _format(value):
+    if value is None:
+        return '-'
+    return f"{value:,.3f}" if isinstance(value, float) else f"{value:,}"
+
+def print_comparison(rows):
+    """Affiche le tableau de comparaison."""
+    print(f"{'étape':<32} {'métrique':<12} {'référence':>12} {'comparé':>12} {'écart':>9}")
+    for row in rows:
+        change = '-' if row['change'] is None else f"{row['change']:+.1%}"
+        flag = '  RÉGRESSION' if row['regression'] else ''
+        print(f"{row['stage']:<32} {row['metric']:<12} {_format(row['baseline']):>12} "
+              f"{_format(row['candidate']):>12} {change:>9}{flag}")
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Manifestes d'exécution du pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compare = subparsers.add_parser('compare', help="Compare deux manifestes")
+    compare.add_argument('baseline', help="Manifeste de référence")
+    compare.add_argument('candidate', help="Manifeste comparé")
+    compare.add_argument('--threshold', type=float, default=None,
+                         help="Hausse relative signalée comme régression (ex. 0.1)")
+
+    args = parser.parse_args(argv)
+    rows = compare_manifests(load_manifest(args.baseline), load_manifest(args.candidate), args.threshold)
+    print_comparison(rows)
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) au-delà du seuil")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
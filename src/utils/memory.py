@@ -0,0 +1,217 @@
+"""
+Planification de l'exécution sous contrainte mémoire (option --memory-budget).
+
+À partir du budget et de la taille de l'entrée, le plan choisit :
+- la précision des features (float64, puis float32 si nécessaire) ;
+- le chemin en mémoire ou le chemin en flux (lecture par blocs,
+  micro-clusters pour le clustering, accumulateurs pour les profils) ;
+- la taille des blocs et celle de l'échantillon de silhouette ;
+- la mémoire de travail de scikit-learn (`working_memory`), qui borne les
+  matrices de distances calculées par morceaux (silhouette, affectation aux
+  micro-clusters).
+
+Si même le chemin en flux ne tient pas, MemoryBudgetError est levée avant
+toute exécution, avec l'estimation détaillée.
+"""
+
+import math
+import os
+import re
+from pathlib import Path
+import sys
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import (
+    EVALUATION_PARAMS,
+    FEATURE_IMPORTANCE_PARAMS,
+    MEMORY_PARAMS,
+    MICROCLUSTER_PARAMS,
+    N_CLUSTERS,
+    NUMERIC_FEATURES,
+    PROFILE_PARAMS
+)
+
+_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+class MemoryBudgetError(MemoryError):
+    """Le travail ne tient pas dans le budget mémoire."""
+
+def parse_size(text):
+    """
+    Convertit une taille lisible en octets ('2G', '512M', '1.5GB', '300000000').
+
+    Args:
+        text (str | int): Taille
+
+    Returns:
+        int: Nombre d'octets
+    """
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Taille mémoire invalide : {text!r} (ex. 2G, 512M)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+def format_size(n_bytes):
+    """Taille lisible (Mo/Go)."""
+    if n_bytes >= 1 << 30:
+        return f"{n_bytes / (1 << 30):.2f} Go"
+    return f"{n_bytes / (1 << 20):.0f} Mo"
+
+def inspect_csv(path, sample_bytes=1 << 20):
+    """
+    Estime le nombre de lignes et de colonnes d'un CSV sans le charger.
+
+    Args:
+        path (str | Path): Fichier CSV
+        sample_bytes (int): Octets lus pour estimer la longueur d'une ligne
+
+    Returns:
+        tuple: (nombre de lignes estimé, nombre de colonnes)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        sample = f.read(sample_bytes)
+    n_columns = header.count(b',') + 1
+    lines = sample.count(b'\n')
+    if lines == 0:
+        return (1 if sample.strip() else 0), n_columns
+    if len(sample) < sample_bytes:
+        # Fichier entièrement lu
+        return lines + (0 if sample.endswith(b'\n') else 1), n_columns
+    return int((size - len(header)) / (len(sample) / lines)), n_columns
+
+class MemoryPlan:
+    """
+    Plan d'exécution retenu pour un budget donné.
+
+    Args:
+        budget (int): Budget mémoire en octets
+        n_rows (int): Nombre de lignes de l'entrée
+        mode (str): 'memory' ou 'streaming'
+        dtype (str): 'float64' ou 'float32'
+        chunksize (int | None): Lignes par bloc (chemin en flux)
+        silhouette_sample_size (int): Taille de l'échantillon de silhouette
+        estimate (dict): Estimations détaillées en octets
+    """
+
+    def __init__(self, budget, n_rows, mode, dtype, chunksize, silhouette_sample_size, estimate):
+        self.budget = budget
+        self.n_rows = n_rows
+        self.mode = mode
+        self.dtype = dtype
+        self.chunksize = chunksize
+        self.silhouette_sample_size = silhouette_sample_size
+        self.estimate = estimate
+        # Mémoire de travail scikit-learn (Mo) : la réserve des matrices de distances
+        self.working_memory = max(8, estimate['distances'] >> 20)
+
+    @property
+    def streaming(self):
+        return self.mode == 'streaming'
+
+    def stage_params(self):
+        """
+        Paramètres transmis aux étapes du pipeline.
+
+        Returns:
+            dict: mode, précision, taille des blocs et de l'échantillon
+        """
+        return {
+            'mode': self.mode,
+            'dtype': self.dtype,
+            'chunksize': self.chunksize,
+            'silhouette_sample_size': self.silhouette_sample_size,
+            'working_memory': self.working_memory
+        }
+
+    def describe(self):
+        """Résumé lisible du plan."""
+        details = ', '.join(f"{name} {format_size(value)}" for name, value in self.estimate.items())
+        chunk = f", blocs de {self.chunksize:,} lignes" if self.chunksize else ''
+        return (f"budget {format_size(self.budget)} pour ~{self.n_rows:,} lignes : "
+                f"chemin {self.mode}, {self.dtype}{chunk}, "
+                f"silhouette sur {self.silhouette_sample_size:,} lignes ({details})")
+
+    def __repr__(self):
+        return f"MemoryPlan({self.describe()})"
+
+def plan_memory(budget, input_file, n_features=None, n_clusters=None):
+    """
+    Choisit le chemin d'exécution compatible avec le budget.
+
+    Args:
+        budget (str | int): Budget mémoire ('2G', octets...)
+        input_file (str | Path): Fichier d'entrée (CSV)
+        n_features (int): Nombre de features du clustering
+        n_clusters (int): Nombre de segments
+
+    Returns:
+        MemoryPlan: Plan retenu
+
+    Raises:
+        MemoryBudgetError: Si même le chemin en flux dépasse le budget
+    """
+    budget = parse_size(budget)
+    n_features = n_features or len(NUMERIC_FEATURES)
+    n_clusters = n_clusters or N_CLUSTERS
+    n_rows, n_columns = inspect_csv(input_file)
+    safety = MEMORY_PARAMS['safety_factor']
+    overhead = MEMORY_PARAMS['base_overhead_mb'] << 20
+    usable = budget - overhead
+
+    def per_row(itemsize):
+        # Trame lue (toutes colonnes) et sa copie prétraitée, matrice des
+        # features (copie de validation comprise), distances aux centres, labels
+        return safety * (2 * n_columns * 8 + 2 * n_features * itemsize
+                         + n_clusters * itemsize + 8)
+
+    # Réserve des matrices de distances (float64), au plus un quart du budget :
+    # matrice complète de la silhouette sur l'échantillon, et mémoire de
+    # travail de scikit-learn pour l'affectation aux micro-clusters
+    configured = EVALUATION_PARAMS['silhouette_sample_size']
+    affordable = int(math.sqrt(max(usable, 0) * 0.25 / 8)) if usable > 0 else 0
+    silhouette_sample_size = max(min(configured, affordable), min(configured, 1000))
+    distances = silhouette_sample_size ** 2 * 8
+
+    estimate = {'base': overhead, 'distances': distances}
+    for dtype, itemsize in (('float64', 8), ('float32', 4)):
+        in_memory = int(n_rows * per_row(itemsize))
+        if in_memory + distances <= usable:
+            estimate['données'] = in_memory
+            return MemoryPlan(budget, n_rows, 'memory', dtype, None, silhouette_sample_size, estimate)
+
+    # Chemin en flux : résumés de taille fixe et un bloc à la fois
+    itemsize = 4
+    fixed = int(safety * (
+        MICROCLUSTER_PARAMS['max_clusters'] * (2 * n_features + 1) * 8
+        + n_clusters * PROFILE_PARAMS['quantile_sample_size'] * n_features * 8
+        + FEATURE_IMPORTANCE_PARAMS['sample_size'] * n_features * 8
+        # Labels de toutes les lignes, conservés pour les étapes aval
+        + n_rows * 4
+    ))
+    # Le résumé travaille en float64 sur chaque bloc
+    chunk_row = per_row(itemsize) + safety * 2 * n_features * 8
+    available = usable - distances - fixed
+    chunksize = int(min(MEMORY_PARAMS['max_chunksize'],
+                        available * MEMORY_PARAMS['chunk_fraction'] / chunk_row)) if available > 0 else 0
+    estimate['résumés'] = fixed
+    if chunksize < MEMORY_PARAMS['min_chunksize']:
+        minimum = overhead + distances + fixed + int(
+            MEMORY_PARAMS['min_chunksize'] * chunk_row / MEMORY_PARAMS['chunk_fraction']
+        )
+        raise MemoryBudgetError(
+            f"Budget insuffisant : {format_size(budget)} disponibles, au moins "
+            f"{format_size(minimum)} nécessaires pour ~{n_rows:,} lignes x {n_columns} colonnes "
+            f"en flux (base {format_size(overhead)}, distances {format_size(distances)}, "
+            f"résumés {format_size(fixed)}) ; en mémoire : "
+            f"{format_size(int(n_rows * per_row(4)) + overhead + distances)} en float32"
+        )
+    estimate['bloc'] = int(chunksize * chunk_row)
+    return MemoryPlan(budget, n_rows, 'streaming', 'float32', chunksize, silhouette_sample_size, estimate)
@@ -0,0 +1,208 @@
+"""
+Profilage des étapes du pipeline à la demande (option --profile).
+
+Deux modes :
+- 'cprofile' : profil déterministe cProfile (fichier .prof, lisible avec
+  pstats ou snakeviz) et échantillonnage des piles en parallèle ;
+- 'sampling' : échantillonnage seul des piles du thread de l'étape, à
+  faible surcoût.
+
+Dans les deux cas, les piles échantillonnées sont écrites au format
+« collapsed » (une pile par ligne, frames séparées par ';', suivie du nombre
+d'échantillons), directement utilisable par flamegraph.pl ou speedscope.
+Sans --profile, aucun profileur n'est créé et les étapes ne paient rien.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+# Ajout du répertoire parent au PYTHONPATH
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent.parent
+sys.path.append(str(project_root))
+
+from src.config import LOGS_DIR, PROFILING_PARAMS
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or Path(code.co_filename).stem
+    return f"{module}:{code.co_name}"
+
+class StackSampler:
+    """
+    Échantillonne périodiquement la pile d'un thread.
+
+    Args:
+        thread_id (int): Identifiant du thread observé (thread courant par défaut)
+        interval (float): Période d'échantillonnage en secondes
+    """
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or PROFILING_PARAMS['interval']
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        """Écrit les piles au format collapsed (flamegraph)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, top_n):
+        """
+        Fonctions les plus souvent en haut de pile (temps propre).
+
+        Returns:
+            str: Tableau des fonctions et de leur part des échantillons
+        """
+        total = sum(self.stacks.values())
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f"{'échantillons':>12} {'part':>7}  fonction"]
+        for function, count in leaves.most_common(top_n):
+            lines.append(f"{count:>12} {count / total:>7.1%}  {function}")
+        return '\n'.join(lines)
+
+class StageProfiler:
+    """
+    Profileur par étape ; sérialisable pour être transmis aux workers.
+
+    Args:
+        output_dir (str | Path): Répertoire des profils (à côté des logs)
+        mode (str): 'cprofile' ou 'sampling'
+        top_n (int): Nombre de fonctions affichées
+        interval (float): Période d'échantillonnage en secondes
+    """
+
+    def __init__(self, output_dir, mode='cprofile', top_n=None, interval=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Mode de profilage inconnu : {mode}")
+        self.output_dir = Path(output_dir)
+        self.mode = mode
+        self.top_n = top_n or PROFILING_PARAMS['top_n']
+        self.interval = interval or PROFILING_PARAMS['interval']
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Profile le bloc et écrit <name>.prof / <name>.collapsed.
+
+        Args:
+            name (str): Nom de l'étape profilée
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler = None
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Un seul profileur déterministe actif à la fois (Python >= 3.12)
+                logger.warning("[%s] cProfile indisponible, échantillonnage seul", name)
+                profiler = None
+        sampler = StackSampler(interval=self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            sampler.stop()
+            self._write(name, profiler, sampler, elapsed)
+
+    def _write(self, name, profiler, sampler, elapsed):
+        collapsed_path = self.output_dir / f'{name}.collapsed'
+        sampler.write_collapsed(collapsed_path)
+        if profiler is not None:
+            prof_path = self.output_dir / f'{name}.prof'
+            profiler.dump_stats(prof_path)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('tottime').print_stats(self.top_n)
+            # On ne garde que le tableau des fonctions
+            table = stream.getvalue()
+            summary = table[table.find('   ncalls'):].rstrip()
+            logger.info("[%s] profil cProfile (%.2f s) : %s\n%s", name, elapsed, prof_path, summary)
+        else:
+            logger.info("[%s] profil échantillonné (%.2f s) : %s\n%s", name, elapsed,
+                        collapsed_path, sampler.top_functions(self.top_n))
+
+def profiled(profiler, name):
+    """
+    Contexte de profilage, sans effet si le profileur est None.
+
+    Args:
+        profiler (StageProfiler | None): Profileur actif
+        name (str): Nom de l'étape
+
+    Returns:
+        contextmanager: Contexte à utiliser avec `with`
+    """
+    return profiler.profile(name) if profiler is not None else nullcontext()
+
+def add_profile_argument(parser):
+    """Ajoute l'option --profile [MODE] à un ArgumentParser."""
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='cprofile',
+        default=None,
+        choices=PROFILE_MODES,
+        metavar='MODE',
+        help="Profile chaque étape (cprofile par défaut, ou sampling) et écrit "
+             ".prof / .collapsed dans logs/"
+    )
+
+def make_profiler(mode, logs_dir=None, run_id=None):
+    """
+    Crée le profileur demandé par --profile.
+
+    Args:
+        mode (str | None): Mode de profilage ; None désactive le profilage
+        logs_dir (str | Path): Répertoire des logs (LOGS_DIR par défaut)
+        run_id (str): Identifiant de l'exécution (horodatage par défaut)
+
+    Returns:
+        StageProfiler | None: Profileur écrivant dans logs/profile_<run_id>
+    """
+    if not mode:
+        return None
+    run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+    logs_dir = Path(logs_dir) if logs_dir else project_root / LOGS_DIR
+    return StageProfiler(logs_dir / f'profile_{run_id}', mode=mode)
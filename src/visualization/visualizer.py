@@ -17,6 +17,7 @@ from src.config import (
     SEGMENT_LABELS,
     VISUALIZATIONS_DIR
 )
+from src.utils.execution import budgeted
 
 class SegmentationVisualizer:
     """
@@ -140,6 +141,7 @@ class SegmentationVisualizer:
         plt.close()
         print(f"Matrice de corrélation sauvegardée dans {output_file}")
     
+    @budgeted
     def create_visualizations(self, input_file):
         """
         Crée toutes les visualisations.
@@ -1,15 +1,14 @@
 """
 Application web pour la visualisation des résultats de segmentation.
+
+plotly n'est importé qu'à la construction des graphiques, pour que le
+démarrage de l'application (et de la CLI) reste rapide.
 """
 
 import os
 from pathlib import Path
 from flask import Flask, render_template, jsonify
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.utils
-from plotly.subplots import make_subplots
 import json
 
 from config import (
@@ -18,9 +17,15 @@ from config import (
     SEGMENT_LABELS,
     COMMERCIAL_OFFERS
 )
+from src.models.profiling import compute_profiles
 
 app = Flask(__name__)
 
+def _to_json(fig):
+    """Sérialise une figure plotly en JSON."""
+    import plotly.utils
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
 def load_data():
     """Charge les données brutes."""
     data_path = Path(RAW_DATA_PATH) / 'donnees_clients.csv'
@@ -28,6 +33,8 @@ def load_data():
 
 def create_cluster_distribution():
     """Crée le graphique de distribution des clusters."""
+    import plotly.express as px
+
     df = load_data()
     # Simulation de segments pour la démonstration
     df['segment'] = pd.qcut(df['montant_consommation'], q=5, labels=SEGMENT_LABELS)
@@ -38,10 +45,12 @@ def create_cluster_distribution():
         title='Distribution des Segments',
         color_discrete_sequence=px.colors.qualitative.Set3
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return _to_json(fig)
 
 def create_feature_importance():
     """Crée le graphique d'importance des features."""
+    import plotly.graph_objects as go
+
     df = load_data()
     # Simulation de segments pour la démonstration
     df['segment'] = pd.qcut(df['montant_consommation'], q=5, labels=SEGMENT_LABELS)
@@ -66,17 +75,25 @@ def create_feature_importance():
         showlegend=True,
         boxmode='group'
     )
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return _to_json(fig)
 
 def create_cluster_profiles():
     """Crée le graphique des profils des clusters."""
+    import plotly.graph_objects as go
+
     df = load_data()
     # Simulation de segments pour la démonstration
     df['segment'] = pd.qcut(df['montant_consommation'], q=5, labels=SEGMENT_LABELS)
     
     features = ['age', 'montant_consommation', 'nombre_appels', 'volume_data', 'nombre_sms']
     
-    profiles = df.groupby('segment')[features].mean()
+    # Montant manquant : hors des quantiles (code -1), client ignoré
+    codes = df['segment'].cat.codes
+    keep = codes >= 0
+    profiles = compute_profiles(
+        df[keep], codes[keep], n_clusters=len(SEGMENT_LABELS), features=features
+    ).stat('mean')
+    profiles.index = list(SEGMENT_LABELS)
     
     fig = go.Figure()
     
@@ -94,7 +111,7 @@ def create_cluster_profiles():
         title="Profils des Segments"
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return _to_json(fig)
 
 @app.route('/')
 def index():
@@ -126,14 +143,25 @@ def segment_details():
     # Colonnes numériques uniquement
     numeric_columns = df.select_dtypes(include=['int64', 'float64']).columns
     
+    # Montant manquant : hors des quantiles (code -1), client ignoré
+    codes = df['segment'].cat.codes
+    keep = codes >= 0
+    profiles = compute_profiles(
+        df[keep],
+        codes[keep],
+        n_clusters=len(SEGMENT_LABELS),
+        features=list(numeric_columns)
+    ).to_dict(labels=SEGMENT_LABELS)
+    
     details = {}
     
-    for segment in df['segment'].unique():
-        segment_data = df[df['segment'] == segment]
+    for segment, profile in profiles.items():
+        if profile['size'] == 0:
+            continue
         details[str(segment)] = {
-            'size': len(segment_data),
-            'percentage': len(segment_data) / len(df) * 100,
-            'mean_values': segment_data[numeric_columns].mean().to_dict(),
+            'size': profile['size'],
+            'percentage': profile['percentage'],
+            'mean_values': profile['mean_values'],
             'offer': COMMERCIAL_OFFERS[segment]
         }
         